@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from . import pacientes
 from .models import (
     Usuario, Convenio, Especialidade, Sala,
     Medico, Paciente, Disponibilidade, Consulta, RegistroProntuario
 )
+from .paginacao import PaginadorContagemAproximada
 
 # Register your models here.
 
@@ -32,7 +34,87 @@ admin.site.register(Usuario, CustomUserAdmin)
 
 admin.site.register(Convenio)
 admin.site.register(Especialidade)
-admin.site.register(Sala)
-admin.site.register(Disponibilidade)
-admin.site.register(Consulta)
-admin.site.register(RegistroProntuario)
+
+
+class TabelaGrandeAdmin(admin.ModelAdmin):
+    # Listagens de tabelas grandes: sem COUNT(*) do total e com contagem estimada/cacheada na paginação
+    paginator = PaginadorContagemAproximada
+    show_full_result_count = False
+
+
+class BuscaPacienteMixin:
+    # Busca pelo início do nome ou CPF no índice de pacientes (ver pacientes.py), em vez de LIKE '%...%'
+    campo_paciente = ''
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pacientes.filtro(search_term, self.campo_paciente)), False
+
+
+@admin.register(Sala)
+class SalaAdmin(admin.ModelAdmin):
+    search_fields = ('nome',)
+    ordering = ('nome',)
+
+
+@admin.register(Medico)
+class MedicoAdmin(admin.ModelAdmin):
+    list_display = ('nome_completo', 'crm')
+    search_fields = ('^nome_completo', '=crm')
+    ordering = ('nome_completo',)
+    filter_horizontal = ('especialidades', 'convenios')
+
+
+@admin.register(Paciente)
+class PacienteAdmin(BuscaPacienteMixin, TabelaGrandeAdmin):
+    list_display = ('nome_completo', 'cpf', 'data_nascimento', 'convenio')
+    list_select_related = ('convenio',)
+    list_filter = ('convenio',)
+    search_fields = ('nome_busca', 'cpf')
+    search_help_text = 'Início do nome ou do CPF.'
+    ordering = ('nome_busca',)
+    raw_id_fields = ('usuario',)
+
+
+@admin.register(Disponibilidade)
+class DisponibilidadeAdmin(TabelaGrandeAdmin):
+    list_display = ('medico', 'dia_semana', 'hora_inicio', 'hora_fim')
+    list_select_related = ('medico',)
+    list_filter = ('dia_semana',)
+    autocomplete_fields = ('medico',)
+    # Mesma ordem do índice disponibilidade_medico_dia_idx
+    ordering = ('medico', 'dia_semana', 'hora_inicio')
+
+
+@admin.register(Consulta)
+class ConsultaAdmin(BuscaPacienteMixin, TabelaGrandeAdmin):
+    list_display = ('data_hora', 'paciente', 'medico', 'sala', 'status', 'duracao_minutos')
+    list_select_related = ('paciente', 'medico', 'sala')
+    list_filter = ('status', 'sala', 'medico')
+    date_hierarchy = 'data_hora'
+    autocomplete_fields = ('paciente', 'medico', 'sala')
+    search_fields = ('paciente__nome_busca', 'paciente__cpf')
+    search_help_text = 'Início do nome ou do CPF do paciente.'
+    campo_paciente = 'paciente__'
+    # (data_hora, id) decrescentes: percorre consulta_data_hora_idx de trás para frente
+    ordering = ('-data_hora',)
+    readonly_fields = ('data_agendamento', 'atualizado_em')
+
+    def get_queryset(self, request):
+        # Também para o autocompletar do prontuário, que não usa list_select_related (__str__ lê paciente
+        # e médico); como a listagem ignora list_select_related se já houver select_related, inclui a sala
+        return super().get_queryset(request).select_related('paciente', 'medico', 'sala')
+
+
+@admin.register(RegistroProntuario)
+class RegistroProntuarioAdmin(BuscaPacienteMixin, TabelaGrandeAdmin):
+    list_display = ('consulta', 'data_criacao')
+    list_select_related = ('consulta__paciente', 'consulta__medico')
+    date_hierarchy = 'consulta__data_hora'
+    autocomplete_fields = ('consulta',)
+    search_fields = ('consulta__paciente__nome_busca', 'consulta__paciente__cpf')
+    search_help_text = 'Início do nome ou do CPF do paciente.'
+    campo_paciente = 'consulta__paciente__'
+    ordering = ('-consulta__data_hora',)
+    readonly_fields = ('data_criacao',)
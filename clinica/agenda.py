@@ -0,0 +1,223 @@
+# Motor de geração de horários livres da agenda dos médicos
+
+import heapq
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import versoes
+from .models import Consulta, Disponibilidade, HorarioAgenda, Medico, Sala
+
+DURACAO_MAXIMA = timedelta(minutes=Consulta.DURACAO_MAXIMA_MINUTOS)
+
+
+def duracao_padrao():
+    return timedelta(minutes=getattr(settings, 'AGENDA_DURACAO_CONSULTA_MINUTOS', 30))
+
+
+def horizonte_maximo():
+    return getattr(settings, 'AGENDA_HORIZONTE_MAXIMO_DIAS', 90)
+
+
+def limitar_horizonte(dias=None):
+    """Converte o horizonte pedido (em dias) para um valor dentro dos limites configurados."""
+    padrao = getattr(settings, 'AGENDA_HORIZONTE_DIAS', 30)
+    try:
+        dias = int(dias) if dias not in (None, '') else padrao
+    except (TypeError, ValueError):
+        dias = padrao
+    return max(1, min(dias, horizonte_maximo()))
+
+
+def slot_atual(agora=None):
+    """Número do slot corrente; muda a cada `duracao_padrao()`, quando o primeiro horário da agenda fica no passado."""
+    return int((agora or timezone.now()).timestamp() // duracao_padrao().total_seconds())
+
+
+def _limite(agora, dias):
+    return timezone.make_aware(datetime.combine(agora.date() + timedelta(days=dias), datetime.min.time()))
+
+
+def _disponibilidades_por_dia(medico):
+    intervalos = {}
+    for dia_semana, hora_inicio, hora_fim in Disponibilidade.objects.filter(medico=medico).values_list(
+        'dia_semana', 'hora_inicio', 'hora_fim'
+    ):
+        intervalos.setdefault(dia_semana, []).append((hora_inicio, hora_fim))
+    return intervalos
+
+
+def _grade(intervalos, agora, dias, duracao):
+    """Todos os inícios de slot dentro das disponibilidades, do momento atual até o horizonte."""
+    slots = set()
+    for i in range(dias):
+        dia = agora.date() + timedelta(days=i)
+        for hora_inicio, hora_fim in intervalos.get(dia.isoweekday(), ()):
+            slot = timezone.make_aware(datetime.combine(dia, hora_inicio))
+            fim = timezone.make_aware(datetime.combine(dia, hora_fim))
+            while slot + duracao <= fim:
+                if slot >= agora:
+                    slots.add(slot)
+                slot += duracao
+    return sorted(slots)
+
+
+class _Ocupacoes:
+    """Consultas ativas de um período, ordenadas pelo início para busca por bisect."""
+
+    def __init__(self, inicio, fim, duracao, **filtros):
+        # Uma consulta iniciada até DURACAO_MAXIMA antes do início da janela ainda pode ocupá-la
+        self.duracao = duracao
+        self.linhas = sorted(
+            (data_hora, medico_id, sala_id, data_hora + timedelta(minutes=minutos))
+            for data_hora, medico_id, sala_id, minutos in Consulta.objects.filter(
+                data_hora__gt=inicio - DURACAO_MAXIMA, data_hora__lt=fim, **filtros
+            ).exclude(status='Cancelada').values_list('data_hora', 'medico_id', 'sala_id', 'duracao_minutos')
+        )
+        self.inicios = [linha[0] for linha in self.linhas]
+
+    def sobrepostas(self, inicio, fim):
+        i = bisect_left(self.inicios, inicio - DURACAO_MAXIMA + timedelta(microseconds=1))
+        j = bisect_left(self.inicios, fim)
+        return [linha for linha in self.linhas[i:j] if linha[3] > inicio]
+
+
+def calcular_horarios_livres(medico, dias=None, duracao=None, agora=None):
+    """
+    Calcula do zero os horários livres (datetimes com fuso) do médico nos próximos `dias` dias.
+
+    Carrega as disponibilidades e as consultas futuras em uma consulta cada e
+    descarta os slots que se sobrepõem a alguma consulta já marcada.
+    """
+    dias = limitar_horizonte(dias)
+    duracao = duracao or duracao_padrao()
+    agora = timezone.localtime(agora)
+
+    intervalos = _disponibilidades_por_dia(medico)
+    if not intervalos:
+        return []
+    ocupacoes = _Ocupacoes(agora, _limite(agora, dias), duracao, medico=medico)
+    return [
+        slot for slot in _grade(intervalos, agora, dias, duracao)
+        if not ocupacoes.sobrepostas(slot, slot + duracao)
+    ]
+
+
+def _horarios_livres(medico, dias, agora):
+    dias = limitar_horizonte(dias)
+    agora = timezone.localtime(agora)
+    return HorarioAgenda.objects.filter(
+        medico=medico,
+        inicio__gte=agora,
+        inicio__lt=_limite(agora, dias),
+        ocupado=False,
+        salas_livres__gt=0,
+    ).order_by('inicio').values_list('inicio', flat=True)
+
+
+def horarios_livres(medico, dias=None, agora=None):
+    """Lê os horários livres do médico na tabela materializada HorarioAgenda."""
+    return list(_horarios_livres(medico, dias, agora))
+
+
+async def ahorarios_livres(medico, dias=None, agora=None):
+    """Versão assíncrona de horarios_livres (views ASGI)."""
+    return [inicio async for inicio in _horarios_livres(medico, dias, agora)]
+
+
+def proximos_horarios(especialidade, quantidade=10, convenio=None, hora_inicio=None, hora_fim=None, agora=None):
+    """
+    Os `quantidade` primeiros horários livres entre todos os médicos da especialidade.
+
+    Junção das agendas já ordenadas de cada médico: uma consulta por médico, ordenada por
+    início e limitada a `quantidade` (o banco percorre o índice único (medico, inicio) e para
+    aí), intercaladas por heapq.merge. Nenhuma agenda é lida ou ordenada até o horizonte.
+    A janela [hora_inicio, hora_fim) é aplicada no horário local.
+    """
+    medicos = Medico.objects.filter(especialidades=especialidade)
+    if convenio is not None:
+        medicos = medicos.filter(convenios=convenio)
+    horarios = HorarioAgenda.objects.filter(inicio__gte=timezone.localtime(agora), ocupado=False, salas_livres__gt=0)
+    if hora_inicio is not None:
+        horarios = horarios.filter(inicio__time__gte=hora_inicio)
+    if hora_fim is not None:
+        horarios = horarios.filter(inicio__time__lt=hora_fim)
+
+    agendas = []
+    for medico in medicos.order_by('pk'):
+        agenda_do_medico = list(horarios.filter(medico=medico).order_by('inicio')[:quantidade])
+        for horario in agenda_do_medico:
+            horario.medico = medico
+        agendas.append(agenda_do_medico)
+    return list(islice(heapq.merge(*agendas, key=lambda horario: (horario.inicio, horario.medico_id)), quantidade))
+
+
+def agrupar_por_dia(horarios):
+    return [
+        (dia, list(slots))
+        for dia, slots in groupby(horarios, key=lambda h: timezone.localtime(h).date())
+    ]
+
+
+# Manutenção da tabela HorarioAgenda
+
+def _estado_slot(ocupacoes, medico_id, inicio, total_salas):
+    sobrepostas = ocupacoes.sobrepostas(inicio, inicio + ocupacoes.duracao)
+    ocupado = any(linha[1] == medico_id for linha in sobrepostas)
+    salas_livres = max(total_salas - len({linha[2] for linha in sobrepostas}), 0)
+    return ocupado, salas_livres
+
+
+@transaction.atomic
+def materializar_medico(medico_id, agora=None):
+    """Recria os horários futuros do médico a partir das suas disponibilidades."""
+    dias = horizonte_maximo()
+    duracao = duracao_padrao()
+    agora = timezone.localtime(agora)
+
+    HorarioAgenda.objects.filter(medico_id=medico_id, inicio__gte=agora).delete()
+    versoes.invalidar_apos_commit(versoes.grupo_do_medico(medico_id))
+    grade = _grade(_disponibilidades_por_dia(medico_id), agora, dias, duracao)
+    if not grade:
+        return 0
+
+    ocupacoes = _Ocupacoes(grade[0], grade[-1] + duracao, duracao)
+    total_salas = Sala.objects.count()
+    horarios = []
+    for inicio in grade:
+        ocupado, salas_livres = _estado_slot(ocupacoes, medico_id, inicio, total_salas)
+        horarios.append(HorarioAgenda(
+            medico_id=medico_id, inicio=inicio, ocupado=ocupado, salas_livres=salas_livres,
+        ))
+    HorarioAgenda.objects.bulk_create(horarios, batch_size=500)
+    return len(horarios)
+
+
+def atualizar_horarios(data_hora, duracao_minutos):
+    """Atualiza os slots (de todos os médicos) afetados por uma consulta em [data_hora, data_hora + duração)."""
+    duracao = duracao_padrao()
+    inicio, fim = data_hora - duracao, data_hora + timedelta(minutes=duracao_minutos)
+    horarios = list(HorarioAgenda.objects.filter(inicio__gt=inicio, inicio__lt=fim))
+    if not horarios:
+        return
+
+    ocupacoes = _Ocupacoes(inicio, fim + duracao, duracao)
+    total_salas = Sala.objects.count()
+    alterados = []
+    for horario in horarios:
+        ocupado, salas_livres = _estado_slot(ocupacoes, horario.medico_id, horario.inicio, total_salas)
+        if (ocupado, salas_livres) != (horario.ocupado, horario.salas_livres):
+            horario.ocupado, horario.salas_livres = ocupado, salas_livres
+            alterados.append(horario)
+    HorarioAgenda.objects.bulk_update(alterados, ['ocupado', 'salas_livres'])
+    # Só as páginas dos médicos cujos horários mudaram precisam sair do cache
+    if alterados:
+        versoes.invalidar_apos_commit(*{versoes.grupo_do_medico(horario.medico_id) for horario in alterados})
+
+
+def remover_horarios_passados(agora=None):
+    return HorarioAgenda.objects.filter(inicio__lt=timezone.localtime(agora)).delete()[0]
@@ -0,0 +1,123 @@
+# Agendamento de consultas seguro contra concorrência: as restrições únicas de Consulta barram o
+# agendamento duplo e os conflitos (ou bloqueios do SQLite) são repetidos com recuo
+
+import random
+import time
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+
+from . import agenda, metricas
+from .alocacao import AlocadorSalas
+from .models import Consulta, HorarioAgenda
+
+TENTATIVAS_AGENDAMENTO = 10
+# Erros do SQLite de disputa por bloqueio (SQLITE_BUSY/SQLITE_LOCKED): os únicos OperationalError repetidos
+MENSAGENS_BLOQUEIO = ('database is locked', 'database table is locked')
+
+
+class AgendamentoError(Exception):
+    pass
+
+
+class HorarioIndisponivel(AgendamentoError):
+    pass
+
+
+class PacienteJaAgendado(AgendamentoError):
+    pass
+
+
+class SemSalaDisponivel(AgendamentoError):
+    pass
+
+
+class CancelamentoNaoPermitido(AgendamentoError):
+    pass
+
+
+def _agendar(paciente, medico, data_hora):
+    formatado = data_hora.strftime('%d/%m/%Y às %H:%M')
+
+    if Consulta.objects.filter(paciente=paciente, data_hora=data_hora).exclude(status='Cancelada').exists():
+        raise PacienteJaAgendado(f'Você já possui uma consulta agendada para este mesmo horário ({formatado}).')
+
+    # Os slots passados só saem de HorarioAgenda quando `reconstruir_agenda` roda
+    if data_hora <= timezone.now():
+        raise HorarioIndisponivel(f'O horário {formatado} já passou. Por favor, escolha outro horário.')
+
+    if not HorarioAgenda.objects.filter(medico=medico, inicio=data_hora, ocupado=False).exists():
+        raise HorarioIndisponivel(f'O horário {formatado} não está mais disponível. Por favor, escolha outro horário.')
+
+    duracao = agenda.duracao_padrao()
+    sala_id = AlocadorSalas.do_dia(data_hora).escolher(data_hora, data_hora + duracao, medico_id=medico.pk)
+    if sala_id is None:
+        raise SemSalaDisponivel(
+            f'Desculpe, não há salas disponíveis para o horário das {data_hora.strftime("%H:%M")}. '
+            'Por favor, tente outro horário.'
+        )
+
+    return Consulta.objects.create(
+        paciente=paciente,
+        medico=medico,
+        sala_id=sala_id,
+        data_hora=data_hora,
+        duracao_minutos=int(duracao.total_seconds() // 60),
+    )
+
+
+def _bloqueio(erro):
+    return any(mensagem in str(erro).lower() for mensagem in MENSAGENS_BLOQUEIO)
+
+
+def agendar_consulta(paciente, medico, data_hora, ao_confirmar=None, tentativas=TENTATIVAS_AGENDAMENTO):
+    """
+    Agenda a consulta dentro de uma transação e retorna a Consulta criada.
+
+    As restrições únicas de Consulta garantem que dois agendamentos simultâneos não
+    fiquem com o mesmo médico, sala ou paciente no mesmo horário; quando um conflito
+    ou um bloqueio do banco acontece, a operação é repetida com um pequeno recuo. Outros
+    OperationalError (tabela inexistente, erro de disco, banco somente leitura) sobem sem repetição.
+    `ao_confirmar(consulta)` roda na mesma transação (ex.: gravar a notificação na caixa de saída).
+    """
+    for tentativa in range(tentativas):
+        try:
+            with transaction.atomic():
+                consulta = _agendar(paciente, medico, data_hora)
+                if ao_confirmar:
+                    ao_confirmar(consulta)
+                return consulta
+        except (IntegrityError, OperationalError) as e:
+            # Outro agendamento ocupou o horário/sala ou o banco estava bloqueado
+            if isinstance(e, OperationalError) and not _bloqueio(e):
+                raise
+            time.sleep(random.uniform(0, min(0.01 * 2 ** tentativa, 0.5)))
+    raise HorarioIndisponivel(
+        'Não foi possível concluir o agendamento porque o horário foi disputado por outros pacientes. '
+        'Por favor, tente novamente.'
+    )
+
+
+def agendar_com_notificacao(paciente, medico, data_hora, notification_service, destinatario):
+    """Agenda (ver agendar_consulta) e grava a confirmação para `destinatario` na mesma transação."""
+    quando = timezone.localtime(data_hora).strftime('%d/%m/%Y às %H:%M')
+    mensagem = f'Sua consulta com Dr(a). {medico.nome_completo} foi agendada para {quando}.'
+
+    def notificar(consulta):
+        with metricas.cronometro('notificacao'):
+            notification_service.send_notification(destinatario, mensagem)
+
+    with metricas.cronometro('agendamento'):
+        return agendar_consulta(paciente, medico, data_hora, ao_confirmar=notificar)
+
+
+def cancelar_consulta(consulta, agora=None):
+    """Cancelamento pelo paciente: só consultas agendadas que ainda não começaram."""
+    if consulta.status != 'Agendada':
+        raise CancelamentoNaoPermitido(f'Esta consulta não pode ser cancelada (situação: {consulta.status}).')
+    if consulta.data_hora <= (agora or timezone.now()):
+        raise CancelamentoNaoPermitido('Consultas passadas ou em andamento não podem ser canceladas.')
+    consulta.status = 'Cancelada'
+    # save() e não update(): os sinais liberam o horário na agenda e avisam o quadro do dia
+    consulta.save(update_fields=['status', 'atualizado_em'])
+    return consulta
@@ -0,0 +1,106 @@
+# Alocação de salas com índice de intervalos por dia
+
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .agenda import DURACAO_MAXIMA
+from .models import Consulta, Sala
+
+POLITICA_MESMA_SALA = 'mesma_sala'
+POLITICA_MENOS_USADA = 'menos_usada'
+POLITICAS = (POLITICA_MESMA_SALA, POLITICA_MENOS_USADA)
+
+
+class Intervalos:
+    """Intervalos [inicio, fim) que não se sobrepõem, mantidos ordenados pelo início."""
+
+    def __init__(self):
+        self.inicios = []
+        self.fins = []
+        self.ocupado = timedelta()
+
+    def adicionar(self, inicio, fim):
+        i = bisect_right(self.inicios, inicio)
+        self.inicios.insert(i, inicio)
+        self.fins.insert(i, fim)
+        self.ocupado += fim - inicio
+
+    def livre(self, inicio, fim):
+        # Só precisa olhar o intervalo anterior e o seguinte ao início pedido
+        i = bisect_right(self.inicios, inicio)
+        if i > 0 and self.fins[i - 1] > inicio:
+            return False
+        return i == len(self.inicios) or self.inicios[i] >= fim
+
+
+class AlocadorSalas:
+    """
+    Índice da ocupação de salas e médicos em um dia.
+
+    É montado com uma única consulta ao banco e responde "qual sala está livre
+    em [inicio, fim)" com buscas binárias nas listas ordenadas de cada sala.
+    """
+
+    def __init__(self, salas, ocupacoes):
+        self.salas = list(salas)
+        self.por_sala = {sala_id: Intervalos() for sala_id in self.salas}
+        self.por_medico = {}
+        self.salas_do_medico = {}
+        for ocupacao in ocupacoes:
+            self.ocupar(*ocupacao)
+
+    @classmethod
+    def do_dia(cls, data_hora, excluir=None):
+        dia = timezone.localtime(data_hora).date()
+        inicio = timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+        # Consultas do dia anterior ainda podem ocupar o início do dia
+        consultas = Consulta.objects.filter(
+            data_hora__gt=inicio - DURACAO_MAXIMA,
+            data_hora__lt=inicio + timedelta(days=1),
+        ).exclude(status='Cancelada')
+        if excluir is not None:
+            consultas = consultas.exclude(pk=excluir)
+        ocupacoes = [
+            (sala_id, medico_id, data_hora, data_hora + timedelta(minutes=duracao))
+            for sala_id, medico_id, data_hora, duracao in consultas.values_list(
+                'sala_id', 'medico_id', 'data_hora', 'duracao_minutos'
+            )
+        ]
+        return cls(Sala.objects.order_by('pk').values_list('pk', flat=True), ocupacoes)
+
+    def ocupar(self, sala_id, medico_id, inicio, fim):
+        self.por_sala.setdefault(sala_id, Intervalos()).adicionar(inicio, fim)
+        self.por_medico.setdefault(medico_id, Intervalos()).adicionar(inicio, fim)
+        insort(self.salas_do_medico.setdefault(medico_id, []), (fim, sala_id))
+
+    def sala_livre(self, sala_id, inicio, fim):
+        return sala_id in self.por_sala and self.por_sala[sala_id].livre(inicio, fim)
+
+    def medico_livre(self, medico_id, inicio, fim):
+        return medico_id not in self.por_medico or self.por_medico[medico_id].livre(inicio, fim)
+
+    def salas_livres(self, inicio, fim):
+        return [sala_id for sala_id in self.salas if self.por_sala[sala_id].livre(inicio, fim)]
+
+    def _sala_anterior_do_medico(self, medico_id, inicio):
+        salas = self.salas_do_medico.get(medico_id, [])
+        i = bisect_right(salas, (inicio, float('inf')))
+        return salas[i - 1][1] if i > 0 else None
+
+    def escolher(self, inicio, fim, medico_id=None, politica=None):
+        """Retorna o id da sala escolhida para [inicio, fim) segundo a política, ou None."""
+        politica = politica or getattr(settings, 'AGENDA_POLITICA_SALAS', POLITICA_MESMA_SALA)
+        livres = self.salas_livres(inicio, fim)
+        if not livres:
+            return None
+
+        if politica == POLITICA_MESMA_SALA and medico_id is not None:
+            anterior = self._sala_anterior_do_medico(medico_id, inicio)
+            if anterior in livres:
+                return anterior
+
+        # Menos usada no dia; empate decidido pela ordem das salas
+        return min(livres, key=lambda sala_id: self.por_sala[sala_id].ocupado)
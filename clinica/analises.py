@@ -0,0 +1,193 @@
+# Tabelas de análise (ResumoHorario) atualizadas por marca d'água e relatórios lidos só delas
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from . import exportacao
+from .models import Consulta, ConsultaAnalisada, ResumoHorario
+
+MARCO = 'analises'
+TAMANHO_BLOCO = 5000
+
+# Colunas da consulta na ordem da chave de ResumoHorario (hora, médico, sala, convênio, status) + minutos
+_CAMPOS = ('id', 'data_hora', 'medico_id', 'sala_id', 'paciente__convenio_id', 'status', 'duracao_minutos')
+
+
+def _hora(data_hora):
+    return data_hora.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _chave_da_analisada(analisada):
+    return (analisada.hora, analisada.medico_id, analisada.sala_id, analisada.convenio_id, analisada.status)
+
+
+class _Diferencas:
+    """Acumula (total, minutos) a somar em cada linha de ResumoHorario."""
+
+    def __init__(self):
+        self.linhas = {}
+
+    def somar(self, chave, total, minutos):
+        atual = self.linhas.setdefault(chave, [0, 0])
+        atual[0] += total
+        atual[1] += minutos
+
+    def aplicar(self):
+        linhas = {chave: valores for chave, valores in self.linhas.items() if valores != [0, 0]}
+        if not linhas:
+            return 0
+        existentes = {}
+        for resumo in ResumoHorario.objects.filter(hora__in={chave[0] for chave in linhas}):
+            existentes[(resumo.hora, resumo.medico_id, resumo.sala_id, resumo.convenio_id, resumo.status)] = resumo
+
+        novos, alterados, vazios = [], [], []
+        for chave, (total, minutos) in linhas.items():
+            resumo = existentes.get(chave)
+            if resumo is None:
+                hora, medico_id, sala_id, convenio_id, status = chave
+                novos.append(ResumoHorario(
+                    hora=hora, medico_id=medico_id, sala_id=sala_id, convenio_id=convenio_id,
+                    status=status, total=total, minutos=minutos,
+                ))
+                continue
+            resumo.total += total
+            resumo.minutos += minutos
+            (vazios if resumo.total <= 0 else alterados).append(resumo)
+        ResumoHorario.objects.bulk_create(novos, batch_size=1000)
+        ResumoHorario.objects.bulk_update(alterados, ['total', 'minutos'], batch_size=1000)
+        ResumoHorario.objects.filter(pk__in=[resumo.pk for resumo in vazios]).delete()
+        return len(linhas)
+
+
+@transaction.atomic
+def atualizar(tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Aplica em ResumoHorario só o que mudou desde a última execução.
+
+    Lê as consultas alteradas depois do marco (Consulta.atualizado_em), compara cada uma
+    com o que ela já somava (ConsultaAnalisada) e grava apenas as diferenças. Consultas
+    excluídas aparecem em ConsultaAnalisada com consulta=NULL e são descontadas.
+    """
+    corte = exportacao.corte()
+    desde = exportacao.marco(MARCO)
+    if desde is None:
+        return reconstruir(tamanho_bloco)
+
+    diferencas = _Diferencas()
+    excluidas = list(ConsultaAnalisada.objects.filter(consulta__isnull=True))
+    for analisada in excluidas:
+        diferencas.somar(_chave_da_analisada(analisada), -1, -analisada.minutos)
+    ConsultaAnalisada.objects.filter(pk__in=[analisada.pk for analisada in excluidas]).delete()
+
+    alteradas = exportacao.consultas(desde=desde, ate=corte).values_list(*_CAMPOS)
+    bloco = []
+    for linha in alteradas.iterator(chunk_size=tamanho_bloco):
+        bloco.append(linha)
+        if len(bloco) == tamanho_bloco:
+            _comparar(bloco, diferencas)
+            bloco = []
+    _comparar(bloco, diferencas)
+
+    alteradas = diferencas.aplicar()
+    exportacao.avancar_marco(MARCO, corte)
+    return alteradas
+
+
+def _comparar(bloco, diferencas):
+    if not bloco:
+        return
+    anteriores = ConsultaAnalisada.objects.in_bulk([linha[0] for linha in bloco], field_name='consulta_id')
+    novas, alteradas = [], []
+    for consulta_id, data_hora, medico_id, sala_id, convenio_id, status, minutos in bloco:
+        chave = (_hora(data_hora), medico_id, sala_id, convenio_id, status)
+        analisada = anteriores.get(consulta_id)
+        if analisada is not None:
+            if (_chave_da_analisada(analisada), analisada.minutos) == (chave, minutos):
+                continue
+            diferencas.somar(_chave_da_analisada(analisada), -1, -analisada.minutos)
+        else:
+            analisada = ConsultaAnalisada(consulta_id=consulta_id)
+        diferencas.somar(chave, 1, minutos)
+        analisada.hora, analisada.medico_id, analisada.sala_id, analisada.convenio_id, analisada.status = chave
+        analisada.minutos = minutos
+        (alteradas if analisada.pk else novas).append(analisada)
+    ConsultaAnalisada.objects.bulk_create(novas, batch_size=1000)
+    ConsultaAnalisada.objects.bulk_update(
+        alteradas, ['hora', 'medico_id', 'sala_id', 'convenio_id', 'status', 'minutos'], batch_size=1000,
+    )
+
+
+@transaction.atomic
+def reconstruir(tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Recria ResumoHorario e ConsultaAnalisada do zero.
+
+    As consultas são agregadas no banco (GROUP BY) em faixas de `tamanho_bloco` ids, o que
+    limita a memória e o tempo de cada consulta; os totais das faixas são somados em Python.
+    """
+    corte = exportacao.corte()
+    ResumoHorario.objects.all().delete()
+    ConsultaAnalisada.objects.all().delete()
+
+    consultas = Consulta.objects.filter(atualizado_em__lte=corte)
+    limites = consultas.aggregate(menor=Min('id'), maior=Max('id'))
+    diferencas = _Diferencas()
+    if limites['menor'] is not None:
+        for inicio in range(limites['menor'], limites['maior'] + 1, tamanho_bloco):
+            faixa = consultas.filter(id__gte=inicio, id__lt=inicio + tamanho_bloco)
+            for hora, medico_id, sala_id, convenio_id, status, total, minutos in faixa.annotate(
+                hora=TruncHour('data_hora', tzinfo=dt_timezone.utc),
+            ).values_list('hora', 'medico_id', 'sala_id', 'paciente__convenio_id', 'status').annotate(
+                total=Count('id'), soma_minutos=Sum('duracao_minutos'),
+            ).order_by():
+                diferencas.somar((hora, medico_id, sala_id, convenio_id, status), total, minutos)
+
+            ConsultaAnalisada.objects.bulk_create([
+                ConsultaAnalisada(
+                    consulta_id=consulta_id, hora=_hora(data_hora), medico_id=medico_id, sala_id=sala_id,
+                    convenio_id=convenio_id, status=status, minutos=minutos,
+                )
+                for consulta_id, data_hora, medico_id, sala_id, convenio_id, status, minutos
+                in faixa.values_list(*_CAMPOS)
+            ], batch_size=1000)
+
+    linhas = diferencas.aplicar()
+    exportacao.avancar_marco(MARCO, corte)
+    return linhas
+
+
+# Relatórios (somente sobre ResumoHorario)
+
+def relatorio(data_inicio, data_fim, agrupamento='dia', agora=None):
+    """Indicadores do período [data_inicio, data_fim] (datas locais), lidos das tabelas de análise."""
+    inicio = timezone.make_aware(datetime.combine(data_inicio, datetime.min.time()))
+    fim = timezone.make_aware(datetime.combine(data_fim + timedelta(days=1), datetime.min.time()))
+    resumos = ResumoHorario.objects.filter(hora__gte=inicio, hora__lt=fim)
+    ativas = resumos.exclude(status='Cancelada')
+
+    def por(campo):
+        # Um médico com várias especialidades conta em cada uma delas
+        return list(ativas.values(nome=F(campo)).annotate(
+            consultas=Sum('total'), minutos=Sum('minutos'),
+        ).order_by('-consultas', 'nome'))
+
+    periodo = TruncDate('hora') if agrupamento == 'dia' else TruncHour('hora')
+    return {
+        'por_sala': por('sala__nome'),
+        'por_medico': por('medico__nome_completo'),
+        'por_especialidade': por('medico__especialidades__nome'),
+        'por_convenio': por('convenio__nome'),
+        'por_status': list(resumos.values('status').annotate(consultas=Sum('total')).order_by('status')),
+        # Agendadas cujo horário já passou sem serem marcadas como realizadas
+        'possiveis_faltas': ativas.filter(status='Agendada', hora__lt=_hora(agora or timezone.now())).aggregate(
+            consultas=Sum('total'),
+        )['consultas'] or 0,
+        'serie': list(resumos.annotate(periodo=periodo).values('periodo').annotate(
+            consultas=Sum('total', filter=~Q(status='Cancelada')),
+            canceladas=Sum('total', filter=Q(status='Cancelada')),
+        ).order_by('periodo')),
+    }
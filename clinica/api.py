@@ -0,0 +1,203 @@
+# API JSON (v1) para o aplicativo e o totem: médicos, horários livres, agendamento, cancelamento e
+# consultas do paciente. Usa a mesma lógica das páginas (agenda, agendamento), sem renderizar templates
+
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+from dependency_injector.wiring import inject, Provide
+
+from . import agenda, agendamento, replicas, versoes
+from .containers import AppContainer
+from .forms import AgendamentoApiForm, ConsultasApiFiltroForm, MedicoFiltroForm
+from .models import Consulta, Medico, Paciente
+from .paginacao import PaginaKeyset
+from .services import NotificationService
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+# Campos que o cliente pode pedir em `campos` (ex.: ?campos=id,nome): função que lê o valor e
+# relações que ela precisa (select_related/prefetch_related só entram se o campo for pedido)
+CAMPOS_MEDICO = {
+    'id': (lambda medico: medico.pk, None),
+    'nome': (lambda medico: medico.nome_completo, None),
+    'crm': (lambda medico: medico.crm, None),
+    'especialidades': (lambda medico: [especialidade.nome for especialidade in medico.especialidades.all()], 'especialidades'),
+}
+CAMPOS_CONSULTA = {
+    'id': (lambda consulta: consulta.pk, None),
+    'inicio': (lambda consulta: timezone.localtime(consulta.data_hora).isoformat(), None),
+    'duracao_minutos': (lambda consulta: consulta.duracao_minutos, None),
+    'status': (lambda consulta: consulta.status, None),
+    'medico_id': (lambda consulta: consulta.medico_id, None),
+    'medico': (lambda consulta: consulta.medico.nome_completo, 'medico'),
+    'sala': (lambda consulta: consulta.sala.nome, 'sala'),
+}
+
+
+def _json(dados, status=200):
+    # Sem espaços e com acentos como UTF-8: respostas menores para o aplicativo
+    return JsonResponse(dados, status=status, json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+
+
+def _erro(mensagem, status, **extra):
+    return _json({'erro': mensagem, **extra}, status=status)
+
+
+def _autenticado(view):
+    """Como login_required, mas responde 401 em JSON em vez de redirecionar para o login."""
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _erro('Autenticação necessária.', 401)
+        return view(request, *args, **kwargs)
+    return _view
+
+
+def _paciente(request):
+    if request.user.tipo_usuario != 'paciente':
+        return None
+    return Paciente.objects.filter(usuario=request.user).first()
+
+
+def _campos(request, disponiveis):
+    """Campos pedidos em `campos` (todos, se ausente), ou None se algum não existe."""
+    pedidos = [campo.strip() for campo in request.GET.get('campos', '').split(',') if campo.strip()]
+    if not pedidos:
+        return list(disponiveis)
+    return pedidos if set(pedidos) <= set(disponiveis) else None
+
+
+def _limite(request):
+    try:
+        return min(max(int(request.GET.get('limite', LIMITE_PADRAO)), 1), LIMITE_MAXIMO)
+    except ValueError:
+        return LIMITE_PADRAO
+
+
+def _relacoes(campos, disponiveis):
+    return {disponiveis[campo][1] for campo in campos if disponiveis[campo][1]}
+
+
+def _serializar(objeto, campos, disponiveis):
+    return {campo: disponiveis[campo][0](objeto) for campo in campos}
+
+
+def _pagina(request, queryset, ordenacao, campos, disponiveis):
+    pagina = PaginaKeyset(queryset, ordenacao, _limite(request), request.GET)
+    return _json({
+        'resultados': [_serializar(objeto, campos, disponiveis) for objeto in pagina.itens],
+        # Passe como `apos` para a próxima página; null na última
+        'proximo': pagina.cursor_proximo,
+    })
+
+
+def _campos_invalidos(disponiveis):
+    return _erro('Campo desconhecido em `campos`.', 400, disponiveis=list(disponiveis))
+
+
+@replicas.leitura_em_replica
+@require_http_methods(['GET'])
+@_autenticado
+def medicos(request):
+    filtro = MedicoFiltroForm(request.GET)
+    campos = _campos(request, CAMPOS_MEDICO)
+    if campos is None:
+        return _campos_invalidos(CAMPOS_MEDICO)
+    if not filtro.is_valid():
+        return _erro('Parâmetros inválidos.', 400, campos=filtro.errors.get_json_data())
+    queryset = filtro.filtrar(Medico.objects.all())
+    if 'especialidades' in _relacoes(campos, CAMPOS_MEDICO):
+        queryset = queryset.prefetch_related('especialidades')
+    return _pagina(request, queryset, ('nome_busca', 'pk'), campos, CAMPOS_MEDICO)
+
+
+@require_http_methods(['GET'])
+@_autenticado
+def horarios(request, medico_id):
+    # Mesma invalidação da página de agenda (versão do médico + slot atual), em outra chave
+    dias = agenda.limitar_horizonte(request.GET.get('dias'))
+    chave = versoes.chave(versoes.grupo_do_medico(medico_id), versoes.versao('agenda'), 'api', dias, agenda.slot_atual())
+    livres = cache.get(chave)
+    if livres is None:
+        medico = Medico.objects.filter(pk=medico_id).first()
+        if medico is None:
+            return _erro('Médico não encontrado.', 404)
+        livres = [timezone.localtime(inicio).isoformat() for inicio in agenda.horarios_livres(medico, dias=dias)]
+        cache.set(chave, livres, getattr(settings, 'AGENDA_CACHE_SEGUNDOS', 600))
+    return _json({'medico': medico_id, 'dias': dias, 'horarios': livres})
+
+
+@replicas.leitura_em_replica
+@require_http_methods(['GET', 'POST'])
+@_autenticado
+@inject
+def consultas(
+    request,
+    notification_service: NotificationService = Provide[AppContainer.notification_service],
+):
+    paciente = _paciente(request)
+    if paciente is None:
+        return _erro('Apenas pacientes têm consultas por esta API.', 403)
+    if request.method == 'POST':
+        return _agendar(request, paciente, notification_service)
+
+    filtro = ConsultasApiFiltroForm(request.GET)
+    campos = _campos(request, CAMPOS_CONSULTA)
+    if campos is None:
+        return _campos_invalidos(CAMPOS_CONSULTA)
+    if not filtro.is_valid():
+        return _erro('Parâmetros inválidos.', 400, campos=filtro.errors.get_json_data())
+    queryset = filtro.filtrar(Consulta.objects.filter(paciente=paciente))
+    relacoes = _relacoes(campos, CAMPOS_CONSULTA)
+    if relacoes:
+        queryset = queryset.select_related(*relacoes)
+    return _pagina(request, queryset, ('data_hora', 'pk'), campos, CAMPOS_CONSULTA)
+
+
+def _agendar(request, paciente, notification_service):
+    if request.content_type == 'application/json':
+        try:
+            dados = json.loads(request.body or b'{}')
+        except ValueError:
+            dados = None
+        if not isinstance(dados, dict):
+            return _erro('JSON inválido.', 400)
+    else:
+        dados = request.POST
+    form = AgendamentoApiForm(dados)
+    if not form.is_valid():
+        return _erro('Parâmetros inválidos.', 400, campos=form.errors.get_json_data())
+    medico = Medico.objects.filter(pk=form.cleaned_data['medico']).first()
+    if medico is None:
+        return _erro('Médico não encontrado.', 404)
+
+    try:
+        consulta = agendamento.agendar_com_notificacao(
+            paciente, medico, form.cleaned_data['inicio'], notification_service, request.user.email,
+        )
+    except agendamento.AgendamentoError as e:
+        # Horário tomado, paciente já ocupado ou sem sala: o cliente deve buscar os horários de novo
+        return _erro(str(e), 409)
+    return _json(_serializar(consulta, CAMPOS_CONSULTA, CAMPOS_CONSULTA), status=201)
+
+
+@require_http_methods(['POST'])
+@_autenticado
+def cancelar(request, consulta_id):
+    paciente = _paciente(request)
+    if paciente is None:
+        return _erro('Apenas pacientes têm consultas por esta API.', 403)
+    consulta = Consulta.objects.select_related('medico', 'sala').filter(pk=consulta_id, paciente=paciente).first()
+    if consulta is None:
+        return _erro('Consulta não encontrada.', 404)
+    try:
+        agendamento.cancelar_consulta(consulta)
+    except agendamento.AgendamentoError as e:
+        return _erro(str(e), 409)
+    return _json(_serializar(consulta, CAMPOS_CONSULTA, CAMPOS_CONSULTA))
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ClinicaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clinica'
+
+    def ready(self):
+        from . import metricas, signals  # noqa: F401
+        metricas.instalar_medicao_de_templates()
@@ -0,0 +1,88 @@
+# Busca textual nos prontuários do médico (índice FTS5 criado na migração 0012)
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import RegistroProntuario
+
+TABELA = 'clinica_prontuario_busca'
+RESULTADOS_POR_PAGINA = 20
+# Marcadores do trecho destacado, trocados por <mark> depois de escapar o texto
+_INICIO, _FIM = '\x02', '\x03'
+
+
+def termos(texto):
+    return re.findall(r'\w+', texto or '')[:10]
+
+
+def _expressao(palavras):
+    # Cada palavra entre aspas (o usuário não escreve sintaxe FTS5) e como prefixo: "amoxi" acha "amoxicilina"
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def _destacar(trecho):
+    return mark_safe(escape(trecho).replace(_INICIO, '<mark>').replace(_FIM, '</mark>'))
+
+
+def buscar(medico, texto, pagina=1, por_pagina=RESULTADOS_POR_PAGINA):
+    """
+    Prontuários das consultas de `medico` que contêm todas as palavras de `texto`,
+    do mais relevante (bm25) para o menos relevante.
+
+    Devolve (prontuários, tem_proxima); cada prontuário traz `trecho` com as palavras destacadas.
+    A paginação é por OFFSET: a ordenação por relevância exige ler todos os resultados
+    do médico de qualquer forma, então um cursor não economizaria trabalho.
+    """
+    palavras = termos(texto)
+    if not palavras:
+        return [], False
+    inicio = (pagina - 1) * por_pagina
+
+    if connection.vendor != 'sqlite':
+        filtro = Q()
+        for palavra in palavras:
+            filtro &= Q(descricao_atendimento__icontains=palavra) | Q(prescricao__icontains=palavra)
+        linhas = [(pk, None) for pk in RegistroProntuario.objects.filter(filtro, consulta__medico=medico).order_by(
+            '-consulta__data_hora', '-pk',
+        ).values_list('pk', flat=True)[inicio:inicio + por_pagina + 1]]
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT b.rowid, snippet({TABELA}, -1, %s, %s, '…', 16)
+                FROM {TABELA} b
+                JOIN clinica_registroprontuario r ON r.id = b.rowid
+                JOIN clinica_consulta c ON c.id = r.consulta_id
+                WHERE {TABELA} MATCH %s AND c.medico_id = %s
+                ORDER BY bm25({TABELA}), b.rowid
+                LIMIT %s OFFSET %s
+                """,
+                [_INICIO, _FIM, _expressao(palavras), medico.pk, por_pagina + 1, inicio],
+            )
+            linhas = cursor.fetchall()
+
+    tem_proxima = len(linhas) > por_pagina
+    linhas = linhas[:por_pagina]
+    prontuarios = RegistroProntuario.objects.select_related('consulta__paciente').in_bulk([pk for pk, _ in linhas])
+    resultado = []
+    for pk, trecho in linhas:
+        prontuario = prontuarios.get(pk)
+        if prontuario is None:  # excluído entre as duas consultas
+            continue
+        prontuario.trecho = _destacar(trecho) if trecho is not None else prontuario.descricao_atendimento
+        resultado.append(prontuario)
+    return resultado, tem_proxima
+
+
+def reconstruir():
+    """Refaz o índice a partir da tabela de prontuários (depois de cargas feitas por fora do Django, por exemplo)."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABELA}({TABELA}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABELA}({TABELA}) VALUES ('optimize')")
+    return True
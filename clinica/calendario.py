@@ -0,0 +1,152 @@
+# Calendário de ocupação em bits: um bit por slot, por médico e por sala, numa janela móvel.
+# Montado sob demanda (CalendarioOcupacao.construir); a agenda do dia a dia continua em HorarioAgenda
+
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from . import agenda
+from .models import Consulta, Disponibilidade, Sala
+
+
+def _faixa(i, j):
+    """Bits [i, j) ligados."""
+    return ((1 << (j - i)) - 1) << i if j > i else 0
+
+
+class CalendarioOcupacao:
+    """
+    Ocupação da clínica em bitsets (inteiros do Python) alinhados a uma grade de slots.
+
+    O bit i corresponde a [inicio + i * duracao, inicio + (i + 1) * duracao). Cada médico
+    tem os bits do expediente (Disponibilidade) e os ocupados por consultas; cada sala, os
+    ocupados. Perguntas como "médico livre E alguma sala livre" ou "todos os cardiologistas
+    livres às terças de manhã" viram AND/OR de inteiros, feitos em C sobre a janela inteira.
+    """
+
+    def __init__(self, inicio, dias, duracao):
+        self.inicio = inicio
+        self.dias = dias
+        self.duracao = duracao
+        self.total = int(timedelta(days=dias) / duracao)
+        self.todos = _faixa(0, self.total)
+        self.expediente = {}
+        self.ocupado_medico = {}
+        self.ocupado_sala = {}
+
+    @classmethod
+    def construir(cls, dias=None, agora=None):
+        """Monta o calendário a partir de hoje com três consultas ao banco."""
+        agora = timezone.localtime(agora)
+        inicio = timezone.make_aware(datetime.combine(agora.date(), datetime.min.time()))
+        calendario = cls(inicio, agenda.limitar_horizonte(dias), agenda.duracao_padrao())
+
+        for sala_id in Sala.objects.values_list('pk', flat=True):
+            calendario.ocupado_sala[sala_id] = 0
+        disponibilidades = {}
+        for medico_id, dia_semana, hora_inicio, hora_fim in Disponibilidade.objects.values_list(
+            'medico_id', 'dia_semana', 'hora_inicio', 'hora_fim'
+        ):
+            disponibilidades.setdefault(medico_id, []).append((dia_semana, hora_inicio, hora_fim))
+        for medico_id, intervalos in disponibilidades.items():
+            calendario.definir_expediente(medico_id, intervalos)
+
+        fim = inicio + timedelta(days=calendario.dias)
+        for medico_id, sala_id, data_hora, minutos in Consulta.objects.filter(
+            data_hora__gt=inicio - agenda.DURACAO_MAXIMA, data_hora__lt=fim,
+        ).exclude(status='Cancelada').values_list('medico_id', 'sala_id', 'data_hora', 'duracao_minutos'):
+            calendario.ocupar(medico_id, sala_id, data_hora, minutos)
+        return calendario
+
+    # Conversão entre horários e bits
+
+    def indices(self, inicio, fim):
+        """Slots da grade que se sobrepõem a [inicio, fim), limitados à janela."""
+        i = (inicio - self.inicio) // self.duracao
+        j = -((self.inicio - fim) // self.duracao)  # arredonda para cima
+        return max(i, 0), min(j, self.total)
+
+    def bits(self, inicio, fim):
+        return _faixa(*self.indices(inicio, fim))
+
+    def horario(self, indice):
+        return timezone.localtime(self.inicio + indice * self.duracao)
+
+    def horarios(self, bits):
+        resultado = []
+        while bits:
+            menor = bits & -bits
+            resultado.append(self.horario(menor.bit_length() - 1))
+            bits ^= menor
+        return resultado
+
+    def janela(self, hora_inicio=None, hora_fim=None, dias_semana=None):
+        """Máscara dos slots de cada dia em [hora_inicio, hora_fim), opcionalmente só em alguns dias da semana (1 = segunda)."""
+        mascara = 0
+        for n in range(self.dias):
+            dia = self.inicio.date() + timedelta(days=n)
+            if dias_semana and dia.isoweekday() not in dias_semana:
+                continue
+            inicio = timezone.make_aware(datetime.combine(dia, hora_inicio or datetime.min.time()))
+            fim = (timezone.make_aware(datetime.combine(dia, hora_fim)) if hora_fim
+                   else timezone.make_aware(datetime.combine(dia + timedelta(days=1), datetime.min.time())))
+            mascara |= self.bits(inicio, fim)
+        return mascara
+
+    # Manutenção
+
+    def definir_expediente(self, medico_id, intervalos):
+        """Recalcula os bits de expediente do médico a partir de (dia_semana, hora_inicio, hora_fim)."""
+        bits = 0
+        for n in range(self.dias):
+            dia = self.inicio.date() + timedelta(days=n)
+            for dia_semana, hora_inicio, hora_fim in intervalos:
+                if dia_semana == dia.isoweekday():
+                    # Só os slots inteiramente dentro do expediente
+                    i = -((self.inicio - timezone.make_aware(datetime.combine(dia, hora_inicio))) // self.duracao)
+                    j = (timezone.make_aware(datetime.combine(dia, hora_fim)) - self.inicio) // self.duracao
+                    bits |= _faixa(max(i, 0), min(j, self.total))
+        self.expediente[medico_id] = bits
+        self.ocupado_medico.setdefault(medico_id, 0)
+
+    def ocupar(self, medico_id, sala_id, data_hora, duracao_minutos):
+        bits = self.bits(data_hora, data_hora + timedelta(minutes=duracao_minutos))
+        self.ocupado_medico[medico_id] = self.ocupado_medico.get(medico_id, 0) | bits
+        if sala_id is not None:
+            self.ocupado_sala[sala_id] = self.ocupado_sala.get(sala_id, 0) | bits
+
+    def liberar(self, medico_id, sala_id, data_hora, duracao_minutos):
+        # Consultas ativas do mesmo médico (ou da mesma sala) não se sobrepõem, então os bits são só desta
+        bits = ~self.bits(data_hora, data_hora + timedelta(minutes=duracao_minutos))
+        if medico_id in self.ocupado_medico:
+            self.ocupado_medico[medico_id] &= bits
+        if sala_id in self.ocupado_sala:
+            self.ocupado_sala[sala_id] &= bits
+
+    # Consultas
+
+    def medico_livre(self, medico_id):
+        """Slots em que o médico atende e não tem consulta."""
+        return self.expediente.get(medico_id, 0) & ~self.ocupado_medico.get(medico_id, 0)
+
+    def alguma_sala_livre(self):
+        livres = 0
+        for ocupado in self.ocupado_sala.values():
+            livres |= ~ocupado
+        return livres & self.todos
+
+    def agendaveis(self, medico_id):
+        """Slots em que o médico está livre E há alguma sala livre."""
+        return self.medico_livre(medico_id) & self.alguma_sala_livre()
+
+    def todos_livres(self, medico_ids):
+        bits = self.todos
+        for medico_id in medico_ids:
+            bits &= self.medico_livre(medico_id)
+        return bits
+
+    def algum_livre(self, medico_ids):
+        bits = 0
+        for medico_id in medico_ids:
+            bits |= self.medico_livre(medico_id)
+        return bits
@@ -4,4 +4,6 @@ from dependency_injector import containers, providers
 from . import services
 
 class AppContainer(containers.DeclarativeContainer):
-    notification_service = providers.Singleton(services.NotificationService)
\ No newline at end of file
+    # Gateway que de fato entrega a mensagem (e-mail/SMS); usado pelo worker da caixa de saída
+    notification_gateway = providers.Singleton(services.NotificationService)
+    notification_service = providers.Singleton(services.OutboxNotificationService)
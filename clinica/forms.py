@@ -1,6 +1,65 @@
+from datetime import datetime, timedelta
+
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
-from .models import Usuario, Paciente, Medico, Especialidade, Consulta, Disponibilidade, RegistroProntuario
+from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.html import format_html
+from . import pacientes
+from .alocacao import AlocadorSalas
+from .models import Usuario, Convenio, Paciente, Medico, Especialidade, Consulta, Disponibilidade, RegistroProntuario, Sala
+from .models import normalizar_cpf, normalizar_nome
+
+
+class AutocompletarWidget(forms.Widget):
+    """
+    Caixa de texto com sugestões buscadas em `url` (JSON com 'resultados': [{'id', 'texto'}])
+    enquanto se digita; o formulário recebe só o id escolhido.
+
+    Ao contrário do Select, não percorre o queryset do ModelChoiceField: apenas o item
+    já selecionado é lido, para mostrar o rótulo.
+    """
+
+    class Media:
+        js = ['clinica/autocompletar.js']
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def _rotulo(self, value):
+        if value in (None, ''):
+            return ''
+        try:
+            objeto = self.choices.queryset.filter(pk=value).first()
+        except (ValueError, TypeError):
+            return ''
+        return self.choices.field.label_from_instance(objeto) if objeto else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        id_ = attrs.get('id') or f'id_{name}'
+        return format_html(
+            '<input type="hidden" name="{}" id="{}" value="{}">'
+            '<input type="search" id="{}_texto" list="{}_lista" class="form-control" autocomplete="off"'
+            ' placeholder="Nome ou CPF" data-autocompletar="{}" data-url="{}" value="{}"{}>'
+            '<datalist id="{}_lista"></datalist>',
+            name, id_, '' if value is None else value,
+            id_, id_, id_, self.url, self._rotulo(value), ' required' if self.is_required else '',
+            id_,
+        )
+
+    def id_for_label(self, id_):
+        return f'{id_}_texto' if id_ else id_
+
+
+def _limpar_cpf(cpf, excluir=None):
+    cpf = normalizar_cpf(cpf)
+    if len(cpf) != 11:
+        raise forms.ValidationError('Informe os 11 dígitos do CPF.')
+    if Paciente.objects.filter(cpf=cpf).exclude(pk=excluir).exists():
+        raise forms.ValidationError('Já existe um paciente com este CPF.')
+    return cpf
 
 
 class PacienteCreationForm(UserCreationForm):
@@ -12,6 +71,9 @@ class PacienteCreationForm(UserCreationForm):
         model = Usuario
         fields = UserCreationForm.Meta.fields + ('email',)
 
+    def clean_cpf(self):
+        return _limpar_cpf(self.cleaned_data['cpf'])
+
     def save(self, commit=True):
         usuario = super().save(commit=False)
         usuario.tipo_usuario = 'paciente'
@@ -34,6 +96,12 @@ class MedicoUserCreationForm(UserCreationForm):
         widget=forms.CheckboxSelectMultiple,
         required=False
     )
+    convenios = forms.ModelMultipleChoiceField(
+        queryset=Convenio.objects.all(),
+        widget=forms.CheckboxSelectMultiple,
+        required=False,
+        label='Convênios aceitos',
+    )
 
     class Meta(UserCreationForm.Meta):
         model = Usuario
@@ -52,6 +120,7 @@ class MedicoUserCreationForm(UserCreationForm):
         )
 
         medico.especialidades.set(self.cleaned_data.get('especialidades'))
+        medico.convenios.set(self.cleaned_data.get('convenios'))
 
         return usuario
 
@@ -62,21 +131,63 @@ class MedicoUpdateForm(forms.ModelForm):
         required=False
     )
 
+    convenios = forms.ModelMultipleChoiceField(
+        queryset=Convenio.objects.all(),
+        widget=forms.CheckboxSelectMultiple,
+        required=False,
+        label='Convênios aceitos',
+    )
+
     class Meta:
         model = Medico
-        fields = ['nome_completo', 'crm', 'especialidades']
+        fields = ['nome_completo', 'crm', 'especialidades', 'convenios']
 
 
 class ConsultaForm(forms.ModelForm):
     class Meta:
         model = Consulta
-        fields = ['paciente', 'medico', 'sala', 'data_hora', 'status']
+        fields = ['paciente', 'medico', 'sala', 'data_hora', 'duracao_minutos', 'status']
         widgets = {
+            # Os pacientes são muitos para um <select>: sugestões por nome ou CPF (ver pacientes.py)
+            'paciente': AutocompletarWidget(reverse_lazy('paciente_autocompletar')),
             'data_hora': forms.DateTimeInput(
                 attrs={'type': 'datetime-local'},
                 format='%Y-%m-%dT%H:%M'
             ),
         }
+        help_texts = {
+            'sala': 'Deixe em branco para alocar uma sala livre automaticamente.',
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['sala'].required = False
+        self.fields['paciente'].label_from_instance = lambda paciente: pacientes.rotulo(paciente.nome_completo, paciente.cpf)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        medico = cleaned_data.get('medico')
+        sala = cleaned_data.get('sala')
+        data_hora = cleaned_data.get('data_hora')
+        duracao = cleaned_data.get('duracao_minutos')
+        if not (medico and data_hora and duracao) or cleaned_data.get('status') == 'Cancelada':
+            return cleaned_data
+
+        fim = data_hora + timedelta(minutes=duracao)
+        alocador = AlocadorSalas.do_dia(data_hora, excluir=self.instance.pk)
+
+        if not alocador.medico_livre(medico.pk, data_hora, fim):
+            self.add_error('data_hora', 'O médico já possui uma consulta que se sobrepõe a este horário.')
+
+        if sala is None:
+            sala_id = alocador.escolher(data_hora, fim, medico_id=medico.pk)
+            if sala_id is None:
+                self.add_error('sala', 'Não há salas livres para este horário.')
+            else:
+                cleaned_data['sala'] = Sala.objects.get(pk=sala_id)
+        elif not alocador.sala_livre(sala.pk, data_hora, fim):
+            self.add_error('sala', 'A sala já está ocupada em parte deste horário.')
+        return cleaned_data
 
 
 class DisponibilidadeForm(forms.ModelForm):
@@ -119,4 +230,163 @@ class PacienteUpdateForm(forms.ModelForm):
                 attrs={'type': 'date'},
                 format='%Y-%m-%d'
             ),
-        }
\ No newline at end of file
+        }
+
+    def clean_cpf(self):
+        return _limpar_cpf(self.cleaned_data['cpf'], excluir=self.instance.pk)
+
+# Filtros das listagens do painel de gerenciamento
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+
+
+class ConsultaFiltroForm(forms.Form):
+    medico = forms.ModelChoiceField(queryset=Medico.objects.order_by('nome_completo'), required=False, label='Médico')
+    paciente = forms.CharField(required=False, label='Paciente (nome ou CPF)')
+    sala = forms.ModelChoiceField(queryset=Sala.objects.order_by('nome'), required=False)
+    status = forms.ChoiceField(choices=[('', 'Todos')] + Consulta.STATUS_CHOICES, required=False)
+    data_inicio = forms.DateField(required=False, label='De', widget=forms.DateInput(attrs={'type': 'date'}))
+    data_fim = forms.DateField(required=False, label='Até', widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def filtrar(self, queryset):
+        if not self.is_valid():
+            return queryset
+        dados = self.cleaned_data
+        if dados['medico']:
+            queryset = queryset.filter(medico=dados['medico'])
+        if dados['paciente']:
+            queryset = queryset.filter(pacientes.filtro(dados['paciente'], 'paciente__'))
+        if dados['sala']:
+            queryset = queryset.filter(sala=dados['sala'])
+        if dados['status']:
+            queryset = queryset.filter(status=dados['status'])
+        # Intervalos em data_hora (e não data_hora__date) para aproveitar os índices
+        if dados['data_inicio']:
+            queryset = queryset.filter(data_hora__gte=_inicio_do_dia(dados['data_inicio']))
+        if dados['data_fim']:
+            queryset = queryset.filter(data_hora__lt=_inicio_do_dia(dados['data_fim'] + timedelta(days=1)))
+        return queryset
+
+
+class PacienteFiltroForm(forms.Form):
+    busca = forms.CharField(required=False, label='Nome ou CPF')
+    convenio = forms.ModelChoiceField(queryset=Convenio.objects.order_by('nome'), required=False, label='Convênio')
+
+    def filtrar(self, queryset):
+        if not self.is_valid():
+            return queryset
+        if self.cleaned_data['busca']:
+            queryset = queryset.filter(pacientes.filtro(self.cleaned_data['busca']))
+        if self.cleaned_data['convenio']:
+            queryset = queryset.filter(convenio=self.cleaned_data['convenio'])
+        return queryset
+
+
+class DisponibilidadeFiltroForm(forms.Form):
+    medico = forms.ModelChoiceField(queryset=Medico.objects.order_by('nome_completo'), required=False, label='Médico')
+    dia_semana = forms.TypedChoiceField(
+        choices=[('', 'Todos')] + DisponibilidadeForm.DIA_SEMANA_CHOICES,
+        coerce=int, empty_value=None, required=False, label='Dia da semana',
+    )
+
+    def filtrar(self, queryset):
+        if not self.is_valid():
+            return queryset
+        if self.cleaned_data['medico']:
+            queryset = queryset.filter(medico=self.cleaned_data['medico'])
+        if self.cleaned_data['dia_semana']:
+            queryset = queryset.filter(dia_semana=self.cleaned_data['dia_semana'])
+        return queryset
+
+
+class MedicoFiltroForm(forms.Form):
+    especialidade = forms.ModelChoiceField(
+        queryset=Especialidade.objects.order_by('nome'), required=False, empty_label='Todas',
+    )
+    nome = forms.CharField(required=False, label='Nome')
+
+    def filtrar(self, queryset):
+        if not self.is_valid():
+            return queryset
+        if self.cleaned_data['especialidade']:
+            queryset = queryset.filter(especialidades=self.cleaned_data['especialidade'])
+        if self.cleaned_data['nome']:
+            # Faixa no nome normalizado, como na busca de pacientes (pacientes.py): istartswith vira
+            # LIKE, que o SQLite não consegue atender pelo índice
+            nome = normalizar_nome(self.cleaned_data['nome'])
+            queryset = queryset.filter(nome_busca__gte=nome, nome_busca__lt=nome + '\uffff')
+        return queryset
+
+
+class ProximosHorariosForm(forms.Form):
+    especialidade = forms.ModelChoiceField(queryset=Especialidade.objects.order_by('nome'))
+    convenio = forms.ModelChoiceField(
+        queryset=Convenio.objects.order_by('nome'), required=False, label='Convênio', empty_label='Particular / qualquer',
+    )
+    hora_inicio = forms.TimeField(required=False, label='A partir das', widget=forms.TimeInput(attrs={'type': 'time'}))
+    hora_fim = forms.TimeField(required=False, label='Até as', widget=forms.TimeInput(attrs={'type': 'time'}))
+    quantidade = forms.IntegerField(min_value=1, max_value=50, required=False, initial=10)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        hora_inicio, hora_fim = cleaned_data.get('hora_inicio'), cleaned_data.get('hora_fim')
+        if hora_inicio and hora_fim and hora_inicio >= hora_fim:
+            raise forms.ValidationError('O início da janela deve ser anterior ao fim.')
+        return cleaned_data
+
+
+class ExportacaoForm(forms.Form):
+    formato = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')], required=False)
+    data_inicio = forms.DateField(required=False, label='De')
+    data_fim = forms.DateField(required=False, label='Até')
+    convenio = forms.ModelChoiceField(queryset=Convenio.objects.all(), required=False, label='Convênio')
+    desde = forms.DateTimeField(required=False, label='Alteradas desde')
+
+    def filtros(self):
+        return {campo: self.cleaned_data[campo] for campo in ('data_inicio', 'data_fim', 'convenio', 'desde')}
+
+
+class RelatorioForm(forms.Form):
+    data_inicio = forms.DateField(required=False, label='De', widget=forms.DateInput(attrs={'type': 'date'}))
+    data_fim = forms.DateField(required=False, label='Até', widget=forms.DateInput(attrs={'type': 'date'}))
+    agrupamento = forms.ChoiceField(choices=[('dia', 'Por dia'), ('hora', 'Por hora')], required=False)
+
+    # Sem datas, os últimos 30 dias; períodos maiores que um ano são recusados
+    DIAS_PADRAO = 30
+    DIAS_MAXIMO = 366
+
+    def clean(self):
+        cleaned_data = super().clean()
+        data_fim = cleaned_data.get('data_fim') or timezone.localdate()
+        data_inicio = cleaned_data.get('data_inicio') or data_fim - timedelta(days=self.DIAS_PADRAO - 1)
+        if data_inicio > data_fim:
+            raise forms.ValidationError('A data inicial deve ser anterior à final.')
+        if (data_fim - data_inicio).days >= self.DIAS_MAXIMO:
+            raise forms.ValidationError(f'O período pode ter no máximo {self.DIAS_MAXIMO} dias.')
+        cleaned_data.update(data_inicio=data_inicio, data_fim=data_fim, agrupamento=cleaned_data.get('agrupamento') or 'dia')
+        return cleaned_data
+
+
+class BuscaProntuarioForm(forms.Form):
+    q = forms.CharField(label='Buscar nos prontuários', max_length=200)
+
+
+# API JSON (ver api.py)
+
+class AgendamentoApiForm(forms.Form):
+    medico = forms.IntegerField(min_value=1)
+    # ISO 8601, como os horários devolvidos pela API (ex.: 2025-03-10T14:30:00-04:00)
+    inicio = forms.DateTimeField()
+
+
+class ConsultasApiFiltroForm(forms.Form):
+    status = forms.ChoiceField(choices=[('', 'Todos')] + Consulta.STATUS_CHOICES, required=False)
+    futuras = forms.BooleanField(required=False)
+
+    def filtrar(self, queryset):
+        if self.cleaned_data['status']:
+            queryset = queryset.filter(status=self.cleaned_data['status'])
+        if self.cleaned_data['futuras']:
+            queryset = queryset.filter(data_hora__gt=timezone.now())
+        return queryset
@@ -0,0 +1,297 @@
+# Importação em massa de pacientes, médicos e disponibilidades a partir de CSV
+
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from . import agenda, resumos, versoes
+from .models import Convenio, Disponibilidade, Especialidade, Medico, Paciente, Usuario, normalizar_cpf, normalizar_nome
+
+
+class LinhaInvalida(Exception):
+    pass
+
+
+def _obrigatorio(linha, campo):
+    valor = (linha.get(campo) or '').strip()
+    if not valor:
+        raise LinhaInvalida(f'Campo "{campo}" é obrigatório.')
+    return valor
+
+
+def _data(valor):
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    raise LinhaInvalida(f'Data inválida: "{valor}".')
+
+
+def _hora(valor):
+    try:
+        return datetime.strptime(valor, '%H:%M').time()
+    except ValueError:
+        raise LinhaInvalida(f'Hora inválida: "{valor}".')
+
+
+def _hash_senha(senha):
+    # Senha vazia gera uma senha inutilizável (o usuário define a sua depois)
+    return make_password(senha or None)
+
+
+class Importador:
+    """
+    Lê o CSV em blocos, valida cada linha e grava os blocos válidos com bulk_create.
+
+    Subclasses implementam `validar(linha)` (retorna os dados limpos ou levanta
+    LinhaInvalida), `conflitos(bloco)` (unicidade contra o banco) e `gravar(bloco)`.
+    """
+    colunas = ()
+
+    def __init__(self, tamanho_lote=1000, processos=1, simular=False):
+        self.tamanho_lote = tamanho_lote
+        self.processos = processos
+        self.simular = simular
+        self.erros = []
+        self.importadas = 0
+        self._vistos = {}
+
+    def unico_no_arquivo(self, campo, valor):
+        vistos = self._vistos.setdefault(campo, set())
+        if valor in vistos:
+            raise LinhaInvalida(f'{campo} "{valor}" repetido no arquivo.')
+        vistos.add(valor)
+
+    def importar(self, arquivo):
+        leitor = csv.DictReader(arquivo)
+        faltando = set(self.colunas) - set(leitor.fieldnames or ())
+        if faltando:
+            raise LinhaInvalida(f'Colunas ausentes no cabeçalho: {", ".join(sorted(faltando))}.')
+
+        numeradas = enumerate(leitor, start=2)
+        executor = ProcessPoolExecutor(self.processos) if self.processos > 1 and not self.simular else None
+        try:
+            while linhas := list(islice(numeradas, self.tamanho_lote)):
+                bloco = []
+                for numero, linha in linhas:
+                    try:
+                        bloco.append((numero, self.validar(linha)))
+                    except LinhaInvalida as e:
+                        self.erros.append((numero, str(e)))
+
+                invalidas = self.conflitos(bloco)
+                for numero, erro in invalidas.items():
+                    self.erros.append((numero, erro))
+                bloco = [(numero, dados) for numero, dados in bloco if numero not in invalidas]
+
+                if bloco and not self.simular:
+                    self.preparar(bloco, executor)
+                    with transaction.atomic():
+                        self.gravar([dados for _, dados in bloco])
+                self.importadas += len(bloco)
+        finally:
+            if executor:
+                executor.shutdown()
+        if not self.simular:
+            self.finalizar()
+        self.erros.sort()
+        return self.importadas
+
+    def finalizar(self):
+        pass
+
+    def preparar(self, bloco, executor):
+        pass
+
+    def validar(self, linha):
+        raise NotImplementedError
+
+    def conflitos(self, bloco):
+        return {}
+
+    def gravar(self, bloco):
+        raise NotImplementedError
+
+
+class _ImportadorDeUsuarios(Importador):
+    tipo_usuario = None
+
+    def validar_usuario(self, linha):
+        username = _obrigatorio(linha, 'username')
+        self.unico_no_arquivo('username', username)
+        return {
+            'username': username,
+            'email': (linha.get('email') or '').strip(),
+            'senha': linha.get('senha') or '',
+            'nome_completo': _obrigatorio(linha, 'nome_completo'),
+        }
+
+    def conflitos_de_usuario(self, bloco):
+        existentes = set(Usuario.objects.filter(
+            username__in=[dados['username'] for _, dados in bloco]
+        ).values_list('username', flat=True))
+        return {
+            numero: f'Usuário "{dados["username"]}" já existe.'
+            for numero, dados in bloco if dados['username'] in existentes
+        }
+
+    def preparar(self, bloco, executor):
+        senhas = [dados['senha'] for _, dados in bloco]
+        hashes = executor.map(_hash_senha, senhas, chunksize=16) if executor else map(_hash_senha, senhas)
+        for (_, dados), senha in zip(bloco, hashes):
+            dados['senha'] = senha
+
+    def criar_usuarios(self, bloco, **extras):
+        return Usuario.objects.bulk_create([
+            Usuario(
+                username=dados['username'], email=dados['email'], password=dados['senha'],
+                tipo_usuario=self.tipo_usuario, **extras,
+            )
+            for dados in bloco
+        ])
+
+
+class ImportadorDePacientes(_ImportadorDeUsuarios):
+    colunas = ('username', 'nome_completo', 'cpf', 'data_nascimento')
+    tipo_usuario = 'paciente'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.convenios = {nome.lower(): pk for pk, nome in Convenio.objects.values_list('pk', 'nome')}
+
+    def validar(self, linha):
+        dados = self.validar_usuario(linha)
+        dados['cpf'] = normalizar_cpf(_obrigatorio(linha, 'cpf'))
+        if len(dados['cpf']) != 11:
+            raise LinhaInvalida(f'CPF "{linha["cpf"]}" inválido.')
+        self.unico_no_arquivo('cpf', dados['cpf'])
+        dados['data_nascimento'] = _data(_obrigatorio(linha, 'data_nascimento'))
+        convenio = (linha.get('convenio') or '').strip()
+        if convenio and convenio.lower() not in self.convenios:
+            raise LinhaInvalida(f'Convênio "{convenio}" não cadastrado.')
+        dados['convenio_id'] = self.convenios.get(convenio.lower()) if convenio else None
+        return dados
+
+    def conflitos(self, bloco):
+        invalidas = self.conflitos_de_usuario(bloco)
+        existentes = set(Paciente.objects.filter(
+            cpf__in=[dados['cpf'] for _, dados in bloco]
+        ).values_list('cpf', flat=True))
+        for numero, dados in bloco:
+            if dados['cpf'] in existentes:
+                invalidas.setdefault(numero, f'CPF "{dados["cpf"]}" já cadastrado.')
+        return invalidas
+
+    def finalizar(self):
+        # bulk_create não dispara sinais: recalcula os totais do painel
+        resumos.recalcular_contadores()
+
+    def gravar(self, bloco):
+        usuarios = self.criar_usuarios(bloco)
+        Paciente.objects.bulk_create([
+            Paciente(
+                usuario=usuario, nome_completo=dados['nome_completo'], cpf=dados['cpf'],
+                nome_busca=normalizar_nome(dados['nome_completo']),
+                data_nascimento=dados['data_nascimento'], convenio_id=dados['convenio_id'],
+            )
+            for usuario, dados in zip(usuarios, bloco)
+        ])
+
+
+class ImportadorDeMedicos(_ImportadorDeUsuarios):
+    colunas = ('username', 'nome_completo', 'crm')
+    tipo_usuario = 'medico'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.especialidades = {nome.lower(): pk for pk, nome in Especialidade.objects.values_list('pk', 'nome')}
+
+    def validar(self, linha):
+        dados = self.validar_usuario(linha)
+        dados['crm'] = _obrigatorio(linha, 'crm')
+        self.unico_no_arquivo('crm', dados['crm'])
+        nomes = [nome.strip() for nome in (linha.get('especialidades') or '').split(';') if nome.strip()]
+        desconhecidas = [nome for nome in nomes if nome.lower() not in self.especialidades]
+        if desconhecidas:
+            raise LinhaInvalida(f'Especialidade(s) não cadastrada(s): {", ".join(desconhecidas)}.')
+        dados['especialidades'] = [self.especialidades[nome.lower()] for nome in nomes]
+        return dados
+
+    def conflitos(self, bloco):
+        invalidas = self.conflitos_de_usuario(bloco)
+        existentes = set(Medico.objects.filter(
+            crm__in=[dados['crm'] for _, dados in bloco]
+        ).values_list('crm', flat=True))
+        for numero, dados in bloco:
+            if dados['crm'] in existentes:
+                invalidas.setdefault(numero, f'CRM "{dados["crm"]}" já cadastrado.')
+        return invalidas
+
+    def gravar(self, bloco):
+        usuarios = self.criar_usuarios(bloco, is_staff=True)
+        medicos = Medico.objects.bulk_create([
+            Medico(
+                usuario=usuario, nome_completo=dados['nome_completo'],
+                nome_busca=normalizar_nome(dados['nome_completo']), crm=dados['crm'],
+            )
+            for usuario, dados in zip(usuarios, bloco)
+        ])
+        Medico.especialidades.through.objects.bulk_create([
+            Medico.especialidades.through(medico_id=medico.pk, especialidade_id=especialidade_id)
+            for medico, dados in zip(medicos, bloco)
+            for especialidade_id in dados['especialidades']
+        ])
+
+    def finalizar(self):
+        # bulk_create não dispara sinais: invalida a lista de médicos em cache e recalcula os totais do painel
+        versoes.invalidar('medicos')
+        resumos.recalcular_contadores()
+
+
+class ImportadorDeDisponibilidades(Importador):
+    colunas = ('crm', 'dia_semana', 'hora_inicio', 'hora_fim')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.medicos = dict(Medico.objects.values_list('crm', 'pk'))
+        self._medicos_afetados = set()
+
+    def validar(self, linha):
+        crm = _obrigatorio(linha, 'crm')
+        if crm not in self.medicos:
+            raise LinhaInvalida(f'Médico com CRM "{crm}" não cadastrado.')
+        try:
+            dia_semana = int(_obrigatorio(linha, 'dia_semana'))
+        except ValueError:
+            dia_semana = 0
+        if not 1 <= dia_semana <= 7:
+            raise LinhaInvalida('Dia da semana deve ser um número de 1 (segunda) a 7 (domingo).')
+        hora_inicio = _hora(_obrigatorio(linha, 'hora_inicio'))
+        hora_fim = _hora(_obrigatorio(linha, 'hora_fim'))
+        if hora_inicio >= hora_fim:
+            raise LinhaInvalida('Hora de início deve ser anterior à hora de fim.')
+        return {
+            'medico_id': self.medicos[crm], 'dia_semana': dia_semana,
+            'hora_inicio': hora_inicio, 'hora_fim': hora_fim,
+        }
+
+    def gravar(self, bloco):
+        Disponibilidade.objects.bulk_create([Disponibilidade(**dados) for dados in bloco])
+        self._medicos_afetados.update(dados['medico_id'] for dados in bloco)
+
+    def finalizar(self):
+        # bulk_create não dispara sinais: materializa a agenda dos médicos afetados
+        for medico_id in sorted(self._medicos_afetados):
+            agenda.materializar_medico(medico_id)
+
+
+IMPORTADORES = {
+    'pacientes': ImportadorDePacientes,
+    'medicos': ImportadorDeMedicos,
+    'disponibilidades': ImportadorDeDisponibilidades,
+}
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from clinica import analises
+
+
+class Command(BaseCommand):
+    help = 'Atualiza as tabelas de análise (consultas por hora, médico, sala, convênio e status) usadas nos relatórios.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help='Apaga e recalcula tudo (necessário, por exemplo, depois de mudar o convênio de pacientes).',
+        )
+        parser.add_argument('--bloco', type=int, default=analises.TAMANHO_BLOCO, help='Consultas processadas por vez.')
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            linhas = analises.reconstruir(options['bloco'])
+            self.stdout.write(self.style.SUCCESS(f'Tabelas de análise reconstruídas ({linhas} linhas).'))
+        else:
+            linhas = analises.atualizar(options['bloco'])
+            self.stdout.write(self.style.SUCCESS(f'Tabelas de análise atualizadas ({linhas} linhas alteradas).'))
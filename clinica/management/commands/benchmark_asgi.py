@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from clinica import metricas
+from clinica.models import HorarioAgenda, Medico, Paciente
+from clinica.sintetico import ClinicaSintetica
+
+# Cada cenário roda em um processo próprio: VIEWS_ASSINCRONAS é lido quando as URLs são carregadas
+CENARIOS = {
+    # Views síncronas em um servidor WSGI com um número fixo de threads (ex.: gunicorn --threads N)
+    'wsgi': {'VIEWS_ASSINCRONAS': '0'},
+    # Views assíncronas no ASGIHandler (o mesmo caminho de uvicorn config.asgi:application), sem rede
+    'asgi': {'VIEWS_ASSINCRONAS': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara o fluxo do paciente (lista de médicos, agenda e agendamento) com views síncronas em WSGI e '
+        'assíncronas em ASGI, com cada vez mais pacientes simultâneos, em bancos SQLite temporários.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacientes', type=int, nargs='+', default=[1, 10, 50, 100], help='Níveis de concorrência.')
+        parser.add_argument('--segundos', type=float, default=5, help='Duração de cada nível.')
+        parser.add_argument('--workers', type=int, default=4, help='Threads do servidor WSGI.')
+        parser.add_argument('--limite-ms', type=float, default=500, help='p95 aceitável para contar o nível como atendido.')
+        parser.add_argument('--medicos', type=int, default=20)
+        parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=list(CENARIOS))
+        parser.add_argument('--json', action='store_true', help='Escreve os resultados em JSON.')
+        # Uso interno: executa um cenário no processo atual (chamado em um subprocesso por cenário)
+        parser.add_argument('--executar', choices=CENARIOS, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['executar']:
+            self.stdout.write(json.dumps(self.executar(options)))
+            return
+
+        resultados = {}
+        with tempfile.TemporaryDirectory() as pasta:
+            for nome in options['cenarios']:
+                self.stderr.write(f'Cenário "{nome}"...')
+                ambiente = {**os.environ, **CENARIOS[nome], 'DB_NOME': os.path.join(pasta, f'{nome}.sqlite3')}
+                argumentos = [
+                    sys.executable, '-m', 'django', 'benchmark_asgi', '--executar', nome,
+                    '--segundos', str(options['segundos']), '--workers', str(options['workers']),
+                    '--medicos', str(options['medicos']), '--pacientes', *map(str, options['pacientes']),
+                ]
+                processo = subprocess.run(argumentos, env=ambiente, cwd=settings.BASE_DIR, capture_output=True, text=True)
+                if processo.returncode:
+                    raise CommandError(f'O cenário "{nome}" falhou:\n{processo.stderr}')
+                resultados[nome] = json.loads(processo.stdout.strip().splitlines()[-1])
+
+        for nome, niveis in resultados.items():
+            atendidos = [nivel['pacientes'] for nivel in niveis if nivel['p95_ms'] <= options['limite_ms'] and not nivel['erros']]
+            resultados[nome] = {'niveis': niveis, 'pacientes_atendidos': max(atendidos, default=0)}
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        self.stdout.write(
+            f'{"cenário":<8} {"pacientes":>9} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"agendadas":>9} {"recusas":>8} {"erros":>6} {"threads":>7}'
+        )
+        for nome, resultado in resultados.items():
+            for nivel in resultado['niveis']:
+                self.stdout.write(
+                    f'{nome:<8} {nivel["pacientes"]:>9} {nivel["por_segundo"]:>8.1f} {nivel["p50_ms"]:>8.1f} '
+                    f'{nivel["p95_ms"]:>8.1f} {nivel["p99_ms"]:>8.1f} {nivel["agendadas"]:>9} {nivel["recusas"]:>8} '
+                    f'{nivel["erros"]:>6} {nivel["threads"]:>7}'
+                )
+        for nome, resultado in resultados.items():
+            self.stdout.write(
+                f'{nome}: até {resultado["pacientes_atendidos"]} pacientes simultâneos com p95 <= {options["limite_ms"]:.0f} ms.'
+            )
+
+    # Execução de um cenário (no subprocesso)
+
+    def executar(self, options):
+        # O AsyncClient sempre envia Host: testserver (como o test runner, que faz o mesmo ajuste)
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        call_command('migrate', verbosity=0)
+        maior = max(options['pacientes'])
+        ClinicaSintetica(medicos=options['medicos'], pacientes=maior, anos=0.05, ocupacao=0.3).gerar()
+        self.medicos = list(Medico.objects.values_list('pk', flat=True))
+        self.pacientes = list(Paciente.objects.select_related('usuario').order_by('pk')[:maior])
+        self.horarios = {}
+        for medico_id, inicio in HorarioAgenda.objects.filter(
+            inicio__gt=timezone.now(), ocupado=False, salas_livres__gt=0,
+        ).values_list('medico_id', 'inicio'):
+            self.horarios.setdefault(medico_id, []).append(timezone.localtime(inicio).strftime('%Y-%m-%d-%H-%M'))
+        connection.close()
+
+        niveis = []
+        for quantidade in options['pacientes']:
+            if options['executar'] == 'asgi':
+                medicoes = asyncio.run(self.carga_asgi(quantidade, options['segundos']))
+            else:
+                medicoes = self.carga_wsgi(quantidade, options['segundos'], options['workers'])
+            niveis.append(self.resumir(quantidade, options['segundos'], *medicoes))
+        return niveis
+
+    def passos(self, aleatorio):
+        """As três requisições de uma visita: lista de médicos, agenda de um médico e agendamento."""
+        medico_id = aleatorio.choice(self.medicos)
+        horario = aleatorio.choice(self.horarios.get(medico_id) or ['2000-01-01-00-00'])
+        return [
+            ('get', reverse('listar_medicos')),
+            ('get', reverse('detalhes_medico', kwargs={'medico_id': medico_id})),
+            ('post', reverse('agendar_consulta', kwargs={'medico_id': medico_id, 'horario_str': horario})),
+        ]
+
+    @staticmethod
+    def classificar(resposta, contagem):
+        if resposta.status_code >= 400:
+            contagem['erros'] += 1
+        elif resposta.status_code == 302 and resposta.url == reverse('dashboard_redirect'):
+            contagem['agendadas'] += 1
+        elif resposta.status_code == 302:
+            contagem['recusas'] += 1  # horário disputado: faz parte da carga
+
+    def carga_wsgi(self, quantidade, segundos, workers):
+        # Cada paciente é uma thread, mas só `workers` requisições são atendidas ao mesmo tempo;
+        # o tempo na fila entra na latência, como em um servidor com threads fixas
+        servidor = threading.Semaphore(workers)
+        latencias, contagem, lock = [], {'agendadas': 0, 'recusas': 0, 'erros': 0}, threading.Lock()
+        fim = time.perf_counter() + segundos
+        pico = [threading.active_count()]
+
+        def paciente(modelo, aleatorio):
+            cliente = Client()
+            cliente.force_login(modelo.usuario)
+            while time.perf_counter() < fim:
+                for metodo, url in self.passos(aleatorio):
+                    inicio = time.perf_counter()
+                    with servidor:
+                        try:
+                            resposta = getattr(cliente, metodo)(url)
+                        except Exception:
+                            resposta = None
+                    with lock:
+                        latencias.append(time.perf_counter() - inicio)
+                        if resposta is None:
+                            contagem['erros'] += 1
+                        else:
+                            self.classificar(resposta, contagem)
+                        pico[0] = max(pico[0], threading.active_count())
+            connection.close()
+
+        threads = [
+            threading.Thread(target=paciente, args=(modelo, random.Random(n)))
+            for n, modelo in enumerate(self.pacientes[:quantidade])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Threads do servidor: as `workers` que atenderiam as requisições
+        return latencias, contagem, min(workers, quantidade)
+
+    async def carga_asgi(self, quantidade, segundos):
+        latencias, contagem = [], {'agendadas': 0, 'recusas': 0, 'erros': 0}
+        fim = time.perf_counter() + segundos
+        pico = [threading.active_count()]
+
+        async def paciente(modelo, aleatorio):
+            cliente = AsyncClient()
+            await cliente.aforce_login(modelo.usuario)
+            while time.perf_counter() < fim:
+                for metodo, url in self.passos(aleatorio):
+                    inicio = time.perf_counter()
+                    try:
+                        resposta = await getattr(cliente, metodo)(url)
+                    except Exception:
+                        resposta = None
+                    latencias.append(time.perf_counter() - inicio)
+                    if resposta is None:
+                        contagem['erros'] += 1
+                    else:
+                        self.classificar(resposta, contagem)
+                    pico[0] = max(pico[0], threading.active_count())
+
+        await asyncio.gather(*(
+            paciente(modelo, random.Random(n)) for n, modelo in enumerate(self.pacientes[:quantidade])
+        ))
+        # Threads do processo além da principal (executores do sync_to_async)
+        return latencias, contagem, pico[0] - 1
+
+    def resumir(self, quantidade, segundos, latencias, contagem, threads):
+        return {
+            'pacientes': quantidade,
+            'requisicoes': len(latencias),
+            'por_segundo': len(latencias) / segundos,
+            'p50_ms': metricas.percentil(latencias, 50) * 1000,
+            'p95_ms': metricas.percentil(latencias, 95) * 1000,
+            'p99_ms': metricas.percentil(latencias, 99) * 1000,
+            **contagem,
+            'threads': threads,
+        }
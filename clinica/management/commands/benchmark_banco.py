@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import time as hora
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.utils import timezone
+
+from clinica import agenda, agendamento, metricas
+from clinica.models import Disponibilidade, HorarioAgenda, Medico, Paciente, Sala, Usuario, normalizar_nome
+
+# Variáveis de ambiente de cada cenário (ver config/database.py); 'atual' usa a configuração do ambiente
+CENARIOS = {
+    # Como era antes de config/database.py: journal de rollback, fsync completo, cache padrão,
+    # uma conexão por requisição e transações DEFERRED
+    'antes': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_CACHE_SIZE': '-2000',
+        'SQLITE_MMAP_SIZE': '0',
+        'SQLITE_TRANSACTION_MODE': 'DEFERRED',
+        'DB_CONN_MAX_AGE': '0',
+    },
+    'atual': {},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede leituras e agendamentos por segundo sob carga concorrente em bancos SQLite temporários, '
+        'com a configuração antiga do banco e com a atual.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segundos', type=float, default=10, help='Duração da carga em cada cenário.')
+        parser.add_argument('--escritores', type=int, default=4, help='Threads que agendam consultas.')
+        parser.add_argument('--leitores', type=int, default=8, help='Threads que leem agendas e consultas.')
+        parser.add_argument('--medicos', type=int, default=10)
+        parser.add_argument('--pacientes', type=int, default=500)
+        parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=list(CENARIOS))
+        parser.add_argument('--json', action='store_true', help='Escreve os resultados em JSON.')
+        # Uso interno: executa um cenário no processo atual (chamado em um subprocesso por cenário)
+        parser.add_argument('--executar', choices=CENARIOS, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['executar']:
+            self.stdout.write(json.dumps(self.executar(options)))
+            return
+
+        resultados = {}
+        with tempfile.TemporaryDirectory() as pasta:
+            for nome in options['cenarios']:
+                self.stderr.write(f'Cenário "{nome}"...')
+                # Cada cenário roda em um processo novo: as configurações do banco são lidas na inicialização
+                ambiente = {**os.environ, **CENARIOS[nome], 'DB_NOME': os.path.join(pasta, f'{nome}.sqlite3')}
+                argumentos = [
+                    sys.executable, '-m', 'django', 'benchmark_banco', '--executar', nome,
+                    '--segundos', str(options['segundos']), '--escritores', str(options['escritores']),
+                    '--leitores', str(options['leitores']), '--medicos', str(options['medicos']),
+                    '--pacientes', str(options['pacientes']),
+                ]
+                processo = subprocess.run(argumentos, env=ambiente, cwd=settings.BASE_DIR, capture_output=True, text=True)
+                if processo.returncode:
+                    raise CommandError(f'O cenário "{nome}" falhou:\n{processo.stderr}')
+                resultados[nome] = json.loads(processo.stdout.strip().splitlines()[-1])
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        self.stdout.write(
+            f'{"cenário":<8} {"tipo":<8} {"ops/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"recusas":>8} {"erros":>6}'
+        )
+        for nome, resultado in resultados.items():
+            for tipo in ('leitura', 'escrita'):
+                dados = resultado[tipo]
+                self.stdout.write(
+                    f'{nome:<8} {tipo:<8} {dados["por_segundo"]:>8.1f} {dados["p50_ms"]:>8.1f} {dados["p95_ms"]:>8.1f} '
+                    f'{dados["p99_ms"]:>8.1f} {dados["recusas"]:>8} {dados["erros"]:>6}'
+                )
+        if 'antes' in resultados and 'atual' in resultados:
+            for tipo in ('leitura', 'escrita'):
+                antes = resultados['antes'][tipo]['por_segundo']
+                if antes:
+                    self.stdout.write(f'{tipo}: {resultados["atual"][tipo]["por_segundo"] / antes:.2f}x')
+
+    # Execução de um cenário (no subprocesso)
+
+    def executar(self, options):
+        call_command('migrate', verbosity=0)
+        medicos, pacientes, horarios = self.semear(options['medicos'], options['pacientes'])
+        connection.close()
+
+        fim = time.perf_counter() + options['segundos']
+        medicoes = {'leitura': [], 'escrita': []}
+
+        def ler():
+            medico = random.choice(medicos)
+            agenda.horarios_livres(medico, dias=7)
+            paciente_id = random.choice(pacientes)
+            list(Paciente.objects.get(pk=paciente_id).consulta_set.select_related('medico', 'sala').order_by('data_hora')[:20])
+
+        def escrever():
+            medico, inicio = random.choice(horarios)
+            agendamento.agendar_consulta(Paciente.objects.get(pk=random.choice(pacientes)), medico, inicio)
+
+        def trabalhar(tipo, operacao):
+            latencias, recusas, erros = [], 0, 0
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    operacao()
+                except agendamento.AgendamentoError:
+                    recusas += 1  # horário já ocupado: faz parte da disputa
+                except OperationalError:
+                    erros += 1
+                latencias.append(time.perf_counter() - inicio)
+                # Fim da "requisição": fecha a conexão ou a mantém, conforme CONN_MAX_AGE
+                close_old_connections()
+            connection.close()
+            medicoes[tipo].append((latencias, recusas, erros))
+
+        threads = [threading.Thread(target=trabalhar, args=('escrita', escrever)) for _ in range(options['escritores'])]
+        threads += [threading.Thread(target=trabalhar, args=('leitura', ler)) for _ in range(options['leitores'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        resultado = {'banco': {chave: os.environ.get(chave) for chave in CENARIOS['antes']}}
+        for tipo, partes in medicoes.items():
+            latencias = [latencia for parte in partes for latencia in parte[0]]
+            recusas = sum(parte[1] for parte in partes)
+            resultado[tipo] = {
+                'operacoes': len(latencias),
+                'por_segundo': (len(latencias) - recusas) / options['segundos'],
+                'p50_ms': metricas.percentil(latencias, 50) * 1000,
+                'p95_ms': metricas.percentil(latencias, 95) * 1000,
+                'p99_ms': metricas.percentil(latencias, 99) * 1000,
+                'recusas': recusas,
+                'erros': sum(parte[2] for parte in partes),
+            }
+        return resultado
+
+    def semear(self, quantidade_medicos, quantidade_pacientes):
+        # Salas de sobra: a disputa medida é pelo banco, não pelas salas
+        Sala.objects.bulk_create([Sala(nome=f'Sala {n}') for n in range(quantidade_medicos)])
+        medicos = []
+        for n in range(quantidade_medicos):
+            usuario = Usuario.objects.create(username=f'benchmark-medico{n}', tipo_usuario='medico')
+            medico = Medico.objects.create(usuario=usuario, nome_completo=f'Médico {n}', crm=f'BENCH{n}')
+            Disponibilidade.objects.bulk_create([
+                Disponibilidade(medico=medico, dia_semana=dia, hora_inicio=hora(8), hora_fim=hora(18)) for dia in range(1, 8)
+            ])
+            agenda.materializar_medico(medico.pk)
+            medicos.append(medico)
+
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(username=f'benchmark-paciente{n}', tipo_usuario='paciente') for n in range(quantidade_pacientes)
+        ])
+        Paciente.objects.bulk_create([
+            Paciente(
+                usuario=usuario, nome_completo=f'Paciente {n}', nome_busca=normalizar_nome(f'Paciente {n}'),
+                cpf=f'{n:011d}', data_nascimento='1990-01-01',
+            )
+            for n, usuario in enumerate(usuarios)
+        ])
+        por_id = {medico.pk: medico for medico in medicos}
+        horarios = [
+            (por_id[medico_id], inicio) for medico_id, inicio in
+            HorarioAgenda.objects.filter(inicio__gt=timezone.now()).values_list('medico_id', 'inicio')
+        ]
+        return medicos, [usuario.pk for usuario in usuarios], horarios
@@ -0,0 +1,314 @@
+import json
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from itertools import repeat
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clinica import agendamento, metricas, urls
+from clinica.models import (
+    Consulta, Convenio, Disponibilidade, Especialidade, HorarioAgenda, Medico, Paciente, RegistroProntuario, Sala,
+    Usuario,
+)
+
+
+def _host():
+    # O cliente de teste precisa de um host aceito por ALLOWED_HOSTS (com DEBUG, localhost é aceito)
+    for host in settings.ALLOWED_HOSTS:
+        if '*' not in host:
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def _resumo(latencias):
+    return {
+        'p50_ms': round(metricas.percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(metricas.percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(metricas.percentil(latencias, 99) * 1000, 2),
+        'media_ms': round(sum(latencias) / len(latencias) * 1000, 2) if latencias else 0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede todas as rotas de clinica/urls.py com o cliente de teste do Django (latência p50/p95/p99, consultas SQL '
+        'e pico de memória por requisição) e o fluxo de agendamento concorrente; resultado em JSON. '
+        'Grava consultas e sessões: use um banco de teste (ex.: o de gerar_clinica_sintetica).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=20, help='Requisições medidas por rota.')
+        parser.add_argument('--aquecimento', type=int, default=2, help='Requisições descartadas antes das medidas.')
+        parser.add_argument('--rotas', nargs='+', help='Mede só estas rotas (nomes de clinica/urls.py).')
+        parser.add_argument('--cache-frio', action='store_true', help='Esvazia o cache antes de cada requisição.')
+        parser.add_argument('--threads', type=int, default=4, help='Pacientes agendando ao mesmo tempo.')
+        parser.add_argument('--agendamentos', type=int, default=10, help='Agendamentos tentados por thread (0 desliga).')
+        parser.add_argument('--semente', type=int, default=0)
+        parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: saída padrão).')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior: mostra a variação do p95 por rota.')
+
+    def handle(self, *args, **options):
+        self.aleatorio = random.Random(options['semente'])
+        rotas = self.rotas()
+        nomes = {padrao.name for padrao in urls.urlpatterns}
+        faltando = nomes - {rota[0] for rota in rotas}
+        if faltando:
+            raise CommandError(f'Rotas sem cenário de medição: {", ".join(sorted(faltando))}.')
+        if options['rotas']:
+            desconhecidas = set(options['rotas']) - nomes
+            if desconhecidas:
+                raise CommandError(f'Rotas desconhecidas: {", ".join(sorted(desconhecidas))}.')
+            rotas = [rota for rota in rotas if rota[0] in options['rotas']]
+
+        resultado = {
+            'gerado_em': timezone.now().isoformat(),
+            'parametros': {
+                chave: options[chave] for chave in ('repeticoes', 'aquecimento', 'cache_frio', 'threads', 'agendamentos', 'semente')
+            },
+            'banco': {
+                'vendor': connection.vendor,
+                'consultas': Consulta.objects.count(),
+                'pacientes': Paciente.objects.count(),
+                'medicos': Medico.objects.count(),
+                'prontuarios': RegistroProntuario.objects.count(),
+            },
+            'rotas': {},
+        }
+        for nome, kwargs, usuario, metodo, parametros in rotas:
+            self.stderr.write(f'{nome}...')
+            resultado['rotas'][nome] = self.medir(nome, kwargs, usuario, metodo, parametros, options)
+        if options['agendamentos'] and (not options['rotas'] or 'agendar_consulta' in options['rotas']):
+            self.stderr.write('agendamento concorrente...')
+            resultado['agendamento_concorrente'] = self.agendar_em_paralelo(options['threads'], options['agendamentos'])
+
+        saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida + '\n')
+        else:
+            self.stdout.write(saida)
+        if options['comparar']:
+            self.comparar(options['comparar'], resultado)
+
+    # Cenários
+
+    def rotas(self):
+        """(nome, iterador de kwargs, usuário, método, parâmetros GET) de cada rota de clinica/urls.py."""
+        admin = Usuario.objects.filter(is_superuser=True).first()
+        ultima = Consulta.objects.filter(registroprontuario__isnull=False).select_related('medico', 'paciente').order_by('-data_hora').first()
+        if admin is None or ultima is None:
+            raise CommandError('O banco precisa de um superusuário e de consultas com prontuário (veja gerar_clinica_sintetica).')
+        medico, paciente = ultima.medico, ultima.paciente
+        sem_prontuario = Consulta.objects.filter(medico=medico, registroprontuario__isnull=True).order_by('-data_hora').first() or ultima
+        palavra = (ultima.registroprontuario.descricao_atendimento.split() or ['a'])[-1]
+        convenio, especialidade, sala = Convenio.objects.first(), Especialidade.objects.first(), Sala.objects.first()
+        disponibilidade = Disponibilidade.objects.first()
+        if None in (convenio, especialidade, sala, disponibilidade):
+            raise CommandError('O banco precisa de ao menos um convênio, uma especialidade, uma sala e uma disponibilidade.')
+        hoje = timezone.localdate()
+
+        def gerenciar(nome, **kwargs):
+            return nome, repeat(kwargs), admin, 'get', {}
+
+        return [
+            ('home', repeat({}), None, 'get', {}),
+            ('metricas', repeat({}), None, 'get', {}),
+            ('login', repeat({}), None, 'get', {}),
+            ('logout', repeat({}), admin, 'post', {}),
+            ('paciente_cadastro', repeat({}), None, 'get', {}),
+            ('dashboard_redirect', repeat({}), paciente.usuario, 'get', {}),
+            ('dashboard_paciente', repeat({}), paciente.usuario, 'get', {}),
+            ('dashboard_medico', repeat({}), medico.usuario, 'get', {}),
+            ('listar_medicos', repeat({}), paciente.usuario, 'get', {}),
+            ('proximos_horarios', repeat({}), paciente.usuario, 'get', {'especialidade': especialidade.pk}),
+            ('detalhes_medico', repeat({'medico_id': medico.pk}), paciente.usuario, 'get', {}),
+            ('agendar_consulta', self.horarios_livres(paciente), paciente.usuario, 'post', {}),
+            ('prontuario_create', repeat({'consulta_id': sem_prontuario.pk}), medico.usuario, 'get', {}),
+            ('prontuario_update', repeat({'pk': ultima.registroprontuario.pk}), medico.usuario, 'get', {}),
+            ('prontuario_busca', repeat({}), medico.usuario, 'get', {'q': palavra}),
+            gerenciar('gerenciamento'),
+            gerenciar('relatorios'),
+            gerenciar('quadro'),
+            # Pelo cliente de teste (WSGI) a rota responde a lista do dia e fecha, sem stream contínuo
+            gerenciar('quadro_eventos'),
+            gerenciar('convenio_list'),
+            gerenciar('convenio_create'),
+            gerenciar('convenio_update', pk=convenio.pk),
+            gerenciar('convenio_delete', pk=convenio.pk),
+            gerenciar('especialidade_list'),
+            gerenciar('especialidade_create'),
+            gerenciar('especialidade_update', pk=especialidade.pk),
+            gerenciar('especialidade_delete', pk=especialidade.pk),
+            gerenciar('sala_list'),
+            gerenciar('sala_create'),
+            gerenciar('sala_update', pk=sala.pk),
+            gerenciar('sala_delete', pk=sala.pk),
+            gerenciar('medico_list'),
+            gerenciar('medico_create'),
+            gerenciar('medico_update', pk=medico.pk),
+            gerenciar('medico_delete', pk=medico.pk),
+            gerenciar('consulta_list'),
+            gerenciar('consulta_create'),
+            gerenciar('consulta_update', pk=ultima.pk),
+            gerenciar('consulta_delete', pk=ultima.pk),
+            # Exporta a última semana (a exportação completa mede o tamanho do banco, não a rota)
+            ('consulta_exportar', repeat({}), admin, 'get', {'data_inicio': hoje - timedelta(days=7), 'data_fim': hoje}),
+            gerenciar('disponibilidade_list'),
+            gerenciar('disponibilidade_create'),
+            gerenciar('disponibilidade_update', pk=disponibilidade.pk),
+            gerenciar('disponibilidade_delete', pk=disponibilidade.pk),
+            gerenciar('paciente_list'),
+            gerenciar('paciente_create_admin'),
+            ('paciente_autocompletar', repeat({}), admin, 'get', {'q': paciente.nome_completo[:3]}),
+            gerenciar('paciente_update', pk=paciente.pk),
+            gerenciar('paciente_delete', pk=paciente.pk),
+            ('api_medicos', repeat({}), paciente.usuario, 'get', {}),
+            ('api_horarios', repeat({'medico_id': medico.pk}), paciente.usuario, 'get', {}),
+            # O agendamento pela API usa a mesma função do agendar_consulta, medido acima
+            ('api_consultas', repeat({}), paciente.usuario, 'get', {'futuras': 'on'}),
+            ('api_cancelar_consulta', self.cancelaveis(paciente), paciente.usuario, 'post', {}),
+        ]
+
+    def horarios_livres(self, paciente=None):
+        # Um horário livre diferente a cada agendamento, do mais próximo para o mais distante
+        # (e fora dos horários em que o paciente já tem consulta, que seriam recusados)
+        vistos = set()
+        if paciente is not None:
+            vistos.update(Consulta.objects.filter(paciente=paciente, data_hora__gt=timezone.now()).exclude(
+                status='Cancelada',
+            ).values_list('data_hora', flat=True))
+        for medico_id, inicio in HorarioAgenda.objects.filter(
+            inicio__gt=timezone.now(), ocupado=False, salas_livres__gt=0,
+        ).order_by('inicio').values_list('medico_id', 'inicio').iterator():
+            if inicio in vistos:
+                continue
+            vistos.add(inicio)
+            yield {'medico_id': medico_id, 'horario_str': timezone.localtime(inicio).strftime('%Y-%m-%d-%H-%M')}
+
+    def cancelaveis(self, paciente):
+        # Cada cancelamento precisa de uma consulta agendada: agenda uma (fora do tempo medido) a cada passo
+        for kwargs in self.horarios_livres(paciente):
+            inicio = timezone.make_aware(datetime.strptime(kwargs['horario_str'], '%Y-%m-%d-%H-%M'))
+            try:
+                consulta = agendamento.agendar_consulta(paciente, Medico.objects.get(pk=kwargs['medico_id']), inicio)
+            except agendamento.AgendamentoError:
+                continue
+            yield {'consulta_id': consulta.pk}
+
+    # Medição
+
+    def requisitar(self, cliente, nome, kwargs, usuario, metodo, parametros, cache_frio):
+        # Fora do tempo medido: entra de novo se a requisição anterior encerrou a sessão (logout)
+        if usuario is not None and '_auth_user_id' not in cliente.session:
+            cliente.force_login(usuario)
+        if cache_frio:
+            cache.clear()
+        url = reverse(nome, kwargs=kwargs)
+        inicio = time.perf_counter()
+        resposta = getattr(cliente, metodo)(url, parametros)
+        if resposta.streaming:
+            for _ in resposta.streaming_content:
+                pass
+        return time.perf_counter() - inicio, resposta.status_code
+
+    def medir(self, nome, kwargs, usuario, metodo, parametros, options):
+        cliente = Client(SERVER_NAME=_host())
+        latencias, status = [], set()
+        for n in range(options['aquecimento'] + options['repeticoes']):
+            duracao, codigo = self.requisitar(cliente, nome, next(kwargs), usuario, metodo, parametros, options['cache_frio'])
+            status.add(codigo)
+            if n >= options['aquecimento']:
+                latencias.append(duracao)
+
+        # Uma requisição a mais, instrumentada: contar SQL e rastrear alocações distorceriam as latências
+        # (os kwargs antes: alguns cenários preparam dados no banco, ex.: a consulta a cancelar)
+        proximos = next(kwargs)
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as consultas:
+                _, codigo = self.requisitar(cliente, nome, proximos, usuario, metodo, parametros, options['cache_frio'])
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        status.add(codigo)
+        return {
+            'metodo': metodo.upper(),
+            'status': sorted(status),
+            'requisicoes': len(latencias),
+            **_resumo(latencias),
+            'consultas_sql': len(consultas),
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
+
+    def agendar_em_paralelo(self, quantidade_threads, agendamentos):
+        """Pacientes diferentes abrem a agenda de um médico e agendam ao mesmo tempo, disputando os mesmos horários."""
+        pacientes = list(Paciente.objects.select_related('usuario').order_by('?')[:quantidade_threads])
+        # Poucos horários para muitos pedidos: parte das tentativas encontra o horário já ocupado
+        horarios = [kwargs for kwargs, _ in zip(self.horarios_livres(), range(max(1, quantidade_threads * agendamentos // 2)))]
+        if not pacientes or not horarios:
+            return {'erro': 'Sem pacientes ou horários livres.'}
+        sucesso = reverse('dashboard_redirect')
+        latencias, resultados, lock = [], {'agendadas': 0, 'recusadas': 0, 'erros': 0}, threading.Lock()
+        barreira = threading.Barrier(len(pacientes))
+
+        def trabalhar(paciente, aleatorio):
+            cliente = Client(SERVER_NAME=_host())
+            cliente.force_login(paciente.usuario)
+            barreira.wait()
+            for _ in range(agendamentos):
+                kwargs = aleatorio.choice(horarios)
+                inicio = time.perf_counter()
+                try:
+                    cliente.get(reverse('detalhes_medico', kwargs={'medico_id': kwargs['medico_id']}))
+                    resposta = cliente.post(reverse('agendar_consulta', kwargs=kwargs))
+                    chave = 'agendadas' if resposta.status_code == 302 and resposta.url == sucesso else 'recusadas'
+                except Exception:
+                    chave = 'erros'
+                duracao = time.perf_counter() - inicio
+                with lock:
+                    latencias.append(duracao)
+                    resultados[chave] += 1
+                close_old_connections()
+            connection.close()
+
+        threads = [
+            threading.Thread(target=trabalhar, args=(paciente, random.Random(self.aleatorio.random())))
+            for paciente in pacientes
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+        return {
+            'threads': len(pacientes),
+            'tentativas': len(latencias),
+            **resultados,
+            'agendadas_por_segundo': round(resultados['agendadas'] / duracao, 2),
+            **_resumo(latencias),
+        }
+
+    def comparar(self, arquivo, atual):
+        with open(arquivo, encoding='utf-8') as entrada:
+            anterior = json.load(entrada)
+        self.stderr.write(f'{"rota":<24} {"p95 antes":>10} {"p95 agora":>10} {"variação":>9} {"SQL":>9}')
+        for nome, dados in atual['rotas'].items():
+            antes = anterior.get('rotas', {}).get(nome)
+            if not antes:
+                continue
+            variacao = (dados['p95_ms'] / antes['p95_ms'] - 1) * 100 if antes['p95_ms'] else 0
+            self.stderr.write(
+                f'{nome:<24} {antes["p95_ms"]:>10.1f} {dados["p95_ms"]:>10.1f} {variacao:>+8.0f}% '
+                f'{antes["consultas_sql"]:>4}→{dados["consultas_sql"]:<4}'
+            )
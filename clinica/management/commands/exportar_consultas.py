@@ -0,0 +1,61 @@
+from contextlib import nullcontext
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from clinica import exportacao
+from clinica.models import Convenio
+
+
+class Command(BaseCommand):
+    help = 'Exporta as consultas (com paciente, convênio, médico e prontuário) em CSV ou JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=exportacao.FORMATOS, default='csv')
+        parser.add_argument('--saida', default='-', help='Arquivo de destino ou "-" para a saída padrão.')
+        parser.add_argument('--inicio', type=date.fromisoformat, help='Primeiro dia das consultas (AAAA-MM-DD).')
+        parser.add_argument('--fim', type=date.fromisoformat, help='Último dia das consultas (AAAA-MM-DD).')
+        parser.add_argument('--convenio', help='Nome do convênio dos pacientes.')
+        parser.add_argument(
+            '--incremental', metavar='NOME', nargs='?', const='consultas',
+            help='Exporta só o que mudou desde a última exportação com este nome e avança o marco ao terminar.',
+        )
+        parser.add_argument('--bloco', type=int, default=exportacao.TAMANHO_BLOCO, help='Linhas lidas do banco por vez.')
+
+    def handle(self, *args, **options):
+        convenio = None
+        if options['convenio']:
+            convenio = Convenio.objects.filter(nome__iexact=options['convenio']).first()
+            if convenio is None:
+                raise CommandError(f'Convênio "{options["convenio"]}" não encontrado.')
+
+        corte = exportacao.corte()
+        desde = exportacao.marco(options['incremental']) if options['incremental'] else None
+        queryset = exportacao.consultas(
+            data_inicio=options['inicio'], data_fim=options['fim'],
+            convenio=convenio, desde=desde, ate=corte,
+        )
+
+        try:
+            saida = nullcontext(self.stdout) if options['saida'] == '-' else open(
+                options['saida'], 'w', newline='', encoding='utf-8'
+            )
+        except OSError as e:
+            raise CommandError(str(e))
+        total = 0
+        with saida as arquivo:
+            escrever = (lambda pedaco: arquivo.write(pedaco, ending='')) if arquivo is self.stdout else arquivo.write
+            for pedaco in exportacao.linhas(queryset, options['formato'], options['bloco']):
+                escrever(pedaco)
+                total += 1
+        if options['formato'] == 'csv':
+            total -= 1
+
+        # O marco só avança depois que o arquivo foi escrito por completo
+        if options['incremental']:
+            exportacao.avancar_marco(options['incremental'], corte)
+        self.stderr.write(self.style.SUCCESS(
+            f'{total} consultas exportadas (alteradas até {timezone.localtime(corte):%d/%m/%Y %H:%M:%S}).'
+        ))
+
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from clinica.sintetico import PREFIXO, SENHA, ClinicaSintetica
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma clínica sintética (especialidades, salas, médicos, disponibilidades, pacientes e anos de '
+        'consultas e prontuários) para medir desempenho. Use um banco vazio (DB_NOME).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--medicos', type=int, default=50)
+        parser.add_argument('--especialidades', type=int, default=10)
+        parser.add_argument('--salas', type=int, default=10)
+        parser.add_argument('--pacientes', type=int, default=5000)
+        parser.add_argument('--anos', type=float, default=2, help='Anos de histórico de consultas.')
+        parser.add_argument('--ocupacao', type=float, default=0.6, help='Fração dos horários com consulta (0 a 1).')
+        parser.add_argument('--semente', type=int, default=0, help='Semente do gerador (mesma semente, mesmos dados).')
+        parser.add_argument('--lote', type=int, default=2000, help='Linhas por bulk_create.')
+
+    def handle(self, *args, **options):
+        gerador = ClinicaSintetica(
+            medicos=options['medicos'], especialidades=options['especialidades'], salas=options['salas'],
+            pacientes=options['pacientes'], anos=options['anos'], ocupacao=options['ocupacao'],
+            semente=options['semente'], lote=options['lote'],
+        )
+        try:
+            totais = gerador.gerar(progresso=lambda mensagem: self.stderr.write(mensagem))
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        self.stdout.write(', '.join(f'{total} {nome}' for nome, total in totais.items()) + '.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Clínica sintética gerada. Usuários "{PREFIXO}-admin", "{PREFIXO}-medicoN" e "{PREFIXO}-pacienteN", senha "{SENHA}".'
+        ))
@@ -0,0 +1,47 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinica.importacao import IMPORTADORES, LinhaInvalida
+
+
+class Command(BaseCommand):
+    help = 'Importa pacientes, médicos ou disponibilidades de um arquivo CSV em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(IMPORTADORES))
+        parser.add_argument('arquivo', help='Caminho do CSV (UTF-8, com cabeçalho) ou "-" para a entrada padrão.')
+        parser.add_argument('--lote', type=int, default=1000, help='Linhas por bloco/transação.')
+        parser.add_argument('--processos', type=int, default=1, help='Processos usados para gerar os hashes de senha.')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas valida o arquivo, sem gravar nada.')
+        parser.add_argument('--relatorio', help='Grava as linhas com erro neste CSV (linha, erro).')
+
+    def handle(self, *args, **options):
+        importador = IMPORTADORES[options['tipo']](
+            tamanho_lote=options['lote'], processos=options['processos'], simular=options['dry_run'],
+        )
+        arquivo = sys.stdin if options['arquivo'] == '-' else open(options['arquivo'], newline='', encoding='utf-8-sig')
+        inicio = time.perf_counter()
+        try:
+            with arquivo:
+                importadas = importador.importar(arquivo)
+        except (OSError, LinhaInvalida) as e:
+            raise CommandError(str(e))
+        duracao = time.perf_counter() - inicio
+
+        if options['relatorio']:
+            with open(options['relatorio'], 'w', newline='', encoding='utf-8') as relatorio:
+                escritor = csv.writer(relatorio)
+                escritor.writerow(['linha', 'erro'])
+                escritor.writerows(importador.erros)
+        else:
+            for numero, erro in importador.erros[:50]:
+                self.stderr.write(f'Linha {numero}: {erro}')
+
+        acao = 'validadas' if options['dry_run'] else 'importadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{importadas} linhas {acao}, {len(importador.erros)} com erro, '
+            f'{duracao:.1f}s ({importadas / duracao if duracao else 0:.0f} linhas/s).'
+        ))
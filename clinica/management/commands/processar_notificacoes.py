@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clinica import outbox
+from clinica.containers import AppContainer
+
+
+class Command(BaseCommand):
+    help = 'Envia as notificações pendentes da caixa de saída em lotes, com novas tentativas e descarte.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help='Quantidade de notificações por lote.')
+        parser.add_argument('--threads', type=int, default=4, help='Envios simultâneos por lote.')
+        parser.add_argument('--continuo', action='store_true', help='Continua processando até ser interrompido.')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos de espera quando a fila está vazia.')
+
+    def handle(self, *args, **options):
+        gateway = AppContainer.notification_gateway()
+        try:
+            while True:
+                enviadas, reagendadas, descartadas = outbox.processar_lote(gateway, options['lote'], options['threads'])
+                if enviadas or reagendadas or descartadas:
+                    self.stdout.write(
+                        f'{enviadas} enviadas, {reagendadas} reagendadas, {descartadas} descartadas.'
+                    )
+                elif not options['continuo']:
+                    break
+                else:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Caixa de saída processada.'))
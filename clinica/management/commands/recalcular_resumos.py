@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from clinica import resumos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os totais do painel de gerenciamento (contadores e resumos diários de consultas).'
+
+    def handle(self, *args, **options):
+        linhas = resumos.recalcular()
+        self.stdout.write(self.style.SUCCESS(f'Resumos recalculados ({linhas} linhas de dia/sala/status).'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from clinica import agenda
+from clinica.models import Medico
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói a tabela de horários materializados (HorarioAgenda) de todos os médicos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--medico', type=int, action='append', help='Reconstrói apenas o(s) médico(s) informado(s).')
+
+    def handle(self, *args, **options):
+        removidos = agenda.remover_horarios_passados()
+        medicos = Medico.objects.order_by('pk')
+        if options['medico']:
+            medicos = medicos.filter(pk__in=options['medico'])
+
+        total = 0
+        for medico_id in medicos.values_list('pk', flat=True).iterator():
+            total += agenda.materializar_medico(medico_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} horários materializados ({removidos} horários passados removidos).'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from clinica import busca
+
+
+class Command(BaseCommand):
+    help = 'Refaz o índice de busca textual dos prontuários (FTS5) a partir da tabela de prontuários.'
+
+    def handle(self, *args, **options):
+        if not busca.reconstruir():
+            raise CommandError('O índice de busca textual só existe no SQLite.')
+        self.stdout.write(self.style.SUCCESS('Índice de busca dos prontuários reconstruído.'))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinica import replicas
+
+
+class Command(BaseCommand):
+    help = 'Copia o banco principal para as réplicas de leitura configuradas em DB_REPLICAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help='Repete a cópia até ser interrompido.')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos entre as cópias com --continuo.')
+
+    def handle(self, *args, **options):
+        aliases = replicas.replicas()
+        if not aliases:
+            raise CommandError('Nenhuma réplica configurada (defina DB_REPLICAS).')
+        try:
+            while True:
+                for alias in aliases:
+                    inicio = time.perf_counter()
+                    try:
+                        paginas = replicas.replicar(alias)
+                    except ValueError as erro:
+                        raise CommandError(str(erro))
+                    self.stdout.write(f'{alias}: {paginas} páginas copiadas em {time.perf_counter() - inicio:.2f} s.')
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Réplicas atualizadas.'))
@@ -0,0 +1,238 @@
+# Métricas de desempenho por requisição (latência, SQL e templates) no formato do Prometheus
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger('clinica.metricas')
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+# Medições da requisição atual (cada requisição roda em seu próprio contexto)
+_medicao = ContextVar('clinica_metricas_medicao', default=None)
+
+
+class Histograma:
+    def __init__(self, nome, descricao, buckets):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = buckets
+        self.series = {}
+
+    def observar(self, rotulos, valor):
+        serie = self.series.get(rotulos)
+        if serie is None:
+            serie = self.series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} histogram']
+        for rotulos, (contagens, soma, total) in sorted(self.series.items()):
+            base = ','.join(f'{chave}="{valor}"' for chave, valor in rotulos)
+            separador = ',' if base else ''
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + ('+Inf',), contagens):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{{{base}{separador}le="{limite}"}} {acumulado}')
+            linhas.append(f'{self.nome}_sum{{{base}}} {soma}')
+            linhas.append(f'{self.nome}_count{{{base}}} {total}')
+        return linhas
+
+
+class Registro:
+    """Histogramas em memória do processo, protegidos por um lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histogramas = {}
+
+    def histograma(self, nome, descricao, buckets=BUCKETS_SEGUNDOS):
+        if nome not in self.histogramas:
+            self.histogramas[nome] = Histograma(nome, descricao, buckets)
+        return self.histogramas[nome]
+
+    def observar(self, nome, rotulos, valor):
+        with self._lock:
+            self.histogramas[nome].observar(tuple(sorted(rotulos.items())), valor)
+
+    def exportar(self):
+        with self._lock:
+            linhas = []
+            for histograma in self.histogramas.values():
+                linhas.extend(histograma.exportar())
+        return '\n'.join(linhas) + '\n'
+
+    def limpar(self):
+        with self._lock:
+            for histograma in self.histogramas.values():
+                histograma.series.clear()
+
+
+registro = Registro()
+registro.histograma('clinica_requisicao_segundos', 'Latência das requisições por view.')
+registro.histograma('clinica_sql_consultas', 'Consultas SQL por requisição.', BUCKETS_CONSULTAS)
+registro.histograma('clinica_sql_segundos', 'Tempo gasto em SQL por requisição.')
+registro.histograma('clinica_template_segundos', 'Tempo de renderização de templates por requisição.')
+registro.histograma('clinica_etapa_segundos', 'Duração de etapas instrumentadas (ex.: notificação).')
+
+
+class _Medicao:
+    __slots__ = ('consultas', 'sql', 'template', 'etapas')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.etapas = {}
+
+
+def percentil(valores, p):
+    """Percentil `p` (0 a 100) de uma lista de medições, pelo método do valor mais próximo."""
+    if not valores:
+        return 0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def ativas():
+    return getattr(settings, 'METRICAS_ATIVAS', True)
+
+
+@contextmanager
+def cronometro(etapa):
+    """Mede um trecho de código; ex.: `with metricas.cronometro('notificacao'):`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        medicao = _medicao.get()
+        if medicao is not None:
+            medicao.etapas[etapa] = medicao.etapas.get(etapa, 0.0) + duracao
+        if ativas():
+            registro.observar('clinica_etapa_segundos', {'etapa': etapa}, duracao)
+
+
+def _contar_sql(execute, sql, params, many, context):
+    medicao = _medicao.get()
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if medicao is not None:
+            medicao.consultas += 1
+            medicao.sql += time.perf_counter() - inicio
+
+
+def instalar_medicao_de_templates():
+    """Envolve a renderização do backend de templates do Django para somar o tempo por requisição."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, '_metricas', False):
+        return
+    render_original = Template.render
+
+    def render(self, context=None, request=None):
+        medicao = _medicao.get()
+        if medicao is None:
+            return render_original(self, context, request)
+        inicio = time.perf_counter()
+        try:
+            return render_original(self, context, request)
+        finally:
+            medicao.template += time.perf_counter() - inicio
+
+    render._metricas = True
+    Template.render = render
+
+
+class MetricasMiddleware:
+    # Síncrono e assíncrono: com ASGI, um middleware só síncrono faria cada requisição passar por uma thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        if not ativas():
+            return self.get_response(request)
+
+        medicao = _Medicao()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with _envolver_conexoes():
+                response = self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        self.registrar(request, response, medicao, time.perf_counter() - inicio)
+        return response
+
+    async def _acall(self, request):
+        if not ativas():
+            return await self.get_response(request)
+
+        medicao = _Medicao()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with _envolver_conexoes():
+                response = await self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        self.registrar(request, response, medicao, time.perf_counter() - inicio)
+        return response
+
+    def registrar(self, request, response, medicao, duracao):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'nao_encontrada'
+        registro.observar('clinica_requisicao_segundos', {
+            'view': view, 'metodo': request.method, 'status': f'{response.status_code // 100}xx',
+        }, duracao)
+        registro.observar('clinica_sql_consultas', {'view': view}, medicao.consultas)
+        registro.observar('clinica_sql_segundos', {'view': view}, medicao.sql)
+        registro.observar('clinica_template_segundos', {'view': view}, medicao.template)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': view,
+                'metodo': request.method,
+                'status': response.status_code,
+                'duracao': round(duracao, 6),
+                'sql_consultas': medicao.consultas,
+                'sql_segundos': round(medicao.sql, 6),
+                'template_segundos': round(medicao.template, 6),
+                'etapas': {etapa: round(valor, 6) for etapa, valor in medicao.etapas.items()},
+            }))
+
+
+@contextmanager
+def _envolver_conexoes():
+    with ExitStack() as pilha:
+        for alias in connections:
+            pilha.enter_context(connections[alias].execute_wrapper(_contar_sql))
+        yield
+
+
+def metricas(request):
+    permitidos = getattr(settings, 'METRICAS_IPS_PERMITIDOS', ['127.0.0.1'])
+    if not (request.META.get('REMOTE_ADDR') in permitidos or request.user.is_superuser):
+        return HttpResponseForbidden()
+    return HttpResponse(registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
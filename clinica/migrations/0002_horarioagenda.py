@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorarioAgenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField()),
+                ('salas_livres', models.PositiveIntegerField(default=0)),
+                ('ocupado', models.BooleanField(default=False)),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clinica.medico')),
+            ],
+            options={
+                'ordering': ['medico', 'inicio'],
+                'indexes': [models.Index(fields=['inicio'], name='horario_agenda_inicio_idx')],
+                'constraints': [models.UniqueConstraint(fields=('medico', 'inicio'), name='horario_agenda_medico_inicio_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0002_horarioagenda'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='consulta',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Cancelada'), _negated=True), fields=('medico', 'data_hora'), name='consulta_medico_horario_unico', violation_error_message='O médico já possui uma consulta neste horário.'),
+        ),
+        migrations.AddConstraint(
+            model_name='consulta',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Cancelada'), _negated=True), fields=('sala', 'data_hora'), name='consulta_sala_horario_unico', violation_error_message='A sala já está ocupada neste horário.'),
+        ),
+        migrations.AddConstraint(
+            model_name='consulta',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Cancelada'), _negated=True), fields=('paciente', 'data_hora'), name='consulta_paciente_horario_unico', violation_error_message='O paciente já possui uma consulta neste horário.'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:52
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0003_consulta_horario_unico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consulta',
+            name='duracao_minutos',
+            field=models.PositiveSmallIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(240)]),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0005_notificacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['data_hora', 'id'], name='consulta_data_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['medico', 'data_hora'], name='consulta_medico_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['paciente', 'data_hora'], name='consulta_paciente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['sala', 'data_hora'], name='consulta_sala_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['status', 'data_hora'], name='consulta_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disponibilidade',
+            index=models.Index(fields=['medico', 'dia_semana', 'hora_inicio'], name='disponibilidade_medico_dia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['nome_completo'], name='paciente_nome_idx'),
+        ),
+    ]
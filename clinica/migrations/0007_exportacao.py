@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0006_indices_listagens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcoExportacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('valor', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='consulta',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0007_exportacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medico',
+            index=models.Index(fields=['nome_completo'], name='medico_nome_idx'),
+        ),
+    ]
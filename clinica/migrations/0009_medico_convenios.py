@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0008_medico_nome_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medico',
+            name='convenios',
+            field=models.ManyToManyField(blank=True, to='clinica.convenio', verbose_name='Convênios aceitos'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def preencher_resumos(apps, schema_editor):
+    Consulta = apps.get_model('clinica', 'Consulta')
+    Contador = apps.get_model('clinica', 'Contador')
+    ResumoDiario = apps.get_model('clinica', 'ResumoDiario')
+    Contador.objects.create(nome='pacientes', valor=apps.get_model('clinica', 'Paciente').objects.count())
+    Contador.objects.create(nome='medicos', valor=apps.get_model('clinica', 'Medico').objects.count())
+    linhas = Consulta.objects.annotate(data=TruncDate('data_hora')).values('data', 'sala_id', 'status').annotate(
+        total=Count('id'), minutos=Sum('duracao_minutos'),
+    ).order_by()
+    ResumoDiario.objects.bulk_create([ResumoDiario(**linha) for linha in linhas])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0009_medico_convenios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('status', models.CharField(choices=[('Agendada', 'Agendada'), ('Realizada', 'Realizada'), ('Cancelada', 'Cancelada')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('minutos', models.IntegerField(default=0)),
+                ('sala', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clinica.sala')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('data', 'sala', 'status'), name='resumo_diario_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0010_resumos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaAnalisada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField()),
+                ('medico_id', models.IntegerField()),
+                ('sala_id', models.IntegerField()),
+                ('convenio_id', models.IntegerField(null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('minutos', models.IntegerField()),
+                ('consulta', models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, to='clinica.consulta')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumoHorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField()),
+                ('status', models.CharField(choices=[('Agendada', 'Agendada'), ('Realizada', 'Realizada'), ('Cancelada', 'Cancelada')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('minutos', models.IntegerField(default=0)),
+                ('convenio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='clinica.convenio')),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clinica.medico')),
+                ('sala', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clinica.sala')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hora', 'medico', 'sala', 'convenio', 'status'), name='resumo_horario_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Índice FTS5 dos prontuários (apenas no SQLite), mantido por gatilhos no próprio banco
+
+from django.db import migrations
+
+CRIAR = [
+    # Tabela de "conteúdo externo": o índice guarda só os termos, o texto continua em clinica_registroprontuario
+    """CREATE VIRTUAL TABLE clinica_prontuario_busca USING fts5(
+        descricao_atendimento, prescricao,
+        content='clinica_registroprontuario', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER clinica_prontuario_busca_ai AFTER INSERT ON clinica_registroprontuario BEGIN
+        INSERT INTO clinica_prontuario_busca(rowid, descricao_atendimento, prescricao)
+        VALUES (new.id, new.descricao_atendimento, new.prescricao);
+    END""",
+    """CREATE TRIGGER clinica_prontuario_busca_ad AFTER DELETE ON clinica_registroprontuario BEGIN
+        INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, descricao_atendimento, prescricao)
+        VALUES ('delete', old.id, old.descricao_atendimento, old.prescricao);
+    END""",
+    """CREATE TRIGGER clinica_prontuario_busca_au AFTER UPDATE OF descricao_atendimento, prescricao
+    ON clinica_registroprontuario BEGIN
+        INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, descricao_atendimento, prescricao)
+        VALUES ('delete', old.id, old.descricao_atendimento, old.prescricao);
+        INSERT INTO clinica_prontuario_busca(rowid, descricao_atendimento, prescricao)
+        VALUES (new.id, new.descricao_atendimento, new.prescricao);
+    END""",
+    "INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca) VALUES ('rebuild')",
+]
+
+REMOVER = [
+    'DROP TRIGGER IF EXISTS clinica_prontuario_busca_ai',
+    'DROP TRIGGER IF EXISTS clinica_prontuario_busca_ad',
+    'DROP TRIGGER IF EXISTS clinica_prontuario_busca_au',
+    'DROP TABLE IF EXISTS clinica_prontuario_busca',
+]
+
+
+def _executar(schema_editor, comandos):
+    # Em outros bancos a busca usa o filtro comum (ver clinica/busca.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for comando in comandos:
+        schema_editor.execute(comando, params=None)
+
+
+def criar_indice(apps, schema_editor):
+    _executar(schema_editor, CRIAR)
+
+
+def remover_indice(apps, schema_editor):
+    _executar(schema_editor, REMOVER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0011_analises'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:25
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar_nome(nome):
+    decomposto = unicodedata.normalize('NFKD', nome or '')
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+
+def normalizar_pacientes(apps, schema_editor):
+    Paciente = apps.get_model('clinica', 'Paciente')
+    cpfs = set(Paciente.objects.values_list('cpf', flat=True))
+    pacientes = []
+    for paciente in Paciente.objects.only('pk', 'cpf', 'nome_completo').iterator(chunk_size=2000):
+        paciente.nome_busca = normalizar_nome(paciente.nome_completo)
+        cpf = re.sub(r'\D', '', paciente.cpf)
+        # CPFs que ficariam repetidos depois de tirar a pontuação são mantidos como estão
+        if cpf != paciente.cpf and cpf not in cpfs:
+            cpfs.add(cpf)
+            paciente.cpf = cpf
+        pacientes.append(paciente)
+    Paciente.objects.bulk_update(pacientes, ['cpf', 'nome_busca'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0012_prontuario_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paciente',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(normalizar_pacientes, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='paciente',
+            name='paciente_nome_idx',
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['nome_busca', 'usuario'], name='paciente_nome_busca_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:02
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+# Valor de Consulta.DURACAO_MAXIMA_MINUTOS quando esta migração foi escrita
+DURACAO_MAXIMA = timedelta(minutes=240)
+
+
+def materializar_agenda(apps, schema_editor):
+    # Instalações anteriores à tabela HorarioAgenda têm disponibilidades, mas nenhum horário
+    # materializado: sem isto, a agenda e o agendamento recusariam todos os horários até alguém
+    # rodar `reconstruir_agenda`. Mesma regra de agenda.materializar_medico, com os modelos
+    # históricos, para continuar valendo quando os modelos mudarem.
+    Consulta = apps.get_model('clinica', 'Consulta')
+    Disponibilidade = apps.get_model('clinica', 'Disponibilidade')
+    HorarioAgenda = apps.get_model('clinica', 'HorarioAgenda')
+    Sala = apps.get_model('clinica', 'Sala')
+
+    intervalos = {}
+    for medico_id, dia_semana, hora_inicio, hora_fim in Disponibilidade.objects.values_list(
+        'medico_id', 'dia_semana', 'hora_inicio', 'hora_fim'
+    ):
+        intervalos.setdefault(medico_id, {}).setdefault(dia_semana, []).append((hora_inicio, hora_fim))
+    if not intervalos:
+        return
+
+    duracao = timedelta(minutes=getattr(settings, 'AGENDA_DURACAO_CONSULTA_MINUTOS', 30))
+    dias = getattr(settings, 'AGENDA_HORIZONTE_MAXIMO_DIAS', 90)
+    agora = timezone.localtime()
+    limite = timezone.make_aware(datetime.combine(agora.date() + timedelta(days=dias), datetime.min.time()))
+    consultas = sorted(
+        (data_hora, data_hora + timedelta(minutes=minutos), medico_id, sala_id)
+        for data_hora, minutos, medico_id, sala_id in Consulta.objects.filter(
+            data_hora__gt=agora - DURACAO_MAXIMA, data_hora__lt=limite + duracao,
+        ).exclude(status='Cancelada').values_list('data_hora', 'duracao_minutos', 'medico_id', 'sala_id')
+    )
+    inicios = [consulta[0] for consulta in consultas]
+    total_salas = Sala.objects.count()
+
+    horarios = []
+    for medico_id, por_dia in intervalos.items():
+        grade = set()
+        for n in range(dias):
+            dia = agora.date() + timedelta(days=n)
+            for hora_inicio, hora_fim in por_dia.get(dia.isoweekday(), ()):
+                slot = timezone.make_aware(datetime.combine(dia, hora_inicio))
+                fim = timezone.make_aware(datetime.combine(dia, hora_fim))
+                while slot + duracao <= fim:
+                    if slot >= agora:
+                        grade.add(slot)
+                    slot += duracao
+        for inicio in sorted(grade):
+            i = bisect_right(inicios, inicio - DURACAO_MAXIMA)
+            j = bisect_left(inicios, inicio + duracao)
+            sobrepostas = [consulta for consulta in consultas[i:j] if consulta[1] > inicio]
+            horarios.append(HorarioAgenda(
+                medico_id=medico_id,
+                inicio=inicio,
+                ocupado=any(consulta[2] == medico_id for consulta in sobrepostas),
+                salas_livres=max(total_salas - len({consulta[3] for consulta in sobrepostas}), 0),
+            ))
+
+    HorarioAgenda.objects.filter(medico_id__in=intervalos, inicio__gte=agora).delete()
+    HorarioAgenda.objects.bulk_create(horarios, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0013_pacientes_busca'),
+    ]
+
+    operations = [
+        migrations.RunPython(materializar_agenda, migrations.RunPython.noop),
+    ]
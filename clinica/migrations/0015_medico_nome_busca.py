@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:20
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar_nome(nome):
+    decomposto = unicodedata.normalize('NFKD', nome or '')
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+
+def normalizar_medicos(apps, schema_editor):
+    Medico = apps.get_model('clinica', 'Medico')
+    medicos = list(Medico.objects.only('pk', 'nome_completo'))
+    for medico in medicos:
+        medico.nome_busca = normalizar_nome(medico.nome_completo)
+    Medico.objects.bulk_update(medicos, ['nome_busca'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinica', '0014_materializar_agenda'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='medico',
+            name='medico_nome_idx',
+        ),
+        migrations.AddField(
+            model_name='medico',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(normalizar_medicos, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='medico',
+            index=models.Index(fields=['nome_busca', 'usuario'], name='medico_nome_busca_idx'),
+        ),
+    ]
@@ -1,5 +1,10 @@
+import re
+import unicodedata
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 # Create your models here.
 
@@ -41,21 +46,63 @@ class Medico(models.Model):
     nome_completo = models.CharField(max_length=255)
     crm = models.CharField(max_length=20, unique=True)
     especialidades = models.ManyToManyField(Especialidade) # Relação N-M direta
+    convenios = models.ManyToManyField(Convenio, blank=True, verbose_name='Convênios aceitos')
+    # Nome normalizado para o filtro por prefixo e a ordem do diretório, com índice (ver forms.MedicoFiltroForm)
+    nome_busca = models.CharField(max_length=255, editable=False, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome_busca', 'usuario'], name='medico_nome_busca_idx'),
+        ]
 
     def __str__(self):
         return self.nome_completo
 
+    def save(self, *args, **kwargs):
+        # bulk_create não passa por aqui: quem grava em massa deve normalizar (ver importacao.py)
+        self.nome_busca = normalizar_nome(self.nome_completo)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome_completo' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nome_busca'}
+        super().save(*args, **kwargs)
+
 # 6. Tabela Paciente
+def normalizar_cpf(cpf):
+    return re.sub(r'\D', '', cpf or '')
+
+
+def normalizar_nome(nome):
+    # Minúsculas, sem acentos e com espaços simples: "José  da Silva" -> "jose da silva"
+    decomposto = unicodedata.normalize('NFKD', nome or '')
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+
 class Paciente(models.Model):
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, primary_key=True)
     nome_completo = models.CharField(max_length=255)
-    cpf = models.CharField(max_length=14, unique=True)
+    cpf = models.CharField(max_length=14, unique=True) # Somente dígitos (ver save)
     data_nascimento = models.DateField()
     convenio = models.ForeignKey(Convenio, on_delete=models.SET_NULL, null=True, blank=True)
+    # Nome normalizado para a busca por prefixo com índice (ver pacientes.py)
+    nome_busca = models.CharField(max_length=255, editable=False, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome_busca', 'usuario'], name='paciente_nome_busca_idx'),
+        ]
 
     def __str__(self):
         return self.nome_completo
 
+    def save(self, *args, **kwargs):
+        # bulk_create não passa por aqui: quem grava em massa deve normalizar (ver importacao.py)
+        self.cpf = normalizar_cpf(self.cpf)
+        self.nome_busca = normalizar_nome(self.nome_completo)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome_completo' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nome_busca'}
+        super().save(*args, **kwargs)
+
 # 7. Tabela Disponibilidade
 class Disponibilidade(models.Model):
     medico = models.ForeignKey(Medico, on_delete=models.CASCADE)
@@ -63,6 +110,11 @@ class Disponibilidade(models.Model):
     hora_inicio = models.TimeField()
     hora_fim = models.TimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['medico', 'dia_semana', 'hora_inicio'], name='disponibilidade_medico_dia_idx'),
+        ]
+
     def __str__(self):
         return f"Dr(a). {self.medico.nome_completo} - Dia: {self.dia_semana}"
 
@@ -73,12 +125,51 @@ class Consulta(models.Model):
         ('Realizada', 'Realizada'),
         ('Cancelada', 'Cancelada'),
     ]
+    DURACAO_MAXIMA_MINUTOS = 240
+
     paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE)
     medico = models.ForeignKey(Medico, on_delete=models.CASCADE)
     sala = models.ForeignKey(Sala, on_delete=models.PROTECT)
     data_hora = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Agendada')
+    duracao_minutos = models.PositiveSmallIntegerField(
+        default=30,
+        validators=[MinValueValidator(5), MaxValueValidator(DURACAO_MAXIMA_MINUTOS)],
+    )
     data_agendamento = models.DateTimeField(auto_now_add=True)
+    # Última alteração da consulta ou do seu prontuário (marca d'água das exportações incrementais)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Consultas canceladas liberam o médico, a sala e o paciente para o mesmo horário
+        constraints = [
+            models.UniqueConstraint(
+                fields=['medico', 'data_hora'],
+                condition=~models.Q(status='Cancelada'),
+                name='consulta_medico_horario_unico',
+                violation_error_message='O médico já possui uma consulta neste horário.',
+            ),
+            models.UniqueConstraint(
+                fields=['sala', 'data_hora'],
+                condition=~models.Q(status='Cancelada'),
+                name='consulta_sala_horario_unico',
+                violation_error_message='A sala já está ocupada neste horário.',
+            ),
+            models.UniqueConstraint(
+                fields=['paciente', 'data_hora'],
+                condition=~models.Q(status='Cancelada'),
+                name='consulta_paciente_horario_unico',
+                violation_error_message='O paciente já possui uma consulta neste horário.',
+            ),
+        ]
+        # Índices da listagem paginada por cursor em (data_hora, id) e dos seus filtros
+        indexes = [
+            models.Index(fields=['data_hora', 'id'], name='consulta_data_hora_idx'),
+            models.Index(fields=['medico', 'data_hora'], name='consulta_medico_data_idx'),
+            models.Index(fields=['paciente', 'data_hora'], name='consulta_paciente_data_idx'),
+            models.Index(fields=['sala', 'data_hora'], name='consulta_sala_data_idx'),
+            models.Index(fields=['status', 'data_hora'], name='consulta_status_data_idx'),
+        ]
 
     def __str__(self):
         return f"Consulta de {self.paciente.nome_completo} com Dr(a). {self.medico.nome_completo} em {self.data_hora}"
@@ -91,4 +182,119 @@ class RegistroProntuario(models.Model):
     data_criacao = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Prontuário para a consulta {self.consulta.id}"
\ No newline at end of file
+        return f"Prontuário para a consulta {self.consulta_id}"
+
+# 10. Tabela HorarioAgenda (horários da agenda materializados)
+class HorarioAgenda(models.Model):
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE)
+    inicio = models.DateTimeField()
+    salas_livres = models.PositiveIntegerField(default=0)
+    ocupado = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['medico', 'inicio']
+        constraints = [
+            models.UniqueConstraint(fields=['medico', 'inicio'], name='horario_agenda_medico_inicio_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['inicio'], name='horario_agenda_inicio_idx'),
+        ]
+
+    def __str__(self):
+        return f"Horário de {self.medico_id} em {self.inicio}"
+
+
+# 11. Tabela Notificacao (caixa de saída de notificações)
+class Notificacao(models.Model):
+    STATUS_CHOICES = [
+        ('Pendente', 'Pendente'),
+        ('Processando', 'Processando'),
+        ('Enviada', 'Enviada'),
+        ('Descartada', 'Descartada'),
+    ]
+    destinatario = models.EmailField(blank=True)
+    mensagem = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pendente')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+    data_criacao = models.DateTimeField(auto_now_add=True)
+    data_envio = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa'], name='notificacao_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notificação para {self.destinatario} ({self.status})"
+
+
+# 12. Tabela MarcoExportacao (até onde cada exportação incremental já foi)
+class MarcoExportacao(models.Model):
+    nome = models.CharField(max_length=50, unique=True)
+    valor = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.nome}: {self.valor}"
+
+
+# 13. Tabela Contador (totais mantidos pelos sinais para o painel de gerenciamento)
+class Contador(models.Model):
+    nome = models.CharField(max_length=50, unique=True)
+    valor = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nome}: {self.valor}"
+
+
+# 14. Tabela ResumoDiario (consultas por dia, sala e status, mantido pelos sinais)
+class ResumoDiario(models.Model):
+    data = models.DateField()
+    sala = models.ForeignKey(Sala, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Consulta.STATUS_CHOICES)
+    total = models.IntegerField(default=0)
+    minutos = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['data', 'sala', 'status'], name='resumo_diario_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.data} - {self.sala_id} - {self.status}: {self.total}"
+
+
+# 15. Tabela ResumoHorario (consultas por hora, médico, sala, convênio e status; mantida pelo comando atualizar_analises)
+class ResumoHorario(models.Model):
+    hora = models.DateTimeField()
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE)
+    sala = models.ForeignKey(Sala, on_delete=models.CASCADE)
+    convenio = models.ForeignKey(Convenio, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Consulta.STATUS_CHOICES)
+    total = models.IntegerField(default=0)
+    minutos = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Consultas sem convênio (NULL) não entram na unicidade; o comando é o único a gravar aqui
+            models.UniqueConstraint(fields=['hora', 'medico', 'sala', 'convenio', 'status'], name='resumo_horario_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.hora} - {self.medico_id} - {self.status}: {self.total}"
+
+
+# 16. Tabela ConsultaAnalisada (o que cada consulta soma em ResumoHorario, para aplicar só as diferenças)
+class ConsultaAnalisada(models.Model):
+    # SET_NULL: consultas excluídas ficam marcadas para serem descontadas na próxima atualização
+    consulta = models.OneToOneField(Consulta, on_delete=models.SET_NULL, null=True)
+    hora = models.DateTimeField()
+    medico_id = models.IntegerField()
+    sala_id = models.IntegerField()
+    convenio_id = models.IntegerField(null=True)
+    status = models.CharField(max_length=20)
+    minutos = models.IntegerField()
+
+    def __str__(self):
+        return f"Consulta {self.consulta_id} em {self.hora}"
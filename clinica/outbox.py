@@ -0,0 +1,85 @@
+# Processamento da caixa de saída de notificações
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notificacao
+
+# Tempo que uma notificação fica reservada para um worker antes de poder ser retomada por outro
+RESERVA = timedelta(minutes=5)
+
+
+def max_tentativas():
+    return getattr(settings, 'NOTIFICACOES_MAX_TENTATIVAS', 5)
+
+
+def espera(tentativas):
+    """Recuo exponencial entre tentativas, limitado a uma hora."""
+    base = getattr(settings, 'NOTIFICACOES_RECUO_SEGUNDOS', 30)
+    return timedelta(seconds=min(base * 2 ** (tentativas - 1), 3600))
+
+
+def reservar_lote(tamanho, agora=None):
+    """Marca até `tamanho` notificações vencidas como 'Processando' e as retorna."""
+    agora = agora or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notificacao.objects.filter(
+                Q(status='Pendente') | Q(status='Processando'),
+                proxima_tentativa__lte=agora,
+            ).order_by('proxima_tentativa', 'pk').values_list('pk', flat=True)[:tamanho]
+        )
+        # O filtro repetido garante que um worker concorrente não reserve as mesmas linhas
+        Notificacao.objects.filter(pk__in=ids, proxima_tentativa__lte=agora).exclude(
+            status__in=['Enviada', 'Descartada']
+        ).update(status='Processando', proxima_tentativa=agora + RESERVA)
+    return list(Notificacao.objects.filter(pk__in=ids, status='Processando', proxima_tentativa=agora + RESERVA))
+
+
+def _enviar(gateway, notificacao):
+    try:
+        gateway.send_notification(notificacao.destinatario, notificacao.mensagem)
+        return notificacao, None
+    except Exception as e:
+        return notificacao, f'{type(e).__name__}: {e}'
+    finally:
+        close_old_connections()
+
+
+def processar_lote(gateway, tamanho=100, threads=4):
+    """Envia um lote de notificações e retorna (enviadas, reagendadas, descartadas)."""
+    lote = reservar_lote(tamanho)
+    if not lote:
+        return 0, 0, 0
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        resultados = list(executor.map(lambda n: _enviar(gateway, n), lote))
+
+    agora = timezone.now()
+    enviadas, reagendadas, descartadas = [], [], []
+    for notificacao, erro in resultados:
+        notificacao.tentativas += 1
+        if erro is None:
+            notificacao.status = 'Enviada'
+            notificacao.data_envio = agora
+            enviadas.append(notificacao)
+            continue
+        notificacao.ultimo_erro = erro
+        if notificacao.tentativas >= max_tentativas():
+            notificacao.status = 'Descartada'
+            descartadas.append(notificacao)
+        else:
+            notificacao.status = 'Pendente'
+            notificacao.proxima_tentativa = agora + espera(notificacao.tentativas)
+            reagendadas.append(notificacao)
+
+    Notificacao.objects.bulk_update(
+        enviadas + reagendadas + descartadas,
+        ['status', 'tentativas', 'proxima_tentativa', 'ultimo_erro', 'data_envio'],
+    )
+    return len(enviadas), len(reagendadas), len(descartadas)
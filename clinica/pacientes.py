@@ -0,0 +1,42 @@
+# Busca de pacientes pelo início do CPF ou do nome, usando os índices de cpf e nome_busca
+
+import re
+
+from django.db.models import Q
+
+from .models import Paciente, normalizar_cpf, normalizar_nome
+
+SUGESTOES = 10
+MINIMO_CARACTERES = 2
+
+
+def _comeca_com(campo, prefixo):
+    # Intervalo [prefixo, prefixo + U+FFFF): o SQLite percorre só esse trecho do índice,
+    # o que não acontece com LIKE 'prefixo%' (istartswith) em colunas sem COLLATE NOCASE
+    return Q(**{f'{campo}__gte': prefixo, f'{campo}__lt': prefixo + '\uffff'})
+
+
+def _e_cpf(busca):
+    return bool(normalizar_cpf(busca)) and not re.sub(r'[\d.\-\s]', '', busca)
+
+
+def filtro(busca, prefixo=''):
+    """Q dos pacientes cujo CPF (se `busca` tem só dígitos e pontuação de CPF) ou nome começa com `busca`."""
+    busca = busca.strip()
+    if _e_cpf(busca):
+        return _comeca_com(f'{prefixo}cpf', normalizar_cpf(busca))
+    return _comeca_com(f'{prefixo}nome_busca', normalizar_nome(busca))
+
+
+def rotulo(nome, cpf):
+    return f'{nome} (CPF {cpf})'
+
+
+def sugestoes(busca, quantidade=SUGESTOES):
+    """Os primeiros `quantidade` pacientes para a busca, na ordem do índice usado, como {'id', 'texto'}."""
+    busca = (busca or '').strip()
+    if len(busca) < MINIMO_CARACTERES:
+        return []
+    ordenacao = ('cpf',) if _e_cpf(busca) else ('nome_busca', 'pk')
+    linhas = Paciente.objects.filter(filtro(busca)).order_by(*ordenacao).values_list('pk', 'nome_completo', 'cpf')
+    return [{'id': pk, 'texto': rotulo(nome, cpf)} for pk, nome, cpf in linhas[:quantidade]]
@@ -0,0 +1,161 @@
+# Paginação por cursor (keyset) para listagens grandes
+
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+PARAM_APOS = 'apos'
+PARAM_ANTES = 'antes'
+
+
+def _campo(ordem):
+    return ordem.lstrip('-')
+
+
+def _codificar(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores, default=str).encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor, campos):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if len(valores) != len(campos):
+            return None
+        return [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _filtro_apos(ordenacao, valores):
+    """Q que seleciona as linhas posteriores a `valores` na ordenação dada."""
+    filtro = Q()
+    for i, ordem in enumerate(ordenacao):
+        operador = 'lt' if ordem.startswith('-') else 'gt'
+        condicao = Q(**{f'{_campo(ordem)}__{operador}': valores[i]})
+        for anterior, valor in zip(ordenacao[:i], valores[:i]):
+            condicao &= Q(**{_campo(anterior): valor})
+        filtro |= condicao
+    # Limite redundante no primeiro campo: sem ele o banco não usa o OR como faixa do índice,
+    # percorre o índice desde o início e descarta as linhas até o cursor (páginas fundas ficam lentas)
+    operador = 'lte' if ordenacao[0].startswith('-') else 'gte'
+    return Q(**{f'{_campo(ordenacao[0])}__{operador}': valores[0]}) & filtro
+
+
+def _inverter(ordenacao):
+    return [_campo(ordem) if ordem.startswith('-') else f'-{ordem}' for ordem in ordenacao]
+
+
+class PaginaKeyset:
+    """
+    Uma página de `queryset` a partir do cursor em `parametros` (request.GET).
+
+    A ordenação precisa terminar em um campo único (normalmente 'pk') para que o
+    cursor identifique exatamente uma linha; assim cada página custa o mesmo que a primeira.
+    """
+
+    def __init__(self, queryset, ordenacao, itens_por_pagina, parametros):
+        self.ordenacao = list(ordenacao)
+        self.parametros = parametros
+        meta = queryset.model._meta
+        campos = [meta.pk if _campo(ordem) == 'pk' else meta.get_field(_campo(ordem)) for ordem in self.ordenacao]
+
+        apos = _decodificar(parametros.get(PARAM_APOS, ''), campos) if parametros.get(PARAM_APOS) else None
+        antes = _decodificar(parametros.get(PARAM_ANTES, ''), campos) if parametros.get(PARAM_ANTES) else None
+
+        if antes is not None:
+            # Página anterior: percorre na ordem inversa e desfaz a inversão no fim
+            linhas = list(
+                queryset.filter(_filtro_apos(_inverter(self.ordenacao), antes))
+                .order_by(*_inverter(self.ordenacao))[:itens_por_pagina + 1]
+            )
+            self.tem_anterior = len(linhas) > itens_por_pagina
+            self.itens = linhas[:itens_por_pagina][::-1]
+            self.tem_proxima = True
+        else:
+            if apos is not None:
+                queryset = queryset.filter(_filtro_apos(self.ordenacao, apos))
+            linhas = list(queryset.order_by(*self.ordenacao)[:itens_por_pagina + 1])
+            self.tem_proxima = len(linhas) > itens_por_pagina
+            self.itens = linhas[:itens_por_pagina]
+            self.tem_anterior = apos is not None
+
+        if not self.itens:
+            self.tem_anterior = self.tem_proxima = False
+
+    def _cursor(self, item):
+        valores = []
+        for ordem in self.ordenacao:
+            valor = getattr(item, _campo(ordem))
+            valores.append(valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+        return _codificar(valores)
+
+    def _url(self, parametro, item):
+        parametros = self.parametros.copy()
+        parametros.pop(PARAM_APOS, None)
+        parametros.pop(PARAM_ANTES, None)
+        parametros[parametro] = self._cursor(item)
+        return '?' + parametros.urlencode()
+
+    @property
+    def cursor_proximo(self):
+        """Cursor da próxima página (valor de `apos`), para APIs que não montam URLs."""
+        return self._cursor(self.itens[-1]) if self.tem_proxima else None
+
+    @property
+    def url_proxima(self):
+        return self._url(PARAM_APOS, self.itens[-1]) if self.tem_proxima else None
+
+    @property
+    def url_anterior(self):
+        return self._url(PARAM_ANTES, self.itens[0]) if self.tem_anterior else None
+
+
+class KeysetPaginationMixin:
+    """Substitui a paginação por OFFSET do ListView por paginação por cursor."""
+    ordenacao = ('pk',)
+    itens_por_pagina = 50
+
+    def get_context_data(self, **kwargs):
+        pagina = PaginaKeyset(self.object_list, self.ordenacao, self.itens_por_pagina, self.request.GET)
+        kwargs.setdefault('object_list', pagina.itens)
+        kwargs['pagina'] = pagina
+        return super().get_context_data(**kwargs)
+
+
+class PaginadorContagemAproximada(Paginator):
+    """
+    Paginator do admin que evita COUNT(*) na tabela inteira.
+
+    Sem filtros, estima o total pelo intervalo de ids (menor e maior id, duas buscas no
+    índice da chave primária; ids apagados deixam a estimativa um pouco acima e as últimas
+    páginas podem vir vazias). Com filtros, conta de verdade e reaproveita a contagem por
+    ADMIN_CONTAGEM_CACHE_SEGUNDOS.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.where:
+            ids = queryset.model._default_manager.order_by('pk').values_list('pk', flat=True)
+            menor = ids.first()
+            if menor is None:
+                return 0
+            maior = ids.last()
+            if isinstance(menor, int) and isinstance(maior, int):
+                return maior - menor + 1
+        sql, params = queryset.query.sql_with_params()
+        chave = 'contagem:' + hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        total = cache.get(chave)
+        if total is None:
+            total = queryset.count()
+            cache.set(chave, total, settings.ADMIN_CONTAGEM_CACHE_SEGUNDOS)
+        return total
@@ -0,0 +1,213 @@
+# Quadro do dia da recepção: as consultas de hoje e as alterações delas, enviadas por server-sent events
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import versoes
+from .models import Consulta
+
+CAMPOS = ('id', 'data_hora', 'status', 'paciente__nome_completo', 'medico__nome_completo', 'sala__nome')
+# Eventos guardados para quem reconecta com Last-Event-ID e eventos que esperam uma tela lenta
+HISTORICO = 256
+FILA_MAXIMA = 100
+# Marca de que a tela perdeu eventos e precisa da lista inteira de novo
+RECARREGAR = object()
+
+
+def pulso():
+    # Intervalo dos comentários que mantêm a conexão aberta (proxies fecham conexões ociosas)
+    return getattr(settings, 'QUADRO_PULSO_SEGUNDOS', 15)
+
+
+def reconexao():
+    return getattr(settings, 'QUADRO_RECONEXAO_SEGUNDOS', 5)
+
+
+class Canal:
+    """
+    Pub/sub do processo: cada tela conectada assina uma fila asyncio no seu event loop, e uma
+    alteração publicada (de qualquer thread) é entregue a todas elas.
+
+    Os ids dos eventos levam um prefixo do processo: um Last-Event-ID de outro processo (ou de
+    antes de um reinício) não é confundido com um id daqui.
+    """
+
+    def __init__(self, historico=HISTORICO, fila=FILA_MAXIMA):
+        self.prefixo = f'{os.getpid()}.{timezone.now().timestamp():.0f}'
+        self.fila = fila
+        self._lock = threading.Lock()
+        self._contador = itertools.count(1)
+        self._historico = deque(maxlen=historico)
+        self._assinantes = set()
+
+    def assinar(self):
+        """Nova fila de eventos; chame de dentro do event loop que vai lê-la."""
+        assinatura = (asyncio.get_running_loop(), asyncio.Queue(self.fila))
+        with self._lock:
+            self._assinantes.add(assinatura)
+        return assinatura[1]
+
+    def cancelar(self, fila):
+        with self._lock:
+            self._assinantes = {assinatura for assinatura in self._assinantes if assinatura[1] is not fila}
+
+    def assinantes(self):
+        return len(self._assinantes)
+
+    def ultimo_id(self):
+        with self._lock:
+            return self._historico[-1][0] if self._historico else f'{self.prefixo}-0'
+
+    def publicar(self, tipo, dados, versao=None):
+        with self._lock:
+            evento = (f'{self.prefixo}-{next(self._contador)}', tipo, dados, versao)
+            self._historico.append(evento)
+            assinantes = list(self._assinantes)
+        for loop, fila in assinantes:
+            try:
+                loop.call_soon_threadsafe(_entregar, fila, evento)
+            except RuntimeError:
+                self.cancelar(fila)  # event loop já encerrado
+        return evento[0]
+
+    def desde(self, ultimo_id):
+        """Eventos posteriores a `ultimo_id`, ou None se o histórico deste processo não os tem."""
+        prefixo, _, numero = (ultimo_id or '').rpartition('-')
+        if prefixo != self.prefixo or not numero.isdigit():
+            return None
+        with self._lock:
+            eventos = list(self._historico)
+        if int(numero) == 0 and not eventos:
+            return []
+        if not eventos or int(eventos[0][0].rpartition('-')[2]) > int(numero) + 1:
+            return None
+        return [evento for evento in eventos if int(evento[0].rpartition('-')[2]) > int(numero)]
+
+
+def _entregar(fila, evento):
+    if fila.full():
+        # Tela lenta: descarta o atraso e manda recarregar a lista inteira
+        while not fila.empty():
+            fila.get_nowait()
+        fila.put_nowait(RECARREGAR)
+    else:
+        fila.put_nowait(evento)
+
+
+canal = Canal()
+
+
+# Publicação (sinais de Consulta)
+
+def _hoje():
+    hoje = timezone.localdate()
+    inicio = timezone.make_aware(datetime.combine(hoje, time.min))
+    return inicio, inicio + timedelta(days=1)
+
+
+def _de_hoje(data_hora):
+    inicio, fim = _hoje()
+    return data_hora is not None and inicio <= data_hora < fim
+
+
+def _linha(valores):
+    return {
+        'id': valores['id'],
+        'hora': timezone.localtime(valores['data_hora']).strftime('%H:%M'),
+        'paciente': valores['paciente__nome_completo'],
+        'medico': valores['medico__nome_completo'],
+        'sala': valores['sala__nome'],
+        'status': valores['status'],
+    }
+
+
+def _publicar(consulta_id):
+    """Após o commit: manda a consulta como está no banco (ou a remoção, se saiu de hoje ou foi excluída)."""
+    def publicar():
+        anterior = versoes.versao('quadro')
+        versoes.invalidar('quadro')
+        versao = versoes.versao('quadro')
+        valores = Consulta.objects.filter(pk=consulta_id, data_hora__range=_hoje()).values(*CAMPOS).first()
+        # Uma versão que pulou mais de um passo teve alterações de outro processo no meio
+        versao = (anterior, versao) if versao == anterior + 1 else None
+        if valores is None:
+            canal.publicar('removida', {'id': consulta_id}, versao)
+        else:
+            canal.publicar('consulta', _linha(valores), versao)
+    transaction.on_commit(publicar)
+
+
+def consulta_alterada(anterior, consulta):
+    if _de_hoje(consulta.data_hora) or (anterior and _de_hoje(anterior['data_hora'])):
+        _publicar(consulta.pk)
+
+
+def consulta_removida(consulta):
+    if _de_hoje(consulta.data_hora):
+        _publicar(consulta.pk)
+
+
+# Leitura (view de eventos)
+
+def _formatar(tipo, dados, id_evento=None):
+    linhas = [f'id: {id_evento}'] if id_evento else []
+    linhas += [f'event: {tipo}', f'data: {json.dumps(dados, ensure_ascii=False)}']
+    return '\n'.join(linhas) + '\n\n'
+
+
+async def _lista_do_dia():
+    # O id vem antes da consulta: um evento publicado durante ela é reenviado a quem reconectar
+    id_evento = canal.ultimo_id()
+    consultas = Consulta.objects.filter(data_hora__range=_hoje()).order_by('data_hora', 'id').values(*CAMPOS)
+    return _formatar('inicial', {'consultas': [_linha(valores) async for valores in consultas]}, id_evento)
+
+
+async def eventos(ultimo_id=None, continuo=True):
+    """
+    Texto do stream: a lista de hoje (ou só o que a tela perdeu, se ela reconectou com um id
+    ainda no histórico) e depois cada alteração. Sem `continuo`, termina aí e o navegador
+    reconecta em QUADRO_RECONEXAO_SEGUNDOS (servidor WSGI, que não pode prender a thread).
+    """
+    fila = canal.assinar() if continuo else None
+    try:
+        yield f'retry: {reconexao() * 1000}\n\n'
+        # A versão lida antes da lista: uma alteração de outro processo depois dela é notada no pulso
+        visto = await sync_to_async(versoes.versao)('quadro') if continuo else None
+        perdidos = canal.desde(ultimo_id)
+        if perdidos is None:
+            yield await _lista_do_dia()
+        else:
+            for id_evento, tipo, dados, _ in perdidos:
+                yield _formatar(tipo, dados, id_evento)
+        while continuo:
+            try:
+                evento = await asyncio.wait_for(fila.get(), pulso())
+            except asyncio.TimeoutError:
+                atual = await sync_to_async(versoes.versao)('quadro')
+                if atual != visto:
+                    visto = atual
+                    yield await _lista_do_dia()
+                else:
+                    yield ': pulso\n\n'
+                continue
+            if evento is RECARREGAR:
+                visto = await sync_to_async(versoes.versao)('quadro')
+                yield await _lista_do_dia()
+                continue
+            id_evento, tipo, dados, versao = evento
+            if versao is not None and versao[0] == visto:
+                visto = versao[1]
+            yield _formatar(tipo, dados, id_evento)
+    finally:
+        if fila is not None:
+            canal.cancelar(fila)
@@ -0,0 +1,145 @@
+# Leituras em réplicas do banco: só as views marcadas com leitura_em_replica, em GET/HEAD,
+# e nunca logo depois de uma escrita do mesmo navegador (ler o que acabou de gravar)
+
+import random
+import sqlite3
+import time
+from contextlib import closing
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+COOKIE = 'clinica_primario_ate'
+
+# Estado da requisição atual (None fora de requisições: comandos, sinais em testes etc. usam o principal)
+_estado = ContextVar('clinica_replicas_estado', default=None)
+
+
+class _Estado:
+    __slots__ = ('replica', 'escreveu')
+
+    def __init__(self):
+        self.replica = None
+        self.escreveu = False
+
+
+def replicas():
+    """Aliases das réplicas configuradas (ver config/database.py)."""
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def atraso_maximo():
+    # Maior atraso esperado de uma réplica: janela de leitura no principal depois de uma escrita
+    return getattr(settings, 'REPLICA_ATRASO_SEGUNDOS', 30)
+
+
+def leitura_em_replica(view):
+    """Marca uma view (função ou classe) cujas leituras em GET/HEAD podem ir para uma réplica."""
+    view.leitura_em_replica = True
+    return view
+
+
+def lendo_da_replica():
+    estado = _estado.get()
+    return estado is not None and estado.replica is not None
+
+
+def validade_cache(segundos):
+    """Validade de um valor posto no cache: lido de uma réplica, pode estar atrasado, então vale menos."""
+    return min(segundos, atraso_maximo()) if lendo_da_replica() else segundos
+
+
+def replicar(alias):
+    """
+    Copia o banco principal para a réplica `alias` com a API de backup do SQLite (cópia consistente,
+    sem parar as escritas no principal). Leitores da réplica veem o banco antigo ou o novo, nunca uma mistura.
+    """
+    origem = connections['default'].settings_dict
+    destino = connections[alias].settings_dict
+    if origem['ENGINE'] != 'django.db.backends.sqlite3' or destino['ENGINE'] != origem['ENGINE']:
+        raise ValueError('Só bancos SQLite são copiados; em outros bancos use a replicação do próprio servidor.')
+    espera = origem['OPTIONS'].get('timeout', 5)
+    with closing(sqlite3.connect(origem['NAME'], timeout=espera)) as fonte, \
+            closing(sqlite3.connect(destino['NAME'], timeout=espera)) as copia:
+        fonte.backup(copia)
+        return fonte.execute('PRAGMA page_count').fetchone()[0]
+
+
+class RoteadorReplicas:
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or estado.replica is None:
+            return None
+        # Sessões são gravadas a cada login/logout: sempre do principal
+        if model._meta.app_label == 'sessions':
+            return None
+        if connections['default'].in_atomic_block:
+            return None
+        return estado.replica
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            # O resto da requisição (e as próximas, pelo cookie) lê do principal
+            estado.escreveu = True
+            estado.replica = None
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas são cópias do principal (replicar_banco), inclusive do esquema
+        if db.startswith('replica'):
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    # A fixação no principal fica em um cookie (e não na sessão) para não ser, ela mesma, uma escrita
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        token = _estado.set(_Estado())
+        try:
+            return self.fixar(self.get_response(request))
+        finally:
+            _estado.reset(token)
+
+    async def _acall(self, request):
+        token = _estado.set(_Estado())
+        try:
+            return self.fixar(await self.get_response(request))
+        finally:
+            _estado.reset(token)
+
+    def fixar(self, response):
+        if _estado.get().escreveu:
+            atraso = atraso_maximo()
+            response.set_cookie(COOKIE, str(int(time.time()) + atraso), max_age=atraso, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        alvo = getattr(view_func, 'view_class', view_func)
+        if request.method not in ('GET', 'HEAD') or not getattr(alvo, 'leitura_em_replica', False):
+            return None
+        if not replicas() or self.fixado(request):
+            return None
+        _estado.get().replica = random.choice(replicas())
+        return None
+
+    def fixado(self, request):
+        try:
+            return int(request.COOKIES.get(COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,116 @@
+# Totais do painel de gerenciamento, mantidos incrementalmente pelos sinais
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import replicas, versoes
+from .models import Consulta, Contador, Medico, Paciente, ResumoDiario, Sala
+
+CONTADORES = {
+    'pacientes': Paciente,
+    'medicos': Medico,
+}
+
+
+def _depois_de_alterar():
+    versoes.invalidar('painel')
+
+
+def ajustar_contador(nome, delta):
+    if not Contador.objects.filter(nome=nome).update(valor=F('valor') + delta):
+        # Primeira vez: conta tudo (a linha que disparou o sinal já está incluída)
+        try:
+            with transaction.atomic():
+                Contador.objects.create(nome=nome, valor=CONTADORES[nome].objects.count())
+        except IntegrityError:
+            Contador.objects.filter(nome=nome).update(valor=F('valor') + delta)
+    _depois_de_alterar()
+
+
+def _somar(data, sala_id, status, total, minutos):
+    filtro = {'data': data, 'sala_id': sala_id, 'status': status}
+    if ResumoDiario.objects.filter(**filtro).update(total=F('total') + total, minutos=F('minutos') + minutos):
+        return
+    try:
+        with transaction.atomic():
+            ResumoDiario.objects.create(total=total, minutos=minutos, **filtro)
+    except IntegrityError:
+        # Outra transação criou a linha ao mesmo tempo
+        ResumoDiario.objects.filter(**filtro).update(total=F('total') + total, minutos=F('minutos') + minutos)
+
+
+def consulta_alterada(anterior, atual):
+    """Move a consulta do grupo (dia, sala, status) anterior para o atual; dicts ou None."""
+    chaves = [
+        (timezone.localtime(valores['data_hora']).date(), valores['sala_id'], valores['status'])
+        for valores in (anterior, atual) if valores
+    ]
+    if anterior and atual and chaves[0] == chaves[1] and anterior['duracao_minutos'] == atual['duracao_minutos']:
+        return
+    if anterior:
+        _somar(*chaves[0], -1, -anterior['duracao_minutos'])
+    if atual:
+        _somar(*chaves[-1], 1, atual['duracao_minutos'])
+    _depois_de_alterar()
+
+
+def recalcular_contadores():
+    for nome, modelo in CONTADORES.items():
+        Contador.objects.update_or_create(nome=nome, defaults={'valor': modelo.objects.count()})
+    _depois_de_alterar()
+
+
+@transaction.atomic
+def recalcular():
+    """Recria contadores e resumos a partir das tabelas (após importações em massa ou para corrigir desvios)."""
+    recalcular_contadores()
+    ResumoDiario.objects.all().delete()
+    # TruncDate usa o fuso horário atual, o mesmo de timezone.localtime() nos sinais
+    linhas = Consulta.objects.annotate(data=TruncDate('data_hora')).values('data', 'sala_id', 'status').annotate(
+        total=Count('id'), minutos=Sum('duracao_minutos'),
+    ).order_by()
+    ResumoDiario.objects.bulk_create([ResumoDiario(**linha) for linha in linhas], batch_size=1000)
+    _depois_de_alterar()
+    return len(linhas)
+
+
+def painel(hoje=None):
+    """Indicadores do painel, lidos do cache ou de três consultas pequenas (contadores, salas e resumos da semana)."""
+    hoje = hoje or timezone.localdate()
+    chave = versoes.chave('painel', hoje)
+    dados = cache.get(chave)
+    if dados is not None:
+        return dados
+
+    inicio_semana = hoje - timedelta(days=hoje.weekday())
+    contadores = dict(Contador.objects.filter(nome__in=CONTADORES).values_list('nome', 'valor'))
+    por_status = {status: 0 for status, _ in Consulta.STATUS_CHOICES}
+    salas = {pk: {'nome': nome, 'consultas': 0, 'minutos': 0} for pk, nome in Sala.objects.values_list('pk', 'nome')}
+    canceladas_semana = 0
+    for data, sala_id, status, total, minutos in ResumoDiario.objects.filter(
+        data__gte=inicio_semana, data__lt=inicio_semana + timedelta(days=7),
+    ).values_list('data', 'sala_id', 'status', 'total', 'minutos'):
+        if status == 'Cancelada':
+            canceladas_semana += total
+        if data != hoje:
+            continue
+        por_status[status] += total
+        if status != 'Cancelada' and sala_id in salas:
+            salas[sala_id]['consultas'] += total
+            salas[sala_id]['minutos'] += minutos
+
+    dados = {
+        'total_pacientes': contadores.get('pacientes', 0),
+        'total_medicos': contadores.get('medicos', 0),
+        'consultas_hoje': sum(total for status, total in por_status.items() if status != 'Cancelada'),
+        'consultas_hoje_por_status': por_status,
+        'ocupacao_salas': sorted(salas.values(), key=lambda sala: sala['nome']),
+        'canceladas_semana': canceladas_semana,
+    }
+    cache.set(chave, dados, replicas.validade_cache(300))
+    return dados
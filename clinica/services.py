@@ -5,4 +5,11 @@ class NotificationService:
         print(f"--- SIMULANDO ENVIO DE NOTIFICAÇÃO ---")
         print(f"Para: {user_email}")
         print(f"Mensagem: {message}")
-        print(f"------------------------------------")
\ No newline at end of file
+        print(f"------------------------------------")
+
+
+class OutboxNotificationService:
+    # Grava a notificação na caixa de saída; o envio real é feito pelo comando processar_notificacoes
+    def send_notification(self, user_email, message):
+        from .models import Notificacao
+        return Notificacao.objects.create(destinatario=user_email or '', mensagem=message)
@@ -0,0 +1,141 @@
+# Sinais que mantêm as tabelas derivadas em dia com as alterações dos modelos
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import agenda, quadro, resumos, versoes
+from .models import Consulta, Disponibilidade, Especialidade, HorarioAgenda, Medico, Paciente, RegistroProntuario, Sala
+
+
+def _valores_anteriores(sender, instance, campos):
+    if instance.pk is None:
+        return None
+    return sender.objects.filter(pk=instance.pk).values(*campos).first()
+
+
+def _exclusao_direta(sender, origin):
+    # Exclusões em cascata (ex.: de um Medico) não precisam recalcular nada
+    modelo = getattr(origin, 'model', type(origin))
+    return modelo is sender
+
+
+# Disponibilidade: recria os horários do médico
+
+@receiver(pre_save, sender=Disponibilidade)
+def disponibilidade_pre_save(sender, instance, **kwargs):
+    instance._anterior = _valores_anteriores(sender, instance, ['medico_id'])
+
+
+@receiver(post_save, sender=Disponibilidade)
+def disponibilidade_post_save(sender, instance, **kwargs):
+    anterior = getattr(instance, '_anterior', None)
+    if anterior and anterior['medico_id'] != instance.medico_id:
+        agenda.materializar_medico(anterior['medico_id'])
+    agenda.materializar_medico(instance.medico_id)
+
+
+@receiver(post_delete, sender=Disponibilidade)
+def disponibilidade_post_delete(sender, instance, origin=None, **kwargs):
+    if _exclusao_direta(sender, origin):
+        agenda.materializar_medico(instance.medico_id)
+
+
+# Consulta: marca/desmarca os slots afetados
+
+@receiver(pre_save, sender=Consulta)
+def consulta_pre_save(sender, instance, **kwargs):
+    instance._anterior = _valores_anteriores(sender, instance, ['medico_id', 'sala_id', 'data_hora', 'duracao_minutos', 'status'])
+
+
+@receiver(post_save, sender=Consulta)
+def consulta_post_save(sender, instance, **kwargs):
+    anterior = getattr(instance, '_anterior', None)
+    if anterior and (anterior['data_hora'], anterior['duracao_minutos']) != (instance.data_hora, instance.duracao_minutos):
+        agenda.atualizar_horarios(anterior['data_hora'], anterior['duracao_minutos'])
+    agenda.atualizar_horarios(instance.data_hora, instance.duracao_minutos)
+    resumos.consulta_alterada(anterior, _valores_do_resumo(instance))
+    quadro.consulta_alterada(anterior, instance)
+
+
+@receiver(post_delete, sender=Consulta)
+def consulta_post_delete(sender, instance, **kwargs):
+    agenda.atualizar_horarios(instance.data_hora, instance.duracao_minutos)
+    resumos.consulta_alterada(_valores_do_resumo(instance), None)
+    quadro.consulta_removida(instance)
+
+
+def _valores_do_resumo(consulta):
+    return {
+        'data_hora': consulta.data_hora, 'sala_id': consulta.sala_id,
+        'status': consulta.status, 'duracao_minutos': consulta.duracao_minutos,
+    }
+
+
+# RegistroProntuario: conta como alteração da consulta para as exportações incrementais
+
+@receiver(post_save, sender=RegistroProntuario)
+def prontuario_post_save(sender, instance, **kwargs):
+    Consulta.objects.filter(pk=instance.consulta_id).update(atualizado_em=timezone.now())
+
+
+# Sala: ajusta a capacidade dos slots futuros
+
+@receiver(post_save, sender=Sala)
+def sala_post_save(sender, instance, created, **kwargs):
+    if created:
+        HorarioAgenda.objects.filter(inicio__gte=timezone.now()).update(salas_livres=F('salas_livres') + 1)
+        versoes.invalidar_apos_commit('agenda')
+
+
+@receiver(post_delete, sender=Sala)
+def sala_post_delete(sender, instance, **kwargs):
+    # Salas com consultas são protegidas (PROTECT), então a sala removida estava livre em todos os slots
+    HorarioAgenda.objects.filter(inicio__gte=timezone.now()).update(
+        salas_livres=Greatest(F('salas_livres') - 1, 0)
+    )
+    versoes.invalidar_apos_commit('agenda')
+
+
+# Medico/Especialidade: invalida a lista de médicos e as páginas de agenda em cache
+
+@receiver(post_save, sender=Medico)
+@receiver(post_delete, sender=Medico)
+def medico_alterado(sender, instance, **kwargs):
+    versoes.invalidar_apos_commit('medicos', versoes.grupo_do_medico(instance.pk))
+
+
+@receiver(post_save, sender=Especialidade)
+@receiver(post_delete, sender=Especialidade)
+def especialidade_alterada(sender, **kwargs):
+    versoes.invalidar_apos_commit('medicos', 'agenda')
+
+
+@receiver(m2m_changed, sender=Medico.especialidades.through)
+def especialidades_do_medico_alteradas(sender, instance, action, pk_set=None, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Medico):
+        versoes.invalidar_apos_commit('medicos', versoes.grupo_do_medico(instance.pk))
+    else:
+        versoes.invalidar_apos_commit('medicos', 'agenda')
+
+
+# Paciente/Medico: totais do painel de gerenciamento
+
+_CONTADORES = {Paciente: 'pacientes', Medico: 'medicos'}
+
+
+@receiver(post_save, sender=Paciente)
+@receiver(post_save, sender=Medico)
+def cadastro_criado(sender, instance, created, **kwargs):
+    if created:
+        resumos.ajustar_contador(_CONTADORES[sender], 1)
+
+
+@receiver(post_delete, sender=Paciente)
+@receiver(post_delete, sender=Medico)
+def cadastro_removido(sender, instance, **kwargs):
+    resumos.ajustar_contador(_CONTADORES[sender], -1)
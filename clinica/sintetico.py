@@ -0,0 +1,227 @@
+# Clínica sintética (médicos, pacientes, agendas e anos de consultas) para medir desempenho com volume realista
+
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import agenda, analises, resumos, versoes
+from .models import (
+    Consulta, Convenio, Disponibilidade, Especialidade, Medico, Paciente, RegistroProntuario, Sala, Usuario,
+    normalizar_nome,
+)
+
+# Prefixo dos usernames gerados; todos os usuários têm a senha SENHA
+PREFIXO = 'sintetico'
+SENHA = 'sintetico'
+
+NOMES = (
+    'Ana', 'Bruno', 'Camila', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João', 'Júlia',
+    'Lucas', 'Mariana', 'Nicolas', 'Otávio', 'Patrícia', 'Rafael', 'Sofia', 'Thiago', 'Valéria',
+)
+SOBRENOMES = (
+    'Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Dias', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Oliveira',
+    'Pereira', 'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza', 'Teixeira', 'Vieira',
+)
+ESPECIALIDADES = (
+    'Cardiologia', 'Clínica Geral', 'Dermatologia', 'Endocrinologia', 'Gastroenterologia', 'Ginecologia',
+    'Neurologia', 'Oftalmologia', 'Ortopedia', 'Otorrinolaringologia', 'Pediatria', 'Psiquiatria',
+    'Reumatologia', 'Urologia', 'Pneumologia',
+)
+CONVENIOS = ('Unimed', 'Bradesco Saúde', 'SulAmérica', 'Amil', 'Cassi')
+QUEIXAS = (
+    'cefaleia persistente', 'dor lombar', 'tosse seca', 'febre há três dias', 'dor torácica aos esforços',
+    'lesão de pele pruriginosa', 'hipertensão arterial descompensada', 'dispneia leve', 'dor abdominal difusa',
+    'insônia', 'controle de diabetes', 'dor no joelho direito', 'rinite alérgica', 'ansiedade', 'check-up anual',
+)
+CONDUTAS = (
+    'Solicitados exames laboratoriais.', 'Orientado retorno em 30 dias.', 'Encaminhado para fisioterapia.',
+    'Mantida medicação de uso contínuo.', 'Solicitado eletrocardiograma.', 'Orientações de dieta e atividade física.',
+)
+PRESCRICOES = (
+    'Dipirona 500 mg de 6/6 h', 'Amoxicilina 500 mg de 8/8 h por 7 dias', 'Losartana 50 mg 1x ao dia',
+    'Metformina 850 mg 2x ao dia', 'Ibuprofeno 600 mg de 8/8 h', 'Loratadina 10 mg 1x ao dia', 'Omeprazol 20 mg em jejum',
+)
+# Turnos de atendimento (início, fim) sorteados para cada dia de trabalho do médico
+TURNOS = ((time(8), time(12)), (time(13), time(18)), (time(8), time(17)))
+
+
+class ClinicaSintetica:
+    """
+    Gera os dados com bulk_create em blocos de `lote` linhas, sem sinais, e no fim refaz o que os
+    sinais manteriam (agenda materializada, resumos do painel e tabelas de análise).
+
+    Com a mesma `semente` e o mesmo dia, gera os mesmos dados.
+    """
+
+    def __init__(self, medicos=50, especialidades=10, salas=10, pacientes=5000, anos=2, ocupacao=0.6, semente=0, lote=2000):
+        self.quantidades = {'medicos': medicos, 'especialidades': especialidades, 'salas': salas, 'pacientes': pacientes}
+        self.anos = anos
+        self.ocupacao = ocupacao
+        self.lote = lote
+        self.aleatorio = random.Random(semente)
+        self.senha = make_password(SENHA)  # um hash só: calcular um por usuário levaria minutos
+
+    def gerar(self, progresso=None):
+        if Usuario.objects.filter(username__startswith=f'{PREFIXO}-').exists():
+            raise ValueError('Este banco já tem uma clínica sintética; use um banco vazio (ex.: DB_NOME=outro.sqlite3).')
+        progresso = progresso or (lambda mensagem: None)
+        totais = {}
+
+        with transaction.atomic():
+            Usuario.objects.create_superuser(f'{PREFIXO}-admin', f'{PREFIXO}-admin@exemplo.com', SENHA)
+            convenios = self.convenios()
+            especialidades = self.especialidades()
+            salas = Sala.objects.bulk_create([
+                Sala(nome=f'Consultório {n + 1}') for n in range(self.quantidades['salas'])
+            ])
+            medicos = self.medicos(especialidades, convenios)
+            disponibilidades = self.disponibilidades(medicos)
+        totais.update(medicos=len(medicos), salas=len(salas), disponibilidades=len(disponibilidades))
+        progresso(f'{len(medicos)} médicos e {len(disponibilidades)} disponibilidades.')
+
+        pacientes = self.pacientes(convenios)
+        totais['pacientes'] = len(pacientes)
+        progresso(f'{len(pacientes)} pacientes.')
+
+        totais['consultas'], totais['prontuarios'] = self.consultas(disponibilidades, [sala.pk for sala in salas], pacientes, progresso)
+        progresso(f'{totais["consultas"]} consultas e {totais["prontuarios"]} prontuários.')
+
+        # O que os sinais fariam a cada alteração
+        for medico in medicos:
+            agenda.materializar_medico(medico.pk)
+        resumos.recalcular()
+        analises.reconstruir()
+        versoes.invalidar('medicos')
+        return totais
+
+    def nome(self):
+        return f'{self.aleatorio.choice(NOMES)} {self.aleatorio.choice(SOBRENOMES)} {self.aleatorio.choice(SOBRENOMES)}'
+
+    def convenios(self):
+        return [Convenio.objects.get_or_create(nome=nome)[0] for nome in CONVENIOS]
+
+    def especialidades(self):
+        nomes = [
+            ESPECIALIDADES[n % len(ESPECIALIDADES)] + (f' {n // len(ESPECIALIDADES) + 1}' if n >= len(ESPECIALIDADES) else '')
+            for n in range(self.quantidades['especialidades'])
+        ]
+        return [Especialidade.objects.get_or_create(nome=nome)[0] for nome in nomes]
+
+    def medicos(self, especialidades, convenios):
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(username=f'{PREFIXO}-medico{n}', password=self.senha, tipo_usuario='medico')
+            for n in range(self.quantidades['medicos'])
+        ])
+        nomes = [self.nome() for _ in usuarios]
+        medicos = Medico.objects.bulk_create([
+            Medico(usuario=usuario, nome_completo=nome, nome_busca=normalizar_nome(nome), crm=f'SINT{n:06d}')
+            for n, (usuario, nome) in enumerate(zip(usuarios, nomes))
+        ])
+        Medico.especialidades.through.objects.bulk_create([
+            Medico.especialidades.through(medico_id=medico.pk, especialidade_id=especialidade.pk)
+            for medico in medicos
+            for especialidade in self.aleatorio.sample(especialidades, min(len(especialidades), self.aleatorio.randint(1, 2)))
+        ])
+        Medico.convenios.through.objects.bulk_create([
+            Medico.convenios.through(medico_id=medico.pk, convenio_id=convenio.pk)
+            for medico in medicos
+            for convenio in self.aleatorio.sample(convenios, self.aleatorio.randint(0, len(convenios)))
+        ])
+        return medicos
+
+    def disponibilidades(self, medicos):
+        disponibilidades = []
+        for medico in medicos:
+            for dia in sorted(self.aleatorio.sample(range(1, 7), self.aleatorio.randint(2, 5))):
+                hora_inicio, hora_fim = self.aleatorio.choice(TURNOS)
+                disponibilidades.append(Disponibilidade(medico=medico, dia_semana=dia, hora_inicio=hora_inicio, hora_fim=hora_fim))
+        return Disponibilidade.objects.bulk_create(disponibilidades, batch_size=self.lote)
+
+    def pacientes(self, convenios):
+        ids = []
+        for inicio in range(0, self.quantidades['pacientes'], self.lote):
+            numeros = range(inicio, min(inicio + self.lote, self.quantidades['pacientes']))
+            with transaction.atomic():
+                usuarios = Usuario.objects.bulk_create([
+                    Usuario(
+                        username=f'{PREFIXO}-paciente{n}', email=f'{PREFIXO}-paciente{n}@exemplo.com',
+                        password=self.senha, tipo_usuario='paciente',
+                    )
+                    for n in numeros
+                ])
+                pacientes = []
+                for n, usuario in zip(numeros, usuarios):
+                    nome = self.nome()
+                    pacientes.append(Paciente(
+                        usuario=usuario, nome_completo=nome, nome_busca=normalizar_nome(nome), cpf=f'9{n:010d}',
+                        data_nascimento=date(1940, 1, 1) + timedelta(days=self.aleatorio.randrange(80 * 365)),
+                        convenio=self.aleatorio.choice(convenios) if self.aleatorio.random() < 0.7 else None,
+                    ))
+                Paciente.objects.bulk_create(pacientes)
+            ids.extend(usuario.pk for usuario in usuarios)
+        return ids
+
+    def consultas(self, disponibilidades, salas, pacientes, progresso):
+        """Consultas de `anos` atrás até o fim do horizonte da agenda, dia a dia, gravadas em blocos."""
+        por_dia = {}
+        for disponibilidade in disponibilidades:
+            por_dia.setdefault(disponibilidade.dia_semana, []).append(disponibilidade)
+        duracao = agenda.duracao_padrao()
+        hoje = timezone.localdate()
+        agora = timezone.now()
+        dia, ultimo = hoje - timedelta(days=365 * self.anos), hoje + timedelta(days=agenda.limitar_horizonte())
+        total_consultas = total_prontuarios = 0
+        bloco = []
+
+        while dia <= ultimo:
+            salas_ocupadas, pacientes_ocupados = {}, {}
+            for disponibilidade in por_dia.get(dia.isoweekday(), ()):
+                inicio = timezone.make_aware(datetime.combine(dia, disponibilidade.hora_inicio))
+                fim = timezone.make_aware(datetime.combine(dia, disponibilidade.hora_fim))
+                while inicio + duracao <= fim:
+                    data_hora, inicio = inicio, inicio + duracao
+                    if self.aleatorio.random() >= self.ocupacao:
+                        continue
+                    livres = [sala for sala in salas if sala not in salas_ocupadas.setdefault(data_hora, set())]
+                    paciente = self.aleatorio.choice(pacientes)
+                    if not livres or paciente in pacientes_ocupados.setdefault(data_hora, set()):
+                        continue
+                    sala = self.aleatorio.choice(livres)
+                    salas_ocupadas[data_hora].add(sala)
+                    pacientes_ocupados[data_hora].add(paciente)
+                    bloco.append(Consulta(
+                        paciente_id=paciente, medico_id=disponibilidade.medico_id, sala_id=sala, data_hora=data_hora,
+                        status=self.status(data_hora < agora),
+                    ))
+            if len(bloco) >= self.lote or (dia == ultimo and bloco):
+                prontuarios = self.gravar(bloco)
+                total_consultas += len(bloco)
+                total_prontuarios += prontuarios
+                progresso(f'... {total_consultas} consultas até {dia:%d/%m/%Y}.')
+                bloco = []
+            dia += timedelta(days=1)
+        return total_consultas, total_prontuarios
+
+    def status(self, passada):
+        sorteio = self.aleatorio.random()
+        if sorteio < 0.08:
+            return 'Cancelada'
+        # Algumas consultas passadas ficam "Agendada" (faltas ou status não atualizado)
+        return 'Realizada' if passada and sorteio < 0.93 else 'Agendada'
+
+    @transaction.atomic
+    def gravar(self, consultas):
+        consultas = Consulta.objects.bulk_create(consultas)
+        prontuarios = [
+            RegistroProntuario(
+                consulta_id=consulta.pk,
+                descricao_atendimento=f'Paciente relata {self.aleatorio.choice(QUEIXAS)}. {self.aleatorio.choice(CONDUTAS)}',
+                prescricao=self.aleatorio.choice(PRESCRICOES) if self.aleatorio.random() < 0.6 else '',
+            )
+            for consulta in consultas if consulta.status == 'Realizada'
+        ]
+        RegistroProntuario.objects.bulk_create(prontuarios)
+        return len(prontuarios)
@@ -0,0 +1,34 @@
+// Sugestões dos campos AutocompletarWidget: busca em data-url enquanto se digita e guarda o id escolhido
+document.querySelectorAll('[data-autocompletar]').forEach(function (campo) {
+    var oculto = document.getElementById(campo.dataset.autocompletar);
+    var lista = document.getElementById(campo.getAttribute('list'));
+    var opcoes = {};
+    var espera = null;
+    if (oculto.value) {
+        opcoes[campo.value] = oculto.value;
+    }
+
+    campo.addEventListener('input', function () {
+        var busca = campo.value.trim();
+        oculto.value = opcoes[campo.value] || '';
+        clearTimeout(espera);
+        if (oculto.value || busca.length < 2) {
+            return;
+        }
+        espera = setTimeout(function () {
+            fetch(campo.dataset.url + '?q=' + encodeURIComponent(busca))
+                .then(function (resposta) { return resposta.json(); })
+                .then(function (dados) {
+                    lista.innerHTML = '';
+                    opcoes = {};
+                    dados.resultados.forEach(function (item) {
+                        var opcao = document.createElement('option');
+                        opcao.value = item.texto;
+                        lista.appendChild(opcao);
+                        opcoes[item.texto] = item.id;
+                    });
+                    oculto.value = opcoes[campo.value] || '';
+                });
+        }, 200);
+    });
+});
@@ -0,0 +1,59 @@
+// Quadro do dia: lista inicial e alterações das consultas de hoje por server-sent events (ver clinica/quadro.py)
+(function () {
+    var corpo = document.getElementById('quadro');
+    var situacao = document.getElementById('quadro-situacao');
+    var consultas = {};
+    var cores = {Agendada: 'bg-info text-dark', Realizada: 'bg-success', Cancelada: 'bg-danger'};
+
+    function celula(linha, texto) {
+        var td = document.createElement('td');
+        td.textContent = texto;
+        linha.appendChild(td);
+        return td;
+    }
+
+    function desenhar() {
+        var lista = Object.keys(consultas).map(function (id) { return consultas[id]; });
+        lista.sort(function (a, b) { return a.hora < b.hora ? -1 : a.hora > b.hora ? 1 : a.id - b.id; });
+        corpo.innerHTML = '';
+        if (!lista.length) {
+            celula(corpo.insertRow(), 'Nenhuma consulta hoje.').colSpan = 5;
+        }
+        lista.forEach(function (consulta) {
+            var linha = corpo.insertRow();
+            celula(linha, consulta.hora);
+            celula(linha, consulta.paciente);
+            celula(linha, consulta.medico);
+            celula(linha, consulta.sala);
+            var status = document.createElement('span');
+            status.className = 'badge ' + (cores[consulta.status] || 'bg-secondary');
+            status.textContent = consulta.status;
+            celula(linha, '').appendChild(status);
+        });
+    }
+
+    var fonte = new EventSource(corpo.dataset.url);
+    fonte.addEventListener('inicial', function (evento) {
+        consultas = {};
+        JSON.parse(evento.data).consultas.forEach(function (consulta) { consultas[consulta.id] = consulta; });
+        desenhar();
+    });
+    fonte.addEventListener('consulta', function (evento) {
+        var consulta = JSON.parse(evento.data);
+        consultas[consulta.id] = consulta;
+        desenhar();
+    });
+    fonte.addEventListener('removida', function (evento) {
+        delete consultas[JSON.parse(evento.data).id];
+        desenhar();
+    });
+    fonte.addEventListener('open', function () {
+        situacao.className = 'badge bg-success';
+        situacao.textContent = 'Ao vivo';
+    });
+    fonte.addEventListener('error', function () {
+        // O EventSource reconecta sozinho, com o último id recebido
+        situacao.className = 'badge bg-warning text-dark';
+        situacao.textContent = 'Reconectando...';
+    });
+})();
@@ -1,3 +1,1356 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import threading
+from datetime import datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from config import database
+
+from . import agenda, agendamento, analises, busca, calendario, exportacao, outbox, pacientes, quadro, replicas, resumos, urls
+from .importacao import ImportadorDeDisponibilidades, ImportadorDeMedicos, ImportadorDePacientes
+from .alocacao import POLITICA_MENOS_USADA, POLITICA_MESMA_SALA, AlocadorSalas
+from .forms import ConsultaForm, MedicoFiltroForm, PacienteUpdateForm
+from .paginacao import PaginadorContagemAproximada, PaginaKeyset
+from .models import (
+    Consulta, ConsultaAnalisada, Convenio, Disponibilidade, Especialidade, HorarioAgenda, Medico, Notificacao, Paciente,
+    RegistroProntuario, ResumoDiario, ResumoHorario, Sala, Usuario,
+)
+from .services import OutboxNotificationService
+
+
+def criar_medico(n, **kwargs):
+    usuario = Usuario.objects.create(username=f'medico{n}', tipo_usuario='medico')
+    medico = Medico.objects.create(usuario=usuario, nome_completo=f'Médico {n}', crm=f'CRM{n}', **kwargs)
+    for dia in range(1, 8):
+        Disponibilidade.objects.create(medico=medico, dia_semana=dia, hora_inicio=time(8), hora_fim=time(12))
+    return medico
+
+
+def criar_paciente(n, **kwargs):
+    usuario = Usuario.objects.create(username=f'paciente{n}', email=f'paciente{n}@exemplo.com')
+    return Paciente.objects.create(
+        usuario=usuario, nome_completo=f'Paciente {n}', cpf=f'{n:011d}', data_nascimento='1990-01-01', **kwargs
+    )
+
+
+def proximo_horario(medico):
+    return agenda.horarios_livres(medico, dias=2)[2]
+
+
+class AgendamentoTests(TestCase):
+    def setUp(self):
+        self.sala = Sala.objects.create(nome='Sala 1')
+        self.medico = criar_medico(1)
+        self.paciente = criar_paciente(1)
+        self.horario = proximo_horario(self.medico)
+
+    def test_agenda_e_ocupa_o_horario(self):
+        consulta = agendamento.agendar_consulta(self.paciente, self.medico, self.horario)
+        self.assertEqual(consulta.sala, self.sala)
+        self.assertNotIn(self.horario, agenda.horarios_livres(self.medico, dias=2))
+
+    def test_horario_do_medico_ja_ocupado(self):
+        agendamento.agendar_consulta(self.paciente, self.medico, self.horario)
+        with self.assertRaises(agendamento.HorarioIndisponivel):
+            agendamento.agendar_consulta(criar_paciente(2), self.medico, self.horario)
+
+    def test_paciente_ja_agendado_no_horario(self):
+        agendamento.agendar_consulta(self.paciente, self.medico, self.horario)
+        with self.assertRaises(agendamento.PacienteJaAgendado):
+            agendamento.agendar_consulta(self.paciente, criar_medico(2), self.horario)
+
+    def test_sem_sala_disponivel(self):
+        agendamento.agendar_consulta(self.paciente, self.medico, self.horario)
+        with self.assertRaises(agendamento.SemSalaDisponivel):
+            agendamento.agendar_consulta(criar_paciente(2), criar_medico(2), self.horario)
+
+    def test_consulta_cancelada_libera_o_horario(self):
+        consulta = agendamento.agendar_consulta(self.paciente, self.medico, self.horario)
+        consulta.status = 'Cancelada'
+        consulta.save()
+        agendamento.agendar_consulta(criar_paciente(2), self.medico, self.horario)
+
+    def test_horario_que_ja_passou(self):
+        # Slot de hoje que já passou, ainda na tabela até a próxima reconstrução
+        passado = timezone.now().replace(second=0, microsecond=0) - timedelta(hours=1)
+        HorarioAgenda.objects.create(medico=self.medico, inicio=passado, ocupado=False, salas_livres=1)
+        with self.assertRaisesMessage(agendamento.HorarioIndisponivel, 'já passou'):
+            agendamento.agendar_consulta(self.paciente, self.medico, passado)
+        self.assertFalse(Consulta.objects.exists())
+
+    def test_repete_apenas_bloqueios_do_banco(self):
+        agendar = agendamento._agendar
+        erros = [OperationalError('database is locked')]
+
+        def bloqueado_uma_vez(*args):
+            if erros:
+                raise erros.pop()
+            return agendar(*args)
+
+        with mock.patch.object(agendamento, '_agendar', side_effect=bloqueado_uma_vez) as chamadas:
+            agendamento.agendar_consulta(self.paciente, self.medico, self.horario)
+        self.assertEqual(chamadas.call_count, 2)
+
+        with mock.patch.object(agendamento, '_agendar', side_effect=OperationalError('no such table: clinica_consulta')) as chamadas:
+            with self.assertRaisesMessage(OperationalError, 'no such table'):
+                agendamento.agendar_consulta(criar_paciente(2), self.medico, self.horario)
+        self.assertEqual(chamadas.call_count, 1)
+
+
+class MotorDeHorariosTests(TestCase):
+    def setUp(self):
+        self.sala = Sala.objects.create(nome='Sala 1')
+        self.medico = criar_medico(1)
+        # Segunda-feira, 07:00 no fuso da clínica
+        self.agora = timezone.make_aware(datetime(2030, 1, 7, 7, 0))
+
+    def consulta(self, hora, minuto=0, **kwargs):
+        return Consulta.objects.create(
+            paciente=criar_paciente(Consulta.objects.count()), medico=self.medico, sala=self.sala,
+            data_hora=timezone.make_aware(datetime(2030, 1, 7, hora, minuto)), **kwargs,
+        )
+
+    def test_horarios_com_fuso_dentro_da_disponibilidade(self):
+        horarios = agenda.calcular_horarios_livres(self.medico, dias=1, agora=self.agora)
+        self.assertTrue(all(timezone.is_aware(inicio) for inicio in horarios))
+        self.assertEqual(
+            [timezone.localtime(inicio).strftime('%H:%M') for inicio in horarios],
+            ['08:00', '08:30', '09:00', '09:30', '10:00', '10:30', '11:00', '11:30'],
+        )
+        # Slots que já começaram ficam de fora
+        depois = agenda.calcular_horarios_livres(self.medico, dias=1, agora=self.agora.replace(hour=8, minute=10))
+        self.assertEqual(timezone.localtime(depois[0]).strftime('%H:%M'), '08:30')
+
+    def test_consultas_ativas_bloqueiam_e_canceladas_nao(self):
+        self.consulta(8, status='Cancelada')
+        self.consulta(9, duracao_minutos=60)
+        horarios = agenda.calcular_horarios_livres(self.medico, dias=1, agora=self.agora)
+        self.assertEqual(
+            [timezone.localtime(inicio).strftime('%H:%M') for inicio in horarios],
+            ['08:00', '08:30', '10:00', '10:30', '11:00', '11:30'],
+        )
+
+    def test_horizonte_limitado(self):
+        self.assertEqual(agenda.limitar_horizonte(None), 30)
+        self.assertEqual(agenda.limitar_horizonte('abc'), 30)
+        self.assertEqual(agenda.limitar_horizonte('7'), 7)
+        self.assertEqual(agenda.limitar_horizonte(0), 1)
+        self.assertEqual(agenda.limitar_horizonte(500), 90)
+        horarios = agenda.calcular_horarios_livres(self.medico, dias=500, agora=self.agora)
+        self.assertEqual(len(horarios), 90 * 8)
+        self.assertLess(horarios[-1], self.agora + timedelta(days=90))
+
+
+class HorariosMaterializadosTests(TestCase):
+    def setUp(self):
+        Sala.objects.bulk_create([Sala(nome='Sala 1'), Sala(nome='Sala 2')])
+        self.medicos = [criar_medico(n) for n in range(2)]
+        self.horario = proximo_horario(self.medicos[0])
+
+    def slot(self, medico, inicio=None):
+        return HorarioAgenda.objects.get(medico=medico, inicio=inicio or self.horario)
+
+    def test_disponibilidade_cria_e_remove_horarios(self):
+        medico = Medico.objects.create(
+            usuario=Usuario.objects.create(username='medico9', tipo_usuario='medico'), nome_completo='Médico 9', crm='CRM9',
+        )
+        self.assertFalse(HorarioAgenda.objects.filter(medico=medico).exists())
+        disponibilidade = Disponibilidade.objects.create(medico=medico, dia_semana=1, hora_inicio=time(8), hora_fim=time(12))
+        inicios = HorarioAgenda.objects.filter(medico=medico).values_list('inicio', flat=True)
+        self.assertTrue(inicios)
+        self.assertEqual({timezone.localtime(inicio).isoweekday() for inicio in inicios}, {1})
+        self.assertEqual(HorarioAgenda.objects.get(medico=medico, inicio=inicios[0]).salas_livres, 2)
+
+        disponibilidade.medico = self.medicos[1]
+        disponibilidade.save()
+        self.assertFalse(HorarioAgenda.objects.filter(medico=medico).exists())
+        Disponibilidade.objects.filter(medico=self.medicos[1]).delete()
+        for disponibilidade in Disponibilidade.objects.filter(medico=self.medicos[0]):
+            disponibilidade.delete()
+        self.assertFalse(HorarioAgenda.objects.filter(medico=self.medicos[0]).exists())
+
+    def test_consulta_ocupa_o_medico_e_uma_sala(self):
+        consulta = agendamento.agendar_consulta(criar_paciente(1), self.medicos[0], self.horario)
+        self.assertEqual((self.slot(self.medicos[0]).ocupado, self.slot(self.medicos[0]).salas_livres), (True, 1))
+        self.assertEqual((self.slot(self.medicos[1]).ocupado, self.slot(self.medicos[1]).salas_livres), (False, 1))
+
+        # Remarcada: o horário antigo volta a ficar livre e o novo é ocupado
+        novo = self.horario + timedelta(minutes=30)
+        consulta.data_hora = novo
+        consulta.save()
+        self.assertEqual((self.slot(self.medicos[0]).ocupado, self.slot(self.medicos[0]).salas_livres), (False, 2))
+        self.assertEqual((self.slot(self.medicos[0], novo).ocupado, self.slot(self.medicos[1], novo).salas_livres), (True, 1))
+
+        consulta.status = 'Cancelada'
+        consulta.save()
+        self.assertEqual((self.slot(self.medicos[0], novo).ocupado, self.slot(self.medicos[0], novo).salas_livres), (False, 2))
+        consulta.status = 'Agendada'
+        consulta.save()
+        consulta.delete()
+        self.assertEqual((self.slot(self.medicos[0], novo).ocupado, self.slot(self.medicos[0], novo).salas_livres), (False, 2))
+
+    def test_salas_ajustam_a_capacidade(self):
+        agendamento.agendar_consulta(criar_paciente(1), self.medicos[0], self.horario)
+        sala = Sala.objects.create(nome='Sala 3')
+        self.assertEqual(self.slot(self.medicos[1]).salas_livres, 2)
+        sala.delete()
+        # A sala sem a consulta (salas com consultas não podem ser removidas)
+        Sala.objects.exclude(consulta__isnull=False).get().delete()
+        self.assertEqual(self.slot(self.medicos[1]).salas_livres, 0)
+        self.assertEqual(self.slot(self.medicos[1], self.horario + timedelta(minutes=30)).salas_livres, 1)
+
+
+class RotasAssincronas:
+    # clinica/urls.py com as views assíncronas no lugar das síncronas (como com VIEWS_ASSINCRONAS ligado)
+    urlpatterns = [
+        path(str(padrao.pattern), urls.ASSINCRONAS.get(padrao.name, padrao.callback), name=padrao.name)
+        for padrao in urls.urlpatterns
+    ]
+
+
+@override_settings(ROOT_URLCONF=RotasAssincronas)
+class ViewsAssincronasTests(TestCase):
+    def setUp(self):
+        self.sala = Sala.objects.create(nome='Sala 1')
+        self.medico = criar_medico(1)
+        self.paciente = criar_paciente(1)
+        self.horario = proximo_horario(self.medico)
+        self.url_agendar = reverse('agendar_consulta', kwargs={
+            'medico_id': self.medico.pk, 'horario_str': timezone.localtime(self.horario).strftime('%Y-%m-%d-%H-%M'),
+        })
+
+    async def test_lista_e_agenda_do_medico(self):
+        await self.async_client.aforce_login(self.paciente.usuario)
+        resposta = await self.async_client.get(reverse('listar_medicos'))
+        self.assertContains(resposta, self.medico.nome_completo)
+        resposta = await self.async_client.get(reverse('detalhes_medico', kwargs={'medico_id': self.medico.pk}))
+        self.assertContains(resposta, self.url_agendar)
+
+    async def test_agendamento_com_notificacao_na_mesma_transacao(self):
+        await self.async_client.aforce_login(self.paciente.usuario)
+        resposta = await self.async_client.post(self.url_agendar)
+        self.assertRedirects(resposta, reverse('dashboard_redirect'), fetch_redirect_response=False)
+        self.assertEqual(await Consulta.objects.filter(paciente=self.paciente, data_hora=self.horario).acount(), 1)
+        self.assertEqual(await Notificacao.objects.filter(destinatario=self.paciente.usuario.email).acount(), 1)
+
+        outro = await sync_to_async(criar_paciente)(2)
+        await self.async_client.aforce_login(outro.usuario)
+        resposta = await self.async_client.post(self.url_agendar)
+        self.assertRedirects(
+            resposta, reverse('detalhes_medico', kwargs={'medico_id': self.medico.pk}), fetch_redirect_response=False,
+        )
+        self.assertEqual(await Notificacao.objects.acount(), 1)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.sala = Sala.objects.create(nome='Sala 1')
+        especialidade = Especialidade.objects.create(nome='Cardiologia')
+        self.medicos = [criar_medico(n) for n in range(3)]
+        self.medicos[0].especialidades.add(especialidade)
+        self.paciente = criar_paciente(1)
+        self.client.force_login(self.paciente.usuario)
+
+    def test_medicos_com_campos_e_cursor(self):
+        resposta = self.client.get(reverse('api_medicos'), {'campos': 'id,especialidades', 'limite': 2})
+        dados = resposta.json()
+        self.assertEqual(dados['resultados'], [
+            {'id': self.medicos[0].pk, 'especialidades': ['Cardiologia']}, {'id': self.medicos[1].pk, 'especialidades': []},
+        ])
+        resposta = self.client.get(reverse('api_medicos'), {'campos': 'nome', 'limite': 2, 'apos': dados['proximo']})
+        self.assertEqual(resposta.json(), {'resultados': [{'nome': 'Médico 2'}], 'proximo': None})
+
+        resposta = self.client.get(reverse('api_medicos'), {'campos': 'id,senha'})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('crm', resposta.json()['disponiveis'])
+
+    def test_horarios_agendamento_e_cancelamento(self):
+        horarios = self.client.get(reverse('api_horarios', kwargs={'medico_id': self.medicos[0].pk}), {'dias': 2}).json()['horarios']
+        self.assertEqual(horarios, [timezone.localtime(inicio).isoformat() for inicio in agenda.horarios_livres(self.medicos[0], dias=2)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(
+                reverse('api_consultas'), {'medico': self.medicos[0].pk, 'inicio': horarios[2]}, content_type='application/json',
+            )
+        self.assertEqual(resposta.status_code, 201)
+        consulta = resposta.json()
+        self.assertEqual((consulta['inicio'], consulta['status'], consulta['sala']), (horarios[2], 'Agendada', 'Sala 1'))
+        self.assertEqual(Notificacao.objects.filter(destinatario=self.paciente.usuario.email).count(), 1)
+        # A agenda em cache é invalidada pelo agendamento, como a página do médico
+        depois = self.client.get(reverse('api_horarios', kwargs={'medico_id': self.medicos[0].pk}), {'dias': 2}).json()['horarios']
+        self.assertNotIn(horarios[2], depois)
+
+        resposta = self.client.post(reverse('api_consultas'), {'medico': self.medicos[0].pk, 'inicio': horarios[2]})
+        self.assertEqual(resposta.status_code, 409)
+        self.assertIn('erro', resposta.json())
+
+        minhas = self.client.get(reverse('api_consultas'), {'futuras': 'on', 'campos': 'id,status'}).json()
+        self.assertEqual(minhas['resultados'], [{'id': consulta['id'], 'status': 'Agendada'}])
+
+        url_cancelar = reverse('api_cancelar_consulta', kwargs={'consulta_id': consulta['id']})
+        self.assertEqual(self.client.post(url_cancelar).json()['status'], 'Cancelada')
+        self.assertEqual(self.client.post(url_cancelar).status_code, 409)
+        self.assertFalse(HorarioAgenda.objects.get(medico=self.medicos[0], inicio=consulta['inicio']).ocupado)
+
+    def test_acesso(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_medicos')).status_code, 401)
+        self.client.force_login(self.medicos[0].usuario)
+        self.assertEqual(self.client.get(reverse('api_consultas')).status_code, 403)
+        outro = criar_paciente(2)
+        consulta = Consulta.objects.create(
+            paciente=self.paciente, medico=self.medicos[1], sala=self.sala, data_hora=proximo_horario(self.medicos[1]),
+        )
+        self.client.force_login(outro.usuario)
+        self.assertEqual(self.client.post(reverse('api_cancelar_consulta', kwargs={'consulta_id': consulta.pk})).status_code, 404)
+        self.assertEqual(self.client.post(reverse('api_consultas'), {'medico': 'x'}).status_code, 400)
+
+
+class QuadroDoDiaTests(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        self.sala = Sala.objects.create(nome='Sala 1')
+        self.medico = criar_medico(1)
+        self.paciente = criar_paciente(1)
+        self.hoje = timezone.make_aware(datetime.combine(timezone.localdate(), time(23)))
+
+    def consulta(self, data_hora, **kwargs):
+        return Consulta.objects.create(paciente=self.paciente, medico=self.medico, sala=self.sala, data_hora=data_hora, **kwargs)
+
+    def alterar(self, alteracao):
+        with self.captureOnCommitCallbacks(execute=True):
+            return alteracao()
+
+    def test_lista_do_dia_com_wsgi(self):
+        self.consulta(self.hoje)
+        self.consulta(self.hoje + timedelta(days=1))
+        self.client.force_login(self.admin)
+        resposta = self.client.get(reverse('quadro_eventos'))
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream')
+        inicial = next(bloco for bloco in resposta.content.decode().split('\n\n') if 'event: inicial' in bloco)
+        consultas = json.loads(inicial.split('data: ', 1)[1])['consultas']
+        self.assertEqual([(c['hora'], c['paciente'], c['status']) for c in consultas], [('23:00', 'Paciente 1', 'Agendada')])
+
+        self.client.force_login(self.paciente.usuario)
+        self.assertEqual(self.client.get(reverse('quadro_eventos')).status_code, 403)
+
+    async def test_alteracoes_publicadas_apos_o_commit(self):
+        fila = quadro.canal.assinar()
+        try:
+            consulta = await sync_to_async(self.alterar)(lambda: self.consulta(self.hoje))
+            _, tipo, dados, _ = await asyncio.wait_for(fila.get(), 1)
+            self.assertEqual((tipo, dados['id'], dados['status']), ('consulta', consulta.pk, 'Agendada'))
+
+            consulta.status = 'Cancelada'
+            await sync_to_async(self.alterar)(consulta.save)
+            _, tipo, dados, _ = await asyncio.wait_for(fila.get(), 1)
+            self.assertEqual((tipo, dados['status']), ('consulta', 'Cancelada'))
+
+            # Saiu de hoje: some do quadro; consultas de outros dias não geram eventos
+            consulta.data_hora += timedelta(days=1)
+            await sync_to_async(self.alterar)(consulta.save)
+            _, tipo, dados, _ = await asyncio.wait_for(fila.get(), 1)
+            self.assertEqual((tipo, dados), ('removida', {'id': consulta.pk}))
+            await sync_to_async(self.alterar)(lambda: self.consulta(self.hoje + timedelta(days=2)))
+            await asyncio.sleep(0)
+            self.assertTrue(fila.empty())
+        finally:
+            quadro.canal.cancelar(fila)
+
+    async def test_stream_com_asgi(self):
+        await sync_to_async(self.consulta)(self.hoje)
+        await self.async_client.aforce_login(self.admin)
+        resposta = await self.async_client.get(reverse('quadro_eventos'))
+        conteudo = aiter(resposta.streaming_content)
+        self.assertIn(b'retry: ', await anext(conteudo))
+        self.assertIn(b'event: inicial', await anext(conteudo))
+        await sync_to_async(self.alterar)(lambda: self.consulta(self.hoje - timedelta(hours=1)))
+        evento = await asyncio.wait_for(anext(conteudo), 1)
+        self.assertIn(b'event: consulta', evento)
+        self.assertIn(b'"hora": "22:00"', evento)
+        await conteudo.aclose()
+
+    async def test_reconexao_e_tela_lenta(self):
+        canal = quadro.Canal(historico=3, fila=2)
+        ids = [canal.publicar('removida', {'id': n}) for n in range(4)]
+        # Só o que a tela perdeu, se ainda está no histórico; senão, a lista inteira (None)
+        self.assertEqual([evento[0] for evento in canal.desde(ids[0])], ids[1:])
+        self.assertEqual(canal.desde(ids[-1]), [])
+        self.assertIsNone(canal.desde(f'{canal.prefixo}-0'))
+        self.assertIsNone(canal.desde('outro-processo-1'))
+        self.assertIsNone(canal.desde(None))
+
+        fila = canal.assinar()
+        for n in range(3):
+            canal.publicar('removida', {'id': n})
+        await asyncio.sleep(0)
+        self.assertIs(fila.get_nowait(), quadro.RECARREGAR)
+        self.assertTrue(fila.empty())
+
+
+class ProximosHorariosTests(TestCase):
+    def setUp(self):
+        Sala.objects.bulk_create([Sala(nome='Sala 1'), Sala(nome='Sala 2')])
+        self.especialidade = Especialidade.objects.create(nome='Cardiologia')
+        self.medicos = [criar_medico(n) for n in range(3)]
+        for medico in self.medicos[:2]:
+            medico.especialidades.add(self.especialidade)
+
+    def test_intercala_os_medicos_da_especialidade(self):
+        horarios = agenda.proximos_horarios(self.especialidade, quantidade=4)
+        self.assertEqual(len(horarios), 4)
+        self.assertEqual([h.inicio for h in horarios], sorted(h.inicio for h in horarios))
+        self.assertEqual({h.medico_id for h in horarios}, {self.medicos[0].pk, self.medicos[1].pk})
+
+        agendamento.agendar_consulta(criar_paciente(1), horarios[0].medico, horarios[0].inicio)
+        primeiro = agenda.proximos_horarios(self.especialidade, quantidade=1)[0]
+        self.assertEqual((primeiro.inicio, primeiro.medico_id), (horarios[1].inicio, horarios[1].medico_id))
+
+    def test_convenio_e_janela_de_horario(self):
+        convenio = Convenio.objects.create(nome='Unimed')
+        self.medicos[1].convenios.add(convenio)
+        horarios = agenda.proximos_horarios(self.especialidade, quantidade=5, convenio=convenio, hora_inicio=time(10))
+        self.assertEqual({h.medico_id for h in horarios}, {self.medicos[1].pk})
+        self.assertTrue(all(timezone.localtime(h.inicio).time() >= time(10) for h in horarios))
+
+    def test_le_no_maximo_quantidade_horarios_por_medico(self):
+        with CaptureQueriesContext(connection) as consultas:
+            horarios = agenda.proximos_horarios(self.especialidade, quantidade=3)
+            self.assertEqual(horarios[0].medico.nome_completo, 'Médico 0')
+        leituras = [consulta['sql'] for consulta in consultas.captured_queries if 'clinica_horarioagenda' in consulta['sql']]
+        # Os médicos e uma leitura por médico da especialidade, parando no índice (medico, inicio) após 3 linhas
+        self.assertEqual(len(consultas), 3)
+        self.assertEqual(len(leituras), 2)
+        self.assertTrue(all(sql.endswith('ORDER BY "clinica_horarioagenda"."inicio" ASC LIMIT 3') for sql in leituras))
+
+    def test_pagina(self):
+        self.client.force_login(criar_paciente(1).usuario)
+        resposta = self.client.get(reverse('proximos_horarios'), {'especialidade': self.especialidade.pk, 'quantidade': 3})
+        self.assertEqual(len(resposta.context['horarios']), 3)
+        self.assertContains(resposta, 'Agendar', count=3)
+
+
+class CalendarioOcupacaoTests(TestCase):
+    def setUp(self):
+        self.salas = [Sala.objects.create(nome=f'Sala {n}') for n in range(2)]
+        self.medicos = [criar_medico(n) for n in range(3)]
+        self.horario = proximo_horario(self.medicos[0])
+
+    def calendario(self):
+        return calendario.CalendarioOcupacao.construir(dias=agenda.horizonte_maximo())
+
+    def livres(self, cal, medico):
+        return [h for h in cal.horarios(cal.agendaveis(medico.pk)) if h >= timezone.now()]
+
+    def test_confere_com_a_agenda_materializada(self):
+        agendamento.agendar_consulta(criar_paciente(1), self.medicos[0], self.horario)
+        agendamento.agendar_consulta(criar_paciente(2), self.medicos[1], self.horario)
+        cal = self.calendario()
+        for medico in self.medicos:
+            with self.subTest(medico=medico.pk):
+                self.assertEqual(self.livres(cal, medico), agenda.horarios_livres(medico, dias=agenda.horizonte_maximo()))
+
+    def test_ocupar_e_liberar(self):
+        cal = self.calendario()
+        self.assertIn(self.horario, self.livres(cal, self.medicos[0]))
+        cal.ocupar(self.medicos[0].pk, self.salas[0].pk, self.horario, 30)
+        self.assertNotIn(self.horario, self.livres(cal, self.medicos[0]))
+        cal.liberar(self.medicos[0].pk, self.salas[0].pk, self.horario, 30)
+        self.assertIn(self.horario, self.livres(cal, self.medicos[0]))
+
+    def test_todos_livres_na_janela(self):
+        cal = self.calendario()
+        manhas = cal.janela(time(8), time(10), dias_semana={2})
+        livres = cal.horarios(cal.todos_livres([m.pk for m in self.medicos]) & manhas)
+        self.assertTrue(livres)
+        self.assertTrue(all(h.isoweekday() == 2 and time(8) <= h.time() < time(10) for h in livres))
+
+
+class CacheAgendaMedicoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Sala.objects.create(nome='Sala 1')
+        self.medico, self.outro = criar_medico(1), criar_medico(2)
+        self.horario = proximo_horario(self.medico)
+        self.client.force_login(criar_paciente(1).usuario)
+
+    def pagina(self, medico):
+        with CaptureQueriesContext(connection) as consultas:
+            conteudo = self.client.get(reverse('detalhes_medico', args=[medico.pk]), {'dias': 2}).content.decode()
+        return conteudo, len(consultas)
+
+    def test_reaproveita_ate_os_horarios_do_medico_mudarem(self):
+        conteudo, sem_cache = self.pagina(self.medico)
+        self.assertIn('csrfmiddlewaretoken', conteudo)
+        _, com_cache = self.pagina(self.medico)
+        self.assertLess(com_cache, sem_cache)
+
+        self.pagina(self.outro)
+        url = reverse('agendar_consulta', args=[self.medico.pk, timezone.localtime(self.horario).strftime('%Y-%m-%d-%H-%M')])
+        self.assertIn(url, self.pagina(self.medico)[0])
+        agendamento.agendar_consulta(criar_paciente(2), self.medico, self.horario)
+        self.assertNotIn(url, self.pagina(self.medico)[0])
+        # Com uma sala só, o horário também deixou de existir para o outro médico
+        url_outro = url.replace(f'/{self.medico.pk}/', f'/{self.outro.pk}/', 1)
+        self.assertNotIn(url_outro, self.pagina(self.outro)[0])
+
+    def test_disponibilidade_invalida(self):
+        self.pagina(self.medico)
+        Disponibilidade.objects.filter(medico=self.medico).delete()
+        self.assertIn('Não há horários vagos', self.pagina(self.medico)[0])
+
+
+class AlocadorSalasTests(TestCase):
+    def setUp(self):
+        self.inicio = timezone.make_aware(timezone.datetime(2030, 1, 7, 8, 0))
+
+    def horario(self, minutos):
+        return self.inicio + timedelta(minutes=minutos)
+
+    def test_sobreposicao_com_duracoes_diferentes(self):
+        alocador = AlocadorSalas([1, 2], [(1, 10, self.horario(0), self.horario(60))])
+        self.assertFalse(alocador.sala_livre(1, self.horario(30), self.horario(45)))
+        self.assertTrue(alocador.sala_livre(1, self.horario(60), self.horario(90)))
+        self.assertEqual(alocador.salas_livres(self.horario(15), self.horario(45)), [2])
+
+    def test_politica_mesma_sala(self):
+        alocador = AlocadorSalas([1, 2], [(2, 10, self.horario(0), self.horario(30))])
+        self.assertEqual(alocador.escolher(self.horario(30), self.horario(60), 10, POLITICA_MESMA_SALA), 2)
+        self.assertEqual(alocador.escolher(self.horario(30), self.horario(60), 10, POLITICA_MENOS_USADA), 1)
+
+    def test_sem_sala_livre(self):
+        alocador = AlocadorSalas([1], [(1, 10, self.horario(0), self.horario(30))])
+        self.assertIsNone(alocador.escolher(self.horario(0), self.horario(30)))
+
+
+class ConsultaFormTests(TestCase):
+    def setUp(self):
+        self.sala = Sala.objects.create(nome='Sala 1')
+        self.medico = criar_medico(1)
+        self.horario = proximo_horario(self.medico)
+        Consulta.objects.create(
+            paciente=criar_paciente(1), medico=self.medico, sala=self.sala, data_hora=self.horario, duracao_minutos=60
+        )
+
+    def dados(self, **kwargs):
+        dados = {
+            'paciente': criar_paciente(2).pk,
+            'medico': criar_medico(2).pk,
+            'data_hora': timezone.localtime(self.horario + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M'),
+            'duracao_minutos': 30,
+            'status': 'Agendada',
+        }
+        dados.update(kwargs)
+        return dados
+
+    def test_sala_ocupada_por_consulta_mais_longa(self):
+        form = ConsultaForm(data=self.dados(sala=self.sala.pk))
+        self.assertFalse(form.is_valid())
+        self.assertIn('sala', form.errors)
+
+    def test_aloca_sala_automaticamente(self):
+        sala_2 = Sala.objects.create(nome='Sala 2')
+        form = ConsultaForm(data=self.dados())
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().sala, sala_2)
+
+
+class BuscaPacientesTests(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        nomes = ['José da Silva', 'Josefa Souza', 'Joana Lima', 'Ângela Jóse']
+        self.pacientes = [criar_paciente(n) for n in range(len(nomes))]
+        for paciente, nome in zip(self.pacientes, nomes):
+            paciente.nome_completo = nome
+            paciente.save()
+        self.pacientes[0].cpf = '123.456.789-01'
+        self.pacientes[0].save()
+
+    def nomes(self, busca):
+        return [sugestao['texto'].split(' (')[0] for sugestao in pacientes.sugestoes(busca)]
+
+    def test_cpf_e_nome_normalizados(self):
+        self.pacientes[0].refresh_from_db()
+        self.assertEqual((self.pacientes[0].cpf, self.pacientes[0].nome_busca), ('12345678901', 'jose da silva'))
+
+    def test_sugestoes_por_prefixo_do_nome_ou_cpf(self):
+        self.assertEqual(self.nomes('jose'), ['José da Silva', 'Josefa Souza'])
+        self.assertEqual(self.nomes('JOSÉ  DA'), ['José da Silva'])
+        self.assertEqual(self.nomes('angela j'), ['Ângela Jóse'])
+        self.assertEqual(self.nomes('123.456'), ['José da Silva'])
+        self.assertEqual(self.nomes('j'), [])
+        self.assertEqual(len(pacientes.sugestoes('jo', quantidade=2)), 2)
+
+        self.client.force_login(self.admin)
+        resposta = self.client.get(reverse('paciente_autocompletar'), {'q': 'joana'})
+        self.assertEqual(resposta.json(), {'resultados': [
+            {'id': self.pacientes[2].pk, 'texto': f'Joana Lima (CPF {self.pacientes[2].cpf})'},
+        ]})
+
+    def test_listagem_filtra_pelo_indice(self):
+        self.client.force_login(self.admin)
+        resposta = self.client.get(reverse('paciente_list'), {'busca': 'jos'})
+        self.assertEqual([p.pk for p in resposta.context['pacientes']], [self.pacientes[0].pk, self.pacientes[1].pk])
+
+    def test_formulario_de_consulta_nao_lista_os_pacientes(self):
+        html = ConsultaForm(initial={'paciente': self.pacientes[1].pk}).as_p()
+        self.assertIn('Josefa Souza (CPF', html)
+        self.assertNotIn('Joana Lima', html)
+
+    def test_cpf_invalido_ou_repetido(self):
+        form = PacienteUpdateForm(instance=self.pacientes[1], data={
+            'nome_completo': 'Josefa Souza', 'cpf': '123.456.789-01', 'data_nascimento': '1990-01-01',
+        })
+        self.assertEqual(form.errors['cpf'], ['Já existe um paciente com este CPF.'])
+        form = PacienteUpdateForm(instance=self.pacientes[1], data={
+            'nome_completo': 'Josefa Souza', 'cpf': '123', 'data_nascimento': '1990-01-01',
+        })
+        self.assertEqual(form.errors['cpf'], ['Informe os 11 dígitos do CPF.'])
+
+
+class BancoDeDadosTests(TestCase):
+    def test_pragmas_aplicados_em_cada_conexao(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], int(database.PADRAO['SQLITE_BUSY_TIMEOUT']))
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], int(database.PADRAO['SQLITE_CACHE_SIZE']))
+
+    def test_configuracao_pelo_ambiente(self):
+        with mock.patch.dict('os.environ', {'SQLITE_JOURNAL_MODE': 'delete', 'DB_CONN_MAX_AGE': '0', 'DB_NOME': '/tmp/x.sqlite3'}):
+            self.assertIn(('journal_mode', 'DELETE'), database.pragmas())
+            banco = database.bancos(None)['default']
+        self.assertEqual((banco['NAME'], banco['CONN_MAX_AGE']), ('/tmp/x.sqlite3', 0))
+        with mock.patch.dict('os.environ', {'SQLITE_SYNCHRONOUS': 'talvez'}), self.assertRaises(ValueError):
+            database.pragmas()
+
+    def test_replicas_pelo_ambiente(self):
+        with mock.patch.dict('os.environ', {'DB_NOME': '/tmp/p.sqlite3', 'DB_REPLICAS': '/tmp/r1.sqlite3, /tmp/r2.sqlite3'}):
+            bancos = database.bancos(None)
+        self.assertEqual(list(bancos), ['default', 'replica1', 'replica2'])
+        self.assertEqual(bancos['replica2']['NAME'], '/tmp/r2.sqlite3')
+        self.assertEqual(bancos['replica1']['TEST'], {'MIRROR': 'default'})
+
+
+@mock.patch.object(replicas, 'replicas', return_value=['replica1'])
+class ReplicasTests(SimpleTestCase):
+    def setUp(self):
+        self.roteador = replicas.RoteadorReplicas()
+
+    def requisicao(self, metodo='get', marcada=True, escrever=False, cookies=None, modelo=Paciente):
+        lidos = []
+
+        def view(request):
+            lidos.append(self.roteador.db_for_read(modelo) or 'default')
+            if escrever:
+                self.roteador.db_for_write(modelo)
+                lidos.append(self.roteador.db_for_read(modelo) or 'default')
+            return HttpResponse()
+
+        if marcada:
+            view = replicas.leitura_em_replica(view)
+        middleware = replicas.ReplicaMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+        request = getattr(RequestFactory(), metodo)('/')
+        request.COOKIES.update(cookies or {})
+        return lidos, middleware(request)
+
+    def test_leituras_das_views_marcadas_vao_para_a_replica(self, _):
+        self.assertEqual(self.requisicao()[0], ['replica1'])
+        self.assertEqual(self.requisicao(marcada=False)[0], ['default'])
+        self.assertEqual(self.requisicao('post')[0], ['default'])
+        self.assertEqual(self.requisicao(modelo=Session)[0], ['default'])
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.requisicao()[0], ['default'])
+        # Fora de requisições (comandos, sinais) tudo fica no principal
+        self.assertIsNone(self.roteador.db_for_read(Paciente))
+        self.assertEqual(self.roteador.db_for_write(Paciente), 'default')
+        self.assertFalse(self.roteador.allow_migrate('replica1', 'clinica'))
+
+    def test_depois_de_escrever_le_do_principal(self, _):
+        lidos, resposta = self.requisicao(escrever=True)
+        self.assertEqual(lidos, ['replica1', 'default'])
+        cookie = resposta.cookies[replicas.COOKIE]
+        self.assertEqual(cookie['max-age'], replicas.atraso_maximo())
+
+        lidos, resposta = self.requisicao(cookies={replicas.COOKIE: cookie.value})
+        self.assertEqual(lidos, ['default'])
+        self.assertNotIn(replicas.COOKIE, resposta.cookies)
+        self.assertEqual(self.requisicao(cookies={replicas.COOKIE: '1'})[0], ['replica1'])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = Usuario.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        self.sala = Sala.objects.create(nome='Sala 1')
+        self.medico = criar_medico(1)
+        self.pacientes = [criar_paciente(n) for n in range(3)]
+        self.inicio = timezone.make_aware(timezone.datetime(2030, 1, 7, 8))
+        self.criar_consultas(0, 5)
+
+    def criar_consultas(self, de, ate):
+        for n in range(de, ate):
+            consulta = Consulta.objects.create(
+                paciente=self.pacientes[n % 3], medico=self.medico, sala=self.sala,
+                data_hora=self.inicio + timedelta(minutes=30 * n),
+            )
+            RegistroProntuario.objects.create(consulta=consulta, descricao_atendimento='Atendimento')
+
+    def consultas(self, url, **parametros):
+        cache.clear()
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url, parametros)
+        self.assertEqual(resposta.status_code, 200)
+        return len(consultas)
+
+    def test_listagens_nao_crescem_com_o_numero_de_linhas(self):
+        urls = [reverse(f'admin:clinica_{modelo}_changelist') for modelo in ('consulta', 'registroprontuario', 'disponibilidade')]
+        antes = [self.consultas(url) for url in urls]
+        self.criar_consultas(5, 40)
+        self.assertEqual([self.consultas(url) for url in urls], antes)
+        self.assertLessEqual(max(antes), 10)
+
+    def test_busca_e_autocompletar_pelo_indice_de_pacientes(self):
+        url = reverse('admin:clinica_consulta_changelist')
+        self.client.force_login(self.admin)
+        resposta = self.client.get(url, {'q': self.pacientes[1].cpf})
+        self.assertEqual(resposta.context['cl'].result_count, 2)
+
+        resposta = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'clinica', 'model_name': 'consulta', 'field_name': 'paciente', 'term': 'paciente 2',
+        })
+        self.assertEqual([item['id'] for item in resposta.json()['results']], [str(self.pacientes[2].pk)])
+
+    def test_contagem_estimada_sem_filtros(self):
+        Consulta.objects.filter(pk=Consulta.objects.order_by('pk')[1].pk).delete()
+        paginador = PaginadorContagemAproximada(Consulta.objects.order_by('pk'), 2)
+        self.assertEqual(paginador.count, 5)  # pelo intervalo de ids, incluindo o apagado
+        paginador = PaginadorContagemAproximada(Consulta.objects.filter(status='Agendada').order_by('pk'), 2)
+        self.assertEqual(paginador.count, 4)
+
+
+class PaginacaoKeysetTests(TestCase):
+    def setUp(self):
+        sala = Sala.objects.create(nome='Sala 1')
+        medico = criar_medico(1)
+        horario = timezone.make_aware(timezone.datetime(2030, 1, 7, 8, 0))
+        # Horários repetidos em pares para exercitar o desempate pelo id
+        for n in range(7):
+            Consulta.objects.create(
+                paciente=criar_paciente(n), medico=medico, sala=sala,
+                data_hora=horario + timedelta(minutes=30 * (n // 2)), status='Cancelada',
+            )
+        self.esperado = list(Consulta.objects.order_by('-data_hora', '-id'))
+
+    def paginas(self, url=''):
+        return PaginaKeyset(Consulta.objects.all(), ('-data_hora', '-id'), 3, QueryDict(url.lstrip('?')))
+
+    def test_percorre_para_frente_e_para_tras(self):
+        pagina = self.paginas()
+        vistos = list(pagina.itens)
+        while pagina.url_proxima:
+            pagina = self.paginas(pagina.url_proxima)
+            vistos += pagina.itens
+        self.assertEqual(vistos, self.esperado)
+
+        anterior = self.paginas(pagina.url_anterior)
+        self.assertEqual(anterior.itens, self.esperado[3:6])
+        self.assertEqual(self.paginas(anterior.url_anterior).itens, self.esperado[:3])
+
+    def test_cursor_invalido_volta_ao_inicio(self):
+        self.assertEqual(self.paginas('?apos=lixo').itens, self.esperado[:3])
+
+    def test_pagina_funda_busca_a_partir_do_cursor_no_indice(self):
+        consultas = []
+
+        def capturar(execute, sql, params, many, context):
+            consultas.append((sql, params))
+            return execute(sql, params, many, context)
+
+        url = self.paginas().url_proxima
+        with connection.execute_wrapper(capturar):
+            self.paginas(url)
+        sql, params = consultas[-1]
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plano = ' '.join(linha[-1] for linha in cursor.fetchall())
+        # Uma faixa no índice a partir do cursor, já na ordem da página: sem SCAN desde o início,
+        # sem OR de vários índices e sem ordenar todas as linhas anteriores ao cursor
+        self.assertEqual(plano, 'SEARCH clinica_consulta USING INDEX consulta_data_hora_idx (data_hora<?)')
+
+
+class MetricasTests(TestCase):
+    def test_exporta_latencia_e_sql_por_view(self):
+        self.client.get(reverse('home'))
+        resposta = self.client.get(reverse('metricas'))
+        self.assertEqual(resposta.status_code, 200)
+        texto = resposta.content.decode()
+        self.assertIn('clinica_requisicao_segundos_count{metodo="GET",status="2xx",view="home"}', texto)
+        self.assertIn('clinica_sql_consultas_bucket{view="home",le="1"}', texto)
+
+    def test_acesso_restrito(self):
+        with self.settings(METRICAS_IPS_PERMITIDOS=[]):
+            self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+
+
+class GatewayDeTeste:
+    def __init__(self, falhas=0):
+        self.falhas = falhas
+        self.enviadas = []
+
+    def send_notification(self, user_email, message):
+        if self.falhas:
+            self.falhas -= 1
+            raise ConnectionError('gateway indisponível')
+        self.enviadas.append((user_email, message))
+
+
+class CaixaDeSaidaTests(TestCase):
+    def setUp(self):
+        OutboxNotificationService().send_notification('paciente@exemplo.com', 'Consulta agendada')
+
+    def test_envia_lote(self):
+        gateway = GatewayDeTeste()
+        self.assertEqual(outbox.processar_lote(gateway), (1, 0, 0))
+        self.assertEqual(gateway.enviadas, [('paciente@exemplo.com', 'Consulta agendada')])
+        self.assertEqual(Notificacao.objects.get().status, 'Enviada')
+
+    def test_reagenda_com_recuo_e_descarta(self):
+        gateway = GatewayDeTeste(falhas=10)
+        self.assertEqual(outbox.processar_lote(gateway), (0, 1, 0))
+        notificacao = Notificacao.objects.get()
+        self.assertGreater(notificacao.proxima_tentativa, timezone.now())
+        self.assertEqual(outbox.processar_lote(gateway), (0, 0, 0))
+
+        with self.settings(NOTIFICACOES_MAX_TENTATIVAS=2):
+            Notificacao.objects.update(proxima_tentativa=timezone.now())
+            self.assertEqual(outbox.processar_lote(gateway), (0, 0, 1))
+        self.assertEqual(Notificacao.objects.get().status, 'Descartada')
+
+    def test_agendamento_grava_notificacao_na_mesma_transacao(self):
+        Sala.objects.create(nome='Sala 1')
+        medico = criar_medico(1)
+        servico = OutboxNotificationService()
+        agendamento.agendar_consulta(
+            criar_paciente(1), medico, proximo_horario(medico),
+            ao_confirmar=lambda consulta: servico.send_notification('paciente1@exemplo.com', 'ok'),
+        )
+        self.assertEqual(Notificacao.objects.filter(status='Pendente').count(), 2)
+
+
+class ImportacaoCsvTests(TestCase):
+    PACIENTES = (
+        'username,email,senha,nome_completo,cpf,data_nascimento,convenio\n'
+        'ana,ana@exemplo.com,,Ana,11111111111,1990-01-31,Unimed\n'
+        'bruno,,,Bruno,22222222222,31/01/1985,\n'
+        'ana,,,Ana 2,33333333333,1990-01-01,\n'
+        'carla,,,Carla,44444444444,31/02/1990,\n'
+    )
+
+    def test_importa_linhas_validas_e_relata_erros(self):
+        Convenio.objects.create(nome='Unimed')
+        importador = ImportadorDePacientes(tamanho_lote=2)
+        self.assertEqual(importador.importar(io.StringIO(self.PACIENTES)), 2)
+        self.assertEqual([linha for linha, _ in importador.erros], [4, 5])
+        ana = Paciente.objects.select_related('usuario', 'convenio').get(cpf='11111111111')
+        self.assertEqual(ana.convenio.nome, 'Unimed')
+        self.assertFalse(ana.usuario.has_usable_password())
+
+        reimportacao = ImportadorDePacientes()
+        self.assertEqual(reimportacao.importar(io.StringIO(self.PACIENTES)), 0)
+        self.assertEqual(Paciente.objects.count(), 2)
+
+    def test_simulacao_nao_grava(self):
+        ImportadorDePacientes(simular=True).importar(io.StringIO(self.PACIENTES))
+        self.assertFalse(Usuario.objects.exists())
+
+    def test_disponibilidades_materializam_a_agenda(self):
+        Sala.objects.create(nome='Sala 1')
+        ImportadorDeMedicos().importar(io.StringIO('username,nome_completo,crm\nmed,Médico,CRM1\n'))
+        importador = ImportadorDeDisponibilidades()
+        linhas = ''.join(f'CRM1,{dia},08:00,12:00\n' for dia in range(1, 8))
+        self.assertEqual(importador.importar(io.StringIO('crm,dia_semana,hora_inicio,hora_fim\n' + linhas)), 7)
+        self.assertTrue(agenda.horarios_livres(Medico.objects.get(crm='CRM1'), dias=2))
+
+
+class DiretorioMedicosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cardiologia = Especialidade.objects.create(nome='Cardiologia')
+        self.ana, self.bruno = criar_medico(1), criar_medico(2)
+        self.ana.nome_completo, self.bruno.nome_completo = 'Ana Souza', 'Bruno Lima'
+        self.ana.save(update_fields=['nome_completo'])
+        self.bruno.save(update_fields=['nome_completo'])
+        self.ana.especialidades.add(self.cardiologia)
+        self.client.force_login(criar_paciente(1).usuario)
+
+    def listar(self, **parametros):
+        return self.client.get(reverse('listar_medicos'), parametros).content.decode()
+
+    def test_filtros(self):
+        conteudo = self.listar(especialidade=self.cardiologia.pk)
+        self.assertIn('Ana Souza', conteudo)
+        self.assertNotIn('Bruno Lima', conteudo)
+        conteudo = self.listar(nome='bru')
+        self.assertIn('Bruno Lima', conteudo)
+        self.assertNotIn('Ana Souza', conteudo)
+
+    def test_filtro_por_nome_busca_pelo_indice(self):
+        self.assertEqual(self.bruno.nome_busca, 'bruno lima')
+        medicos = MedicoFiltroForm({'nome': ' BRÚ '}).filtrar(Medico.objects.all()).order_by('nome_busca', 'pk')
+        self.assertEqual(list(medicos), [self.bruno])
+        # Faixa no índice de nome_busca, já na ordem do diretório (LIKE faria SCAN e ordenaria à parte)
+        plano = medicos.all()[:20].explain()
+        self.assertIn('SEARCH clinica_medico USING INDEX medico_nome_busca_idx (nome_busca>? AND nome_busca<?)', plano)
+        self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_lista_em_cache_e_invalidada(self):
+        self.listar(especialidade=self.cardiologia.pk)
+        with CaptureQueriesContext(connection) as consultas:
+            self.listar(especialidade=self.cardiologia.pk)
+        self.assertFalse([c for c in consultas if 'clinica_medico' in c['sql']])
+
+        self.bruno.especialidades.add(self.cardiologia)
+        self.assertIn('Bruno Lima', self.listar(especialidade=self.cardiologia.pk))
+        self.bruno.delete()
+        self.assertNotIn('Bruno Lima', self.listar(especialidade=self.cardiologia.pk))
+
+
+class PainelGerenciamentoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.salas = [Sala.objects.create(nome=f'Sala {n}') for n in range(2)]
+        self.medico = criar_medico(1)
+        hoje = timezone.make_aware(timezone.datetime.combine(timezone.localdate(), time(8)))
+        self.consultas = [
+            Consulta.objects.create(
+                paciente=criar_paciente(n), medico=self.medico, sala=self.salas[n % 2],
+                data_hora=hoje + timedelta(minutes=30 * n),
+            )
+            for n in range(4)
+        ]
+
+    def resumos(self):
+        return sorted(ResumoDiario.objects.filter(total__gt=0).values_list('data', 'sala_id', 'status', 'total', 'minutos'))
+
+    def test_sinais_mantem_os_totais(self):
+        self.consultas[0].status = 'Cancelada'
+        self.consultas[0].save()
+        self.consultas[1].sala = self.salas[0]
+        self.consultas[1].save()
+        self.consultas[2].delete()
+
+        painel = resumos.painel()
+        self.assertEqual((painel['total_pacientes'], painel['total_medicos']), (4, 1))
+        self.assertEqual(painel['consultas_hoje'], 2)
+        self.assertEqual(painel['consultas_hoje_por_status']['Cancelada'], 1)
+        self.assertEqual(painel['canceladas_semana'], 1)
+        self.assertEqual([sala['consultas'] for sala in painel['ocupacao_salas']], [1, 1])
+
+        incremental = self.resumos()
+        resumos.recalcular()
+        self.assertEqual(self.resumos(), incremental)
+
+
+class AnalisesTests(TestCase):
+    def setUp(self):
+        self.salas = [Sala.objects.create(nome=f'Sala {n}') for n in range(2)]
+        self.convenio = Convenio.objects.create(nome='Unimed')
+        self.medico = criar_medico(1)
+        self.inicio = timezone.make_aware(timezone.datetime.combine(timezone.localdate() - timedelta(days=1), time(8)))
+        self.consultas = [
+            Consulta.objects.create(
+                paciente=criar_paciente(n, convenio=self.convenio if n % 2 else None), medico=self.medico,
+                sala=self.salas[n % 2], data_hora=self.inicio + timedelta(minutes=30 * n),
+            )
+            for n in range(5)
+        ]
+
+    def resumos(self):
+        return sorted(ResumoHorario.objects.values_list('hora', 'medico_id', 'sala_id', 'convenio_id', 'status', 'total', 'minutos'))
+
+    def test_atualizacao_incremental_igual_a_reconstrucao(self):
+        analises.atualizar()
+        self.assertEqual(sum(total for *_, total, _ in self.resumos()), 5)
+
+        self.consultas[0].status = 'Cancelada'
+        self.consultas[0].save()
+        self.consultas[1].data_hora += timedelta(hours=3)
+        self.consultas[1].save()
+        self.consultas[2].delete()
+        Consulta.objects.create(
+            paciente=criar_paciente(9), medico=self.medico, sala=self.salas[0], data_hora=self.inicio + timedelta(hours=5),
+        )
+        analises.atualizar(tamanho_bloco=2)
+        incremental = self.resumos()
+
+        analises.reconstruir(tamanho_bloco=2)
+        self.assertEqual(self.resumos(), incremental)
+        self.assertEqual(ConsultaAnalisada.objects.count(), 5)
+
+    def test_relatorio_le_so_as_tabelas_de_analise(self):
+        analises.reconstruir()
+        self.consultas[0].status = 'Cancelada'
+        self.consultas[0].save()
+        admin = Usuario.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        self.client.force_login(admin)
+
+        resposta = self.client.get(reverse('relatorios'))
+        self.assertEqual(resposta.status_code, 200)
+        # O cancelamento só aparece depois da próxima atualização
+        self.assertEqual(sum(linha['consultas'] for linha in resposta.context['por_sala']), 5)
+        self.assertEqual(resposta.context['possiveis_faltas'], 5)
+        self.assertEqual(
+            {linha['nome']: linha['consultas'] for linha in resposta.context['por_convenio']}, {None: 3, 'Unimed': 2},
+        )
+
+        analises.atualizar()
+        resposta = self.client.get(reverse('relatorios'), {'agrupamento': 'hora'})
+        self.assertEqual(sum(linha['consultas'] for linha in resposta.context['por_sala']), 4)
+        self.assertEqual(sum(linha['canceladas'] or 0 for linha in resposta.context['serie']), 1)
+
+
+class BuscaProntuarioTests(TestCase):
+    def setUp(self):
+        sala = Sala.objects.create(nome='Sala 1')
+        self.medico, outro = criar_medico(1), criar_medico(2)
+        inicio = timezone.make_aware(timezone.datetime(2030, 1, 7, 8))
+        textos = [
+            (self.medico, 'Otite média', 'Amoxicilina 500mg de 8 em 8 horas'),
+            (self.medico, 'Amigdalite, amoxicilina já em uso; manter amoxicilina', None),
+            (self.medico, 'Cefaleia tensional', 'Dipirona'),
+            (outro, 'Sinusite', 'Amoxicilina 875mg'),
+        ]
+        self.prontuarios = [
+            RegistroProntuario.objects.create(
+                consulta=Consulta.objects.create(
+                    paciente=criar_paciente(n), medico=medico, sala=sala, data_hora=inicio + timedelta(hours=n),
+                ),
+                descricao_atendimento=descricao, prescricao=prescricao,
+            )
+            for n, (medico, descricao, prescricao) in enumerate(textos)
+        ]
+
+    def buscar(self, texto, **kwargs):
+        return [prontuario.pk for prontuario in busca.buscar(self.medico, texto, **kwargs)[0]]
+
+    def test_busca_restrita_ao_medico_e_ordenada_por_relevancia(self):
+        self.assertEqual(self.buscar('amoxicilina'), [self.prontuarios[1].pk, self.prontuarios[0].pk])
+        # Prefixo, sem acento e sem diferenciar maiúsculas
+        self.assertEqual(self.buscar('CEFALEI'), [self.prontuarios[2].pk])
+        self.assertEqual(self.buscar('otite media amoxi'), [self.prontuarios[0].pk])
+        # Sintaxe do FTS5 digitada pelo usuário é tratada como texto
+        self.assertEqual(self.buscar('"amoxicilina*" NEAR('), [])
+        self.assertEqual(self.buscar('amoxicilina*'), [self.prontuarios[1].pk, self.prontuarios[0].pk])
+        self.assertEqual(self.buscar('!!!'), [])
+
+        pagina, tem_proxima = busca.buscar(self.medico, 'amoxicilina', por_pagina=1)
+        self.assertTrue(tem_proxima)
+        self.assertIn('<mark>', pagina[0].trecho)
+
+    def test_indice_acompanha_alteracoes_e_exclusoes(self):
+        self.prontuarios[2].prescricao = 'Paracetamol'
+        self.prontuarios[2].save()
+        self.prontuarios[0].delete()
+        self.assertEqual(self.buscar('dipirona'), [])
+        self.assertEqual(self.buscar('paracetamol'), [self.prontuarios[2].pk])
+        self.assertEqual(self.buscar('amoxicilina'), [self.prontuarios[1].pk])
+
+        busca.reconstruir()
+        self.assertEqual(self.buscar('paracetamol'), [self.prontuarios[2].pk])
+
+    def test_view_do_medico(self):
+        self.client.force_login(self.medico.usuario)
+        resposta = self.client.get(reverse('prontuario_busca'), {'q': 'amoxicilina'})
+        self.assertEqual([p.pk for p in resposta.context['prontuarios']], [self.prontuarios[1].pk, self.prontuarios[0].pk])
+        self.assertContains(resposta, '<mark>')
+
+        self.client.force_login(self.prontuarios[0].consulta.paciente.usuario)
+        self.assertEqual(self.client.get(reverse('prontuario_busca'), {'q': 'amoxicilina'}).status_code, 403)
+
+
+class ExportacaoTests(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        sala = Sala.objects.create(nome='Sala 1')
+        self.convenio = Convenio.objects.create(nome='Unimed')
+        medico = criar_medico(1)
+        inicio = timezone.make_aware(timezone.datetime(2030, 1, 7, 8))
+        self.consultas = [
+            Consulta.objects.create(
+                paciente=criar_paciente(n, convenio=self.convenio if n % 2 else None),
+                medico=medico, sala=sala, data_hora=inicio + timedelta(days=n),
+            )
+            for n in range(4)
+        ]
+        RegistroProntuario.objects.create(consulta=self.consultas[0], descricao_atendimento='Retorno, "sem" queixas')
+        Consulta.objects.update(atualizado_em=timezone.now() - timedelta(hours=1))
+
+    def exportar(self, **parametros):
+        self.client.force_login(self.admin)
+        resposta = self.client.get(reverse('consulta_exportar'), parametros)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, b''.join(resposta.streaming_content).decode()
+
+    def test_csv_com_filtros(self):
+        _, conteudo = self.exportar(convenio=self.convenio.pk, data_fim='2030-01-08')
+        linhas = list(csv.DictReader(io.StringIO(conteudo)))
+        self.assertEqual([int(linha['consulta_id']) for linha in linhas], [self.consultas[1].pk])
+        self.assertEqual(linhas[0]['convenio'], 'Unimed')
+
+    def test_jsonl_incremental(self):
+        resposta, conteudo = self.exportar(formato='jsonl')
+        linhas = [json.loads(linha) for linha in conteudo.splitlines()]
+        self.assertEqual(len(linhas), 4)
+        self.assertEqual(linhas[0]['prontuario_descricao'], 'Retorno, "sem" queixas')
+
+        self.consultas[2].status = 'Realizada'
+        self.consultas[2].save()
+        desde = timezone.datetime.fromisoformat(resposta['X-Exportacao-Corte'])
+        self.assertEqual([linha[0] for linha in exportacao.consultas(desde=desde)], [self.consultas[2].pk])
+
+    def test_comando_avanca_o_marco(self):
+        saida = io.StringIO()
+        call_command('exportar_consultas', '--incremental', stdout=saida, stderr=io.StringIO())
+        self.assertEqual(len(saida.getvalue().splitlines()), 5)
+        self.assertIsNotNone(exportacao.marco('consultas'))
+
+        RegistroProntuario.objects.create(consulta=self.consultas[3], descricao_atendimento='Alta')
+        saida = io.StringIO()
+        call_command('exportar_consultas', '--incremental', '--formato', 'jsonl', stdout=saida, stderr=io.StringIO())
+        self.assertEqual([json.loads(linha)['consulta_id'] for linha in saida.getvalue().splitlines()], [self.consultas[3].pk])
+
+
+class AgendamentoConcorrenteTests(TransactionTestCase):
+    THREADS = 24
+
+    def agendar_em_paralelo(self, pedidos):
+        barreira = threading.Barrier(len(pedidos))
+        resultados = []
+
+        def agendar(paciente, medico, horario):
+            try:
+                barreira.wait()
+                resultados.append(agendamento.agendar_consulta(paciente, medico, horario))
+            except agendamento.AgendamentoError as e:
+                resultados.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=agendar, args=pedido) for pedido in pedidos]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultados
+
+    def assertSemAgendamentoDuplo(self):
+        ativas = Consulta.objects.exclude(status='Cancelada')
+        for campo in ('medico', 'sala', 'paciente'):
+            duplicadas = ativas.values(campo, 'data_hora').annotate(total=Count('id')).filter(total__gt=1)
+            self.assertFalse(duplicadas.exists(), f'agendamento duplo por {campo}')
+
+    def test_mesmo_horario_do_mesmo_medico(self):
+        Sala.objects.create(nome='Sala 1')
+        Sala.objects.create(nome='Sala 2')
+        medico = criar_medico(1)
+        horario = proximo_horario(medico)
+        pedidos = [(criar_paciente(n), medico, horario) for n in range(self.THREADS)]
+
+        resultados = self.agendar_em_paralelo(pedidos)
+
+        self.assertEqual(sum(isinstance(r, Consulta) for r in resultados), 1)
+        self.assertEqual(Consulta.objects.count(), 1)
+        self.assertSemAgendamentoDuplo()
+
+    def test_disputa_por_salas(self):
+        salas = [Sala.objects.create(nome=f'Sala {n}') for n in range(3)]
+        medicos = [criar_medico(n) for n in range(6)]
+        horario = proximo_horario(medicos[0])
+        pedidos = [(criar_paciente(n), medicos[n % len(medicos)], horario) for n in range(self.THREADS)]
+
+        resultados = self.agendar_em_paralelo(pedidos)
+
+        self.assertEqual(sum(isinstance(r, Consulta) for r in resultados), len(salas))
+        self.assertEqual(Consulta.objects.filter(data_hora=horario).count(), len(salas))
+        self.assertSemAgendamentoDuplo()
+
+
+class ClinicaSinteticaTests(TestCase):
+    def test_gera_clinica_e_mede_todas_as_rotas(self):
+        call_command(
+            'gerar_clinica_sintetica', medicos=3, especialidades=2, salas=2, pacientes=30, anos=0.1,
+            stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+        self.assertEqual(Medico.objects.count(), 3)
+        self.assertEqual(Paciente.objects.exclude(nome_busca='').count(), 30)
+        self.assertTrue(RegistroProntuario.objects.exists())
+        ativas = Consulta.objects.exclude(status='Cancelada')
+        for campo in ('medico', 'sala', 'paciente'):
+            self.assertFalse(ativas.values(campo, 'data_hora').annotate(total=Count('id')).filter(total__gt=1).exists())
+        with self.assertRaises(CommandError):
+            call_command('gerar_clinica_sintetica', stdout=io.StringIO(), stderr=io.StringIO())
+
+        saida = io.StringIO()
+        call_command('benchmark_rotas', repeticoes=2, aquecimento=0, agendamentos=0, stdout=saida, stderr=io.StringIO())
+        resultado = json.loads(saida.getvalue())
+        self.assertEqual(set(resultado['rotas']), {padrao.name for padrao in urls.urlpatterns})
+        for nome, rota in resultado['rotas'].items():
+            self.assertLess(max(rota['status']), 400, nome)
+            self.assertGreater(rota['p99_ms'], 0)
+
+
+class OrcamentoDeConsultasTests(TestCase):
+    """
+    Limite de consultas SQL por rota, medido com um volume de dados realista.
+
+    Toda rota de clinica/urls.py precisa ter um orçamento aqui; os painéis também
+    são verificados com mais linhas para garantir que o número de consultas não cresce.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        cls.salas = [Sala.objects.create(nome=f'Sala {n}') for n in range(3)]
+        especialidades = [Especialidade.objects.create(nome=f'Especialidade {n}') for n in range(4)]
+        convenio = Convenio.objects.create(nome='Convênio')
+        cls.medicos = [criar_medico(n) for n in range(8)]
+        for n, medico in enumerate(cls.medicos):
+            medico.especialidades.set(especialidades[n % 4:n % 4 + 2])
+        cls.pacientes = [criar_paciente(n, convenio=convenio) for n in range(20)]
+        cls.medico, cls.paciente = cls.medicos[0], cls.pacientes[0]
+        cls.consultas = cls.semear_consultas(20)
+
+    @classmethod
+    def semear_consultas(cls, quantidade, deslocamento=0):
+        # Consultas de hoje para o primeiro médico e o primeiro paciente, com alguns prontuários
+        inicio = timezone.make_aware(timezone.datetime.combine(timezone.localdate(), time(0)))
+        consultas = []
+        for n in range(deslocamento, deslocamento + quantidade):
+            data_hora = inicio + timedelta(minutes=30 * (n // 2))
+            consulta = Consulta.objects.create(
+                paciente=cls.paciente if n % 2 else cls.pacientes[1 + n % 19],
+                medico=cls.medico if n % 2 == 0 else cls.medicos[1],
+                sala=cls.salas[n % 2],
+                data_hora=data_hora,
+            )
+            if n % 3 == 0:
+                RegistroProntuario.objects.create(consulta=consulta, descricao_atendimento='Atendimento')
+            consultas.append(consulta)
+        return consultas
+
+    def rotas(self):
+        consulta = self.consultas[0]
+        prontuario = RegistroProntuario.objects.first()
+        disponibilidade = Disponibilidade.objects.first()
+        convenio, especialidade, sala = Convenio.objects.first(), Especialidade.objects.first(), self.salas[0]
+        horario = timezone.localtime(agenda.horarios_livres(self.medicos[2], dias=2)[-1])
+        cancelavel = Consulta.objects.create(
+            paciente=self.pacientes[6], medico=self.medicos[3], sala=self.salas[2], data_hora=proximo_horario(self.medicos[3]),
+        )
+        # (nome, kwargs, usuário, método, orçamento)
+        return [
+            ('home', {}, None, 'get', 0),
+            ('metricas', {}, None, 'get', 0),
+            ('login', {}, None, 'get', 0),
+            ('logout', {}, self.admin, 'post', 4),
+            ('paciente_cadastro', {}, None, 'get', 0),
+            ('dashboard_redirect', {}, self.paciente.usuario, 'get', 2),
+            ('dashboard_paciente', {}, self.paciente.usuario, 'get', 4),
+            ('dashboard_medico', {}, self.medico.usuario, 'get', 4),
+            ('listar_medicos', {}, self.paciente.usuario, 'get', 5),
+            ('proximos_horarios', {}, self.paciente.usuario, 'get', 4),
+            ('detalhes_medico', {'medico_id': self.medico.pk}, self.paciente.usuario, 'get', 5),
+            ('agendar_consulta', {'medico_id': self.medicos[2].pk, 'horario_str': horario.strftime('%Y-%m-%d-%H-%M')},
+             self.pacientes[5].usuario, 'post', 20),
+            ('prontuario_create', {'consulta_id': self.consultas[1].pk}, self.medico.usuario, 'get', 4),
+            ('prontuario_update', {'pk': prontuario.pk}, self.medico.usuario, 'get', 3),
+            ('prontuario_busca', {}, self.medico.usuario, 'get', 2),
+            ('gerenciamento', {}, self.admin, 'get', 5),
+            ('relatorios', {}, self.admin, 'get', 10),
+            ('quadro', {}, self.admin, 'get', 2),
+            ('quadro_eventos', {}, self.admin, 'get', 3),
+            ('convenio_list', {}, self.admin, 'get', 3),
+            ('convenio_create', {}, self.admin, 'get', 2),
+            ('convenio_update', {'pk': convenio.pk}, self.admin, 'get', 3),
+            ('convenio_delete', {'pk': convenio.pk}, self.admin, 'get', 3),
+            ('especialidade_list', {}, self.admin, 'get', 3),
+            ('especialidade_create', {}, self.admin, 'get', 2),
+            ('especialidade_update', {'pk': especialidade.pk}, self.admin, 'get', 3),
+            ('especialidade_delete', {'pk': especialidade.pk}, self.admin, 'get', 3),
+            ('sala_list', {}, self.admin, 'get', 3),
+            ('sala_create', {}, self.admin, 'get', 2),
+            ('sala_update', {'pk': sala.pk}, self.admin, 'get', 3),
+            ('sala_delete', {'pk': sala.pk}, self.admin, 'get', 3),
+            ('medico_list', {}, self.admin, 'get', 4),
+            ('medico_create', {}, self.admin, 'get', 4),
+            ('medico_update', {'pk': self.medico.pk}, self.admin, 'get', 7),
+            ('medico_delete', {'pk': self.medico.pk}, self.admin, 'get', 3),
+            ('consulta_list', {}, self.admin, 'get', 5),
+            ('consulta_create', {}, self.admin, 'get', 5),
+            ('consulta_update', {'pk': consulta.pk}, self.admin, 'get', 6),
+            ('consulta_delete', {'pk': consulta.pk}, self.admin, 'get', 5),
+            ('consulta_exportar', {}, self.admin, 'get', 3),
+            ('disponibilidade_list', {}, self.admin, 'get', 4),
+            ('disponibilidade_create', {}, self.admin, 'get', 3),
+            ('disponibilidade_update', {'pk': disponibilidade.pk}, self.admin, 'get', 4),
+            ('disponibilidade_delete', {'pk': disponibilidade.pk}, self.admin, 'get', 4),
+            ('paciente_list', {}, self.admin, 'get', 4),
+            ('paciente_create_admin', {}, self.admin, 'get', 2),
+            ('paciente_autocompletar', {}, self.admin, 'get', 2),
+            ('paciente_update', {'pk': self.paciente.pk}, self.admin, 'get', 4),
+            ('paciente_delete', {'pk': self.paciente.pk}, self.admin, 'get', 3),
+            ('api_medicos', {}, self.paciente.usuario, 'get', 4),
+            ('api_horarios', {'medico_id': self.medico.pk}, self.paciente.usuario, 'get', 5),
+            ('api_consultas', {}, self.paciente.usuario, 'get', 4),
+            ('api_cancelar_consulta', {'consulta_id': cancelavel.pk}, self.pacientes[6].usuario, 'post', 15),
+        ]
+
+    def consultas_da_rota(self, nome, kwargs, usuario, metodo):
+        # Mede sempre o pior caso, com o cache vazio
+        cache.clear()
+        if usuario:
+            self.client.force_login(usuario)
+        url = reverse(nome, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = getattr(self.client, metodo)(url)
+        self.assertLess(resposta.status_code, 400, f'{nome} respondeu {resposta.status_code}')
+        self.client.logout()
+        return len(consultas)
+
+    def test_todas_as_rotas_tem_orcamento(self):
+        nomes = {padrao.name for padrao in urls.urlpatterns}
+        self.assertEqual(nomes, {rota[0] for rota in self.rotas()})
+
+    def test_orcamento_por_rota(self):
+        for nome, kwargs, usuario, metodo, orcamento in self.rotas():
+            with self.subTest(rota=nome):
+                self.assertLessEqual(self.consultas_da_rota(nome, kwargs, usuario, metodo), orcamento)
+
+    def test_paineis_nao_crescem_com_o_numero_de_consultas(self):
+        paineis = [
+            ('gerenciamento', {}, self.admin, 'get'),
+            ('dashboard_medico', {}, self.medico.usuario, 'get'),
+            ('dashboard_paciente', {}, self.paciente.usuario, 'get'),
+            ('consulta_list', {}, self.admin, 'get'),
+        ]
+        antes = [self.consultas_da_rota(*painel) for painel in paineis]
+        self.semear_consultas(20, deslocamento=20)
+        depois = [self.consultas_da_rota(*painel) for painel in paineis]
+        self.assertEqual(antes, depois)
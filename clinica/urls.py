@@ -1,10 +1,24 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, metricas, views
+
+# Views com versão assíncrona, usadas quando VIEWS_ASSINCRONAS está ligado (servidor ASGI)
+ASSINCRONAS = {
+    'listar_medicos': views.listar_medicos_async,
+    'detalhes_medico': views.detalhes_medico_async,
+    'agendar_consulta': views.agendar_consulta_async,
+}
+
+
+def _view(nome, view):
+    return ASSINCRONAS[nome] if getattr(settings, 'VIEWS_ASSINCRONAS', False) else view
+
 
 urlpatterns = [
     
     path('', views.home, name='home'),
+    path('metrics', metricas.metricas, name='metricas'),
     path('login/', auth_views.LoginView.as_view(template_name='clinica/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
 
@@ -14,14 +28,19 @@ urlpatterns = [
     path('paciente/dashboard/', views.DashboardPacienteView.as_view(), name='dashboard_paciente'),
     path('medico/dashboard/', views.DashboardMedicoView.as_view(), name='dashboard_medico'),
 
-    path('agendamento/', views.listar_medicos, name='listar_medicos'),
-    path('medico/<int:medico_id>/', views.detalhes_medico, name='detalhes_medico'),
-    path('agendar/<int:medico_id>/<str:horario_str>/', views.agendar_consulta, name='agendar_consulta'),
+    path('agendamento/', _view('listar_medicos', views.listar_medicos), name='listar_medicos'),
+    path('agendamento/proximos/', views.proximos_horarios, name='proximos_horarios'),
+    path('medico/<int:medico_id>/', _view('detalhes_medico', views.detalhes_medico), name='detalhes_medico'),
+    path('agendar/<int:medico_id>/<str:horario_str>/', _view('agendar_consulta', views.agendar_consulta), name='agendar_consulta'),
 
     path('consulta/<int:consulta_id>/prontuario/novo/', views.ProntuarioCreateView.as_view(), name='prontuario_create'),
     path('prontuario/<int:pk>/editar/', views.ProntuarioUpdateView.as_view(), name='prontuario_update'),
+    path('prontuario/busca/', views.BuscaProntuarioView.as_view(), name='prontuario_busca'),
 
     path('gerenciar/', views.GerenciamentoView.as_view(), name='gerenciamento'),
+    path('gerenciar/relatorios/', views.RelatoriosView.as_view(), name='relatorios'),
+    path('gerenciar/quadro/', views.QuadroDoDiaView.as_view(), name='quadro'),
+    path('gerenciar/quadro/eventos/', views.quadro_eventos, name='quadro_eventos'),
 
     path('gerenciar/convenios/', views.ConvenioListView.as_view(), name='convenio_list'),
     path('gerenciar/convenios/novo/', views.ConvenioCreateView.as_view(), name='convenio_create'),
@@ -47,6 +66,7 @@ urlpatterns = [
     path('gerenciar/consultas/nova/', views.ConsultaCreateView.as_view(), name='consulta_create'),
     path('gerenciar/consultas/<int:pk>/editar/', views.ConsultaUpdateView.as_view(), name='consulta_update'),
     path('gerenciar/consultas/<int:pk>/cancelar/', views.ConsultaDeleteView.as_view(), name='consulta_delete'),
+    path('gerenciar/consultas/exportar/', views.ExportacaoConsultasView.as_view(), name='consulta_exportar'),
 
     path('gerenciar/disponibilidades/', views.DisponibilidadeListView.as_view(), name='disponibilidade_list'),
     path('gerenciar/disponibilidades/nova/', views.DisponibilidadeCreateView.as_view(), name='disponibilidade_create'),
@@ -54,7 +74,14 @@ urlpatterns = [
     path('gerenciar/disponibilidades/<int:pk>/excluir/', views.DisponibilidadeDeleteView.as_view(), name='disponibilidade_delete'),
     path('gerenciar/pacientes/', views.PacienteListView.as_view(), name='paciente_list'),
     path('gerenciar/pacientes/novo/', views.PacienteCreateAdminView.as_view(), name='paciente_create_admin'),
+    path('gerenciar/pacientes/autocompletar/', views.PacienteAutocompletarView.as_view(), name='paciente_autocompletar'),
     path('gerenciar/pacientes/<int:pk>/editar/', views.PacienteUpdateView.as_view(), name='paciente_update'),
     path('gerenciar/pacientes/<int:pk>/excluir/', views.PacienteDeleteView.as_view(), name='paciente_delete'),
+
+    # API JSON (ver api.py)
+    path('api/v1/medicos/', api.medicos, name='api_medicos'),
+    path('api/v1/medicos/<int:medico_id>/horarios/', api.horarios, name='api_horarios'),
+    path('api/v1/consultas/', api.consultas, name='api_consultas'),
+    path('api/v1/consultas/<int:consulta_id>/cancelar/', api.cancelar, name='api_cancelar_consulta'),
     
 ]
@@ -0,0 +1,55 @@
+# Chaves de cache versionadas: invalidar um grupo é só incrementar a sua versão
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _chave_versao(grupo):
+    return f'versao:{grupo}'
+
+
+def _versao_inicial():
+    # Se a versão sumir do cache (expulsa ou cache reiniciado), recomeça de um valor nunca usado
+    return time.time_ns()
+
+
+def versao(grupo):
+    valor = cache.get(_chave_versao(grupo))
+    if valor is None:
+        cache.add(_chave_versao(grupo), _versao_inicial(), timeout=None)
+        valor = cache.get(_chave_versao(grupo))
+    return valor
+
+
+def invalidar(grupo):
+    try:
+        cache.incr(_chave_versao(grupo))
+    except ValueError:
+        cache.add(_chave_versao(grupo), _versao_inicial(), timeout=None)
+
+
+def invalidar_apos_commit(*grupos):
+    """
+    Invalida agora e de novo após o commit.
+
+    Entre as duas, outra requisição ainda lê os dados antigos do banco e pode guardá-los
+    na versão nova; a segunda invalidação descarta esse valor.
+    """
+    def invalidar_grupos():
+        for grupo in grupos:
+            invalidar(grupo)
+    invalidar_grupos()
+    transaction.on_commit(invalidar_grupos)
+
+
+def grupo_do_medico(medico_id):
+    return f'medico:{medico_id}'
+
+
+def chave(grupo, *partes):
+    """Chave para um valor do grupo na versão atual; as partes entram como hash."""
+    resumo = hashlib.md5('|'.join(map(str, partes)).encode()).hexdigest()
+    return f'{grupo}:{versao(grupo)}:{resumo}'
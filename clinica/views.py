@@ -1,16 +1,32 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.contrib import messages
 from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
-from django.http import HttpResponseRedirect
+from django.utils import timezone
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView, View
 from django.views.decorators.http import require_http_methods
 
 from .models import Convenio, Especialidade, Sala, Medico, Consulta, Paciente, Disponibilidade, Disponibilidade, RegistroProntuario
+from . import agenda, agendamento, analises, busca, exportacao, metricas, pacientes, quadro, replicas, resumos, versoes
 from .forms import PacienteCreationForm, MedicoUserCreationForm, MedicoUpdateForm, ConsultaForm, DisponibilidadeForm, ProntuarioForm, PacienteUpdateForm
+from .forms import ConsultaFiltroForm, DisponibilidadeFiltroForm, ExportacaoForm, MedicoFiltroForm, PacienteFiltroForm
+from .forms import BuscaProntuarioForm, ProximosHorariosForm, RelatorioForm
+from .paginacao import KeysetPaginationMixin, PaginaKeyset
+
+ITENS_POR_PAGINA_MEDICOS = 20
+# A busca nos prontuários pagina por OFFSET; além disso o médico deve refinar os termos
+PAGINAS_BUSCA_PRONTUARIOS = 50
 
 #Injeção de Dependência
 from dependency_injector.wiring import inject, Provide
@@ -40,9 +56,11 @@ def paciente_cadastro(
     if request.method == 'POST':
         form = PacienteCreationForm(request.POST)
         if form.is_valid():
-            usuario = form.save()
-            mensagem = f'Bem-vindo à nossa clínica, {usuario.username}! Sua conta foi criada com sucesso.'
-            notification_service.send_notification(usuario.email, mensagem)
+            with transaction.atomic():
+                usuario = form.save()
+                mensagem = f'Bem-vindo à nossa clínica, {usuario.username}! Sua conta foi criada com sucesso.'
+                with metricas.cronometro('notificacao'):
+                    notification_service.send_notification(usuario.email, mensagem)
             messages.success(request, 'Cadastro realizado com sucesso! Por favor, faça o login.')
             return redirect('login')
     else:
@@ -59,50 +77,105 @@ def dashboard_paciente(request):
 
     consultas = []
     if paciente:
-        consultas = Consulta.objects.filter(paciente=paciente).order_by('data_hora')
+        consultas = Consulta.objects.filter(paciente=paciente).select_related('medico', 'sala').order_by('data_hora')
 
     contexto = {'consultas': consultas}
     return render(request, 'clinica/dashboard_paciente.html', contexto)
 
 
+def _chave_medicos(request):
+    parametros = [(nome, request.GET.get(nome, '')) for nome in ('especialidade', 'nome', 'apos', 'antes')]
+    return versoes.chave('medicos', *parametros)
+
+
+def _listagem_medicos(request):
+    filtro = MedicoFiltroForm(request.GET)
+    pagina = PaginaKeyset(
+        filtro.filtrar(Medico.objects.prefetch_related('especialidades')),
+        ('nome_busca', 'pk'), ITENS_POR_PAGINA_MEDICOS, request.GET,
+    )
+    return render_to_string('clinica/_lista_medicos.html', {
+        'filtro': filtro, 'medicos': pagina.itens, 'pagina': pagina, 'request': request,
+    })
+
+
+def _validade_medicos():
+    return replicas.validade_cache(getattr(settings, 'DIRETORIO_MEDICOS_CACHE_SEGUNDOS', 300))
+
+
+@replicas.leitura_em_replica
 @login_required
 def listar_medicos(request):
-    medicos = Medico.objects.all()
-    return render(request, 'clinica/listar_medicos.html', {'medicos': medicos})
+    # A lista (filtros + médicos + paginação) é a mesma para todos os pacientes: fica em cache
+    # até a próxima alteração de médicos ou especialidades (ver signals.py)
+    chave = _chave_medicos(request)
+    listagem = cache.get(chave)
+    if listagem is None:
+        listagem = _listagem_medicos(request)
+        cache.set(chave, listagem, _validade_medicos())
+    return render(request, 'clinica/listar_medicos.html', {'listagem': listagem})
 
 
 @login_required
-def detalhes_medico(request, medico_id):
-    medico = get_object_or_404(Medico, pk=medico_id)
-    disponibilidades = Disponibilidade.objects.filter(medico=medico).order_by('dia_semana', 'hora_inicio')
-
-    horarios_disponiveis = []
-    duracao_consulta = timedelta(minutes=30)
-    hoje = date.today()
-
-    consultas_agendadas_datetime = Consulta.objects.filter(
-        medico=medico,
-        data_hora__gte=datetime.now()
-    ).values_list('data_hora', flat=True)
-
-    for i in range(7):
-        dia_atual = hoje + timedelta(days=i)
-        dia_da_semana_atual = dia_atual.isoweekday()
-
-        for d in disponibilidades.filter(dia_semana=dia_da_semana_atual):
-            hora_inicio = datetime.combine(dia_atual, d.hora_inicio)
-            hora_fim = datetime.combine(dia_atual, d.hora_fim)
-            hora_slot = hora_inicio
-            while hora_slot < hora_fim:
-                if hora_slot not in consultas_agendadas_datetime:
-                    horarios_disponiveis.append(hora_slot)
-                hora_slot += duracao_consulta
-    
-    contexto = {
+def proximos_horarios(request):
+    filtro = ProximosHorariosForm(request.GET or None)
+    horarios = []
+    if filtro.is_valid():
+        horarios = agenda.proximos_horarios(
+            filtro.cleaned_data['especialidade'],
+            quantidade=filtro.cleaned_data['quantidade'] or 10,
+            convenio=filtro.cleaned_data['convenio'],
+            hora_inicio=filtro.cleaned_data['hora_inicio'],
+            hora_fim=filtro.cleaned_data['hora_fim'],
+        )
+    return render(request, 'clinica/proximos_horarios.html', {'filtro': filtro, 'horarios': horarios})
+
+
+def _chave_agenda(medico_id, dias):
+    # Cache por médico: a versão muda quando os horários do médico mudam (ver agenda.py e
+    # signals.py) e o slot atual entra na chave para que horários passados saiam da página
+    return versoes.chave(versoes.grupo_do_medico(medico_id), versoes.versao('agenda'), dias, agenda.slot_atual())
+
+
+def _agenda_renderizada(medico, dias, horarios_disponiveis):
+    return (medico.nome_completo, render_to_string('clinica/_agenda_medico.html', {
         'medico': medico,
+        'dias': dias,
         'horarios_disponiveis': horarios_disponiveis,
-    }
-    return render(request, 'clinica/detalhes_medico.html', contexto)
+        'horarios_por_dia': agenda.agrupar_por_dia(horarios_disponiveis),
+    }))
+
+
+@login_required
+def detalhes_medico(request, medico_id):
+    dias = agenda.limitar_horizonte(request.GET.get('dias'))
+    chave = _chave_agenda(medico_id, dias)
+    pagina = cache.get(chave)
+    if pagina is None:
+        medico = get_object_or_404(Medico.objects.prefetch_related('especialidades'), pk=medico_id)
+        pagina = _agenda_renderizada(medico, dias, agenda.horarios_livres(medico, dias=dias))
+        cache.set(chave, pagina, getattr(settings, 'AGENDA_CACHE_SEGUNDOS', 600))
+
+    nome, agenda_renderizada = pagina
+    return render(request, 'clinica/detalhes_medico.html', {'nome_medico': nome, 'agenda': agenda_renderizada})
+
+
+def _horario_do_agendamento(horario_str):
+    try:
+        return timezone.make_aware(datetime.strptime(horario_str, '%Y-%m-%d-%H-%M'))
+    except ValueError:
+        return None
+
+
+def _agendar(request, paciente, medico, horario_consulta, notification_service):
+    try:
+        agendamento.agendar_com_notificacao(paciente, medico, horario_consulta, notification_service, request.user.email)
+    except agendamento.AgendamentoError as e:
+        messages.error(request, str(e))
+        return redirect('detalhes_medico', medico_id=medico.pk)
+
+    messages.success(request, 'Consulta agendada com sucesso!')
+    return redirect('dashboard_redirect')
 
 
 @login_required
@@ -120,38 +193,91 @@ def agendar_consulta(
 
     medico = get_object_or_404(Medico, pk=medico_id)
     paciente = get_object_or_404(Paciente, usuario=request.user)
-    horario_consulta = datetime.strptime(horario_str, '%Y-%m-%d-%H-%M')
+    horario_consulta = _horario_do_agendamento(horario_str)
+    if horario_consulta is None:
+        messages.error(request, 'Horário inválido.')
+        return redirect('detalhes_medico', medico_id=medico_id)
+    return _agendar(request, paciente, medico, horario_consulta, notification_service)
 
-    consulta_existente_paciente = Consulta.objects.filter(
-        paciente=paciente,
-        data_hora=horario_consulta
-    ).exists()
 
-    if consulta_existente_paciente:
-        messages.error(request, f'Você já possui uma consulta agendada para este mesmo horário ({horario_consulta.strftime("%d/%m/%Y às %H:%M")}).')
-        return redirect('detalhes_medico', medico_id=medico_id)
+# Versões assíncronas para ASGI (VIEWS_ASSINCRONAS, ver urls.py): enquanto esperam o banco ou o cache,
+# não prendem uma thread do servidor
 
-    salas_ocupadas_ids = Consulta.objects.filter(data_hora=horario_consulta).values_list('sala__id', flat=True)
-    sala_disponivel = Sala.objects.exclude(id__in=salas_ocupadas_ids).first()
+async def _carregar_usuario(request):
+    # request.user é carregado de forma síncrona (consulta ao banco) se um template o usar
+    request.user = await request.auser()
+    return request.user
 
-    if not sala_disponivel:
-        messages.error(request, f'Desculpe, não há salas disponíveis para o horário das {horario_consulta.strftime("%H:%M")}. Por favor, tente outro horário.')
+
+@replicas.leitura_em_replica
+@login_required
+async def listar_medicos_async(request):
+    await _carregar_usuario(request)
+    chave = _chave_medicos(request)
+    listagem = await cache.aget(chave)
+    if listagem is None:
+        # PaginaKeyset e o formulário de filtro são síncronos
+        listagem = await sync_to_async(_listagem_medicos)(request)
+        await cache.aset(chave, listagem, _validade_medicos())
+    return render(request, 'clinica/listar_medicos.html', {'listagem': listagem})
+
+
+@login_required
+async def detalhes_medico_async(request, medico_id):
+    await _carregar_usuario(request)
+    dias = agenda.limitar_horizonte(request.GET.get('dias'))
+    chave = _chave_agenda(medico_id, dias)
+    pagina = await cache.aget(chave)
+    if pagina is None:
+        medico = await aget_object_or_404(Medico.objects.prefetch_related('especialidades'), pk=medico_id)
+        pagina = _agenda_renderizada(medico, dias, await agenda.ahorarios_livres(medico, dias=dias))
+        await cache.aset(chave, pagina, getattr(settings, 'AGENDA_CACHE_SEGUNDOS', 600))
+
+    nome, agenda_renderizada = pagina
+    return render(request, 'clinica/detalhes_medico.html', {'nome_medico': nome, 'agenda': agenda_renderizada})
+
+
+@login_required
+@require_http_methods(["POST"])
+@inject
+async def agendar_consulta_async(
+    request,
+    medico_id,
+    horario_str,
+    notification_service: NotificationService = Provide[AppContainer.notification_service],
+):
+    usuario = await _carregar_usuario(request)
+    if usuario.tipo_usuario != 'paciente':
+        messages.error(request, 'Apenas pacientes podem agendar consultas.')
+        return redirect('home')
+
+    medico = await aget_object_or_404(Medico, pk=medico_id)
+    paciente = await aget_object_or_404(Paciente, usuario=usuario)
+    horario_consulta = _horario_do_agendamento(horario_str)
+    if horario_consulta is None:
+        messages.error(request, 'Horário inválido.')
         return redirect('detalhes_medico', medico_id=medico_id)
+    # A transação do agendamento (com a notificação na caixa de saída) é síncrona: o ORM assíncrono
+    # não abre transações. Roda em uma thread, e a view só espera
+    return await sync_to_async(_agendar)(request, paciente, medico, horario_consulta, notification_service)
 
-    try:
-        Consulta.objects.create(
-            paciente=paciente,
-            medico=medico,
-            sala=sala_disponivel,
-            data_hora=horario_consulta
-        )
-        mensagem = f'Sua consulta com Dr(a). {medico.nome_completo} foi agendada para {horario_consulta.strftime("%d/%m/%Y às %H:%M")}.'
-        notification_service.send_notification(request.user.email, mensagem)
-        messages.success(request, 'Consulta agendada com sucesso!')
-    except Exception as e:
-        messages.error(request, f'Ocorreu um erro inesperado ao agendar a consulta: {e}')
 
-    return redirect('dashboard_redirect')
+@login_required
+async def quadro_eventos(request):
+    """Server-sent events do quadro do dia (ver quadro.py)."""
+    usuario = await _carregar_usuario(request)
+    if not usuario.is_superuser:
+        raise PermissionDenied
+    ultimo_id = request.headers.get('Last-Event-ID')
+    if isinstance(request, ASGIRequest):
+        resposta = StreamingHttpResponse(quadro.eventos(ultimo_id), content_type='text/event-stream')
+    else:
+        # Com WSGI a conexão presa ocuparia uma thread: responde o que há agora e o navegador reconecta
+        partes = [parte async for parte in quadro.eventos(ultimo_id, continuo=False)]
+        resposta = HttpResponse(''.join(partes), content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['X-Accel-Buffering'] = 'no'  # nginx: repassar cada evento sem acumular
+    return resposta
 
 
 class AdminRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
@@ -162,14 +288,53 @@ class MedicoRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_authenticated and self.request.user.tipo_usuario == 'medico'
 
+class FiltroMixin:
+    filtro_form_class = None
+
+    def get_queryset(self):
+        self.filtro = self.filtro_form_class(self.request.GET)
+        return self.filtro.filtrar(super().get_queryset())
+
+    def get_context_data(self, **kwargs):
+        kwargs['filtro'] = self.filtro
+        return super().get_context_data(**kwargs)
+
+@replicas.leitura_em_replica
 class GerenciamentoView(AdminRequiredMixin, TemplateView):
     template_name = 'clinica/gerenciamento.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_pacientes'] = Paciente.objects.count()
-        context['total_medicos'] = Medico.objects.count()
-        context['consultas_hoje'] = Consulta.objects.filter(data_hora__date=date.today()).count()
+        # Totais mantidos pelos sinais (ver resumos.py), sem COUNT nas tabelas grandes
+        context.update(resumos.painel())
+        return context
+
+
+class QuadroDoDiaView(AdminRequiredMixin, TemplateView):
+    # As consultas chegam pelo stream de quadro_eventos: a página em si não consulta o banco
+    template_name = 'clinica/quadro.html'
+
+
+@replicas.leitura_em_replica
+class RelatoriosView(AdminRequiredMixin, TemplateView):
+    # Lê apenas as tabelas de análise; os números valem até a última execução de atualizar_analises
+    template_name = 'clinica/relatorios.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        filtro = RelatorioForm(self.request.GET)
+        context['filtro'] = filtro
+        if filtro.is_valid():
+            context.update(analises.relatorio(
+                filtro.cleaned_data['data_inicio'], filtro.cleaned_data['data_fim'], filtro.cleaned_data['agrupamento'],
+            ))
+            context['tabelas'] = [
+                ('Por sala', context['por_sala']),
+                ('Por médico', context['por_medico']),
+                ('Por especialidade', context['por_especialidade']),
+                ('Por convênio', context['por_convenio']),
+            ]
+            context['atualizado_ate'] = exportacao.marco(analises.MARCO)
         return context
 
 
@@ -243,10 +408,12 @@ class SalaDeleteView(AdminRequiredMixin, DeleteView):
     success_url = reverse_lazy('sala_list')
 
 
+@replicas.leitura_em_replica
 class MedicoListView(AdminRequiredMixin, ListView):
     model = Medico
     template_name = 'clinica/medico_list.html'
     context_object_name = 'medicos'
+    queryset = Medico.objects.select_related('usuario').prefetch_related('especialidades').order_by('nome_completo')
 
 class MedicoCreateView(AdminRequiredMixin, CreateView):
     form_class = MedicoUserCreationForm
@@ -276,11 +443,14 @@ class MedicoDeleteView(AdminRequiredMixin, DeleteView):
         return HttpResponseRedirect(success_url)
 
 
-class ConsultaListView(AdminRequiredMixin, ListView):
+@replicas.leitura_em_replica
+class ConsultaListView(AdminRequiredMixin, FiltroMixin, KeysetPaginationMixin, ListView):
     model = Consulta
     template_name = 'clinica/consulta_list.html'
     context_object_name = 'consultas'
-    queryset = Consulta.objects.select_related('paciente', 'medico', 'sala').order_by('-data_hora')
+    queryset = Consulta.objects.select_related('paciente', 'medico', 'sala')
+    filtro_form_class = ConsultaFiltroForm
+    ordenacao = ('-data_hora', '-id')
 
 class ConsultaCreateView(AdminRequiredMixin, CreateView):
     model = Consulta
@@ -300,11 +470,39 @@ class ConsultaDeleteView(AdminRequiredMixin, DeleteView):
     success_url = reverse_lazy('consulta_list')
 
 
-class DisponibilidadeListView(AdminRequiredMixin, ListView):
+class ExportacaoConsultasView(AdminRequiredMixin, View):
+    """
+    Exporta as consultas em CSV ou JSONL sem montar o arquivo na memória.
+
+    O cabeçalho X-Exportacao-Corte traz o instante de corte: passado como `desde`
+    na próxima chamada, exporta apenas o que mudou desde esta exportação.
+    """
+
+    def get(self, request):
+        form = ExportacaoForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        formato = form.cleaned_data['formato'] or 'csv'
+        corte = exportacao.corte()
+        queryset = exportacao.consultas(ate=corte, **form.filtros())
+
+        response = StreamingHttpResponse(
+            exportacao.linhas(queryset, formato),
+            content_type='text/csv; charset=utf-8' if formato == 'csv' else 'application/x-ndjson; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="consultas.{formato}"'
+        response['X-Exportacao-Corte'] = corte.isoformat()
+        return response
+
+
+@replicas.leitura_em_replica
+class DisponibilidadeListView(AdminRequiredMixin, FiltroMixin, KeysetPaginationMixin, ListView):
     model = Disponibilidade
     template_name = 'clinica/disponibilidade_list.html'
     context_object_name = 'disponibilidades'
-    queryset = Disponibilidade.objects.select_related('medico').order_by('medico', 'dia_semana')
+    queryset = Disponibilidade.objects.select_related('medico')
+    filtro_form_class = DisponibilidadeFiltroForm
+    ordenacao = ('medico_id', 'dia_semana', 'hora_inicio', 'id')
 
 class DisponibilidadeCreateView(AdminRequiredMixin, CreateView):
     model = Disponibilidade
@@ -353,6 +551,7 @@ class ProntuarioUpdateView(MedicoRequiredMixin, UpdateView):
     success_url = reverse_lazy('dashboard_medico')
 
 
+@replicas.leitura_em_replica
 class DashboardMedicoView(MedicoRequiredMixin, TemplateView):
     template_name = 'clinica/medico/dashboard_medico.html'
 
@@ -360,12 +559,14 @@ class DashboardMedicoView(MedicoRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         try:
             medico = self.request.user.medico
-            hoje = date.today()
+            inicio = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
 
-            consultas_de_hoje = Consulta.objects.filter(
+            # Intervalo em data_hora (usa o índice) e relações carregadas em uma única consulta
+            consultas_de_hoje = list(Consulta.objects.filter(
                 medico=medico,
-                data_hora__date=hoje
-            ).order_by('data_hora')
+                data_hora__gte=inicio,
+                data_hora__lt=inicio + timedelta(days=1),
+            ).select_related('paciente', 'registroprontuario').order_by('data_hora'))
 
             context['consultas_de_hoje'] = consultas_de_hoje
             context['medico'] = medico
@@ -375,6 +576,30 @@ class DashboardMedicoView(MedicoRequiredMixin, TemplateView):
 
         return context
 
+class BuscaProntuarioView(MedicoRequiredMixin, TemplateView):
+    # Só os prontuários das consultas do próprio médico, ordenados por relevância
+    template_name = 'clinica/medico/busca_prontuarios.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        filtro = BuscaProntuarioForm(self.request.GET or None)
+        context['filtro'] = filtro
+        if filtro.is_valid():
+            medico = get_object_or_404(Medico, usuario=self.request.user)
+            pagina = int(self.request.GET['pagina']) if self.request.GET.get('pagina', '').isdigit() else 1
+            pagina = min(max(pagina, 1), PAGINAS_BUSCA_PRONTUARIOS)
+            context['prontuarios'], tem_proxima = busca.buscar(medico, filtro.cleaned_data['q'], pagina)
+            parametros = self.request.GET.copy()
+            context['pagina'] = {}
+            if pagina > 1:
+                parametros['pagina'] = pagina - 1
+                context['pagina']['url_anterior'] = '?' + parametros.urlencode()
+            if tem_proxima:
+                parametros['pagina'] = pagina + 1
+                context['pagina']['url_proxima'] = '?' + parametros.urlencode()
+        return context
+
+@replicas.leitura_em_replica
 class DashboardPacienteView(LoginRequiredMixin, TemplateView):
     template_name = 'clinica/paciente/dashboard_paciente.html'
 
@@ -382,18 +607,27 @@ class DashboardPacienteView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         try:
             paciente = self.request.user.paciente
-            consultas = Consulta.objects.filter(paciente=paciente).order_by('data_hora')
+            consultas = Consulta.objects.filter(paciente=paciente).select_related('medico', 'sala').order_by('data_hora')
             context['consultas'] = consultas
         except Paciente.DoesNotExist:
             context['consultas'] = []
         return context
 
 
-class PacienteListView(AdminRequiredMixin, ListView):
+@replicas.leitura_em_replica
+class PacienteListView(AdminRequiredMixin, FiltroMixin, KeysetPaginationMixin, ListView):
     model = Paciente
     template_name = 'clinica/paciente_list.html'
     context_object_name = 'pacientes'
-    queryset = Paciente.objects.select_related('usuario', 'convenio').order_by('nome_completo')
+    queryset = Paciente.objects.select_related('usuario', 'convenio')
+    filtro_form_class = PacienteFiltroForm
+    # Mesmo índice da busca por nome: filtro e ordenação sem etapa de ordenação extra
+    ordenacao = ('nome_busca', 'pk')
+
+class PacienteAutocompletarView(AdminRequiredMixin, View):
+    # Sugestões para o campo de paciente da consulta: uma consulta ao índice, limitada a SUGESTOES linhas
+    def get(self, request):
+        return JsonResponse({'resultados': pacientes.sugestoes(request.GET.get('q'))})
 
 class PacienteCreateAdminView(AdminRequiredMixin, CreateView):
     form_class = PacienteCreationForm
@@ -0,0 +1,88 @@
+# Banco de dados a partir de variáveis de ambiente e ajustes (PRAGMAs) do SQLite em cada conexão nova
+
+import os
+
+from django.db.backends.signals import connection_created
+
+# Valores de produção; cada um pode ser trocado pela variável de ambiente de mesmo nome
+PADRAO = {
+    # Leitores não esperam pelo escritor (e vice-versa); só um escritor por vez
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    # Em WAL, NORMAL não corrompe o banco; uma queda de energia pode perder as últimas transações
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    # Negativo = KiB (64 MB de cache de páginas por conexão)
+    'SQLITE_CACHE_SIZE': '-65536',
+    'SQLITE_MMAP_SIZE': str(256 * 1024 * 1024),
+    # Quanto tempo (ms) esperar pelo bloqueio de escrita antes de "database is locked"
+    'SQLITE_BUSY_TIMEOUT': '5000',
+    # DEFERRED: a parte de leitura da transação não segura o bloqueio de escrita. IMMEDIATE evita alguns
+    # "database is locked" (repetidos por agendamento.py), mas no benchmark_banco deixou escritores esperando
+    # mais de 10 s no p99, porque o SQLite não atende a fila de espera em ordem
+    'SQLITE_TRANSACTION_MODE': 'DEFERRED',
+    # Segundos que uma conexão é reaproveitada entre requisições (0 = uma conexão por requisição)
+    'DB_CONN_MAX_AGE': '60',
+}
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def _valor(nome):
+    return os.environ.get(nome, PADRAO[nome])
+
+
+def _opcao(nome, validas):
+    valor = _valor(nome).upper()
+    if valor not in validas:
+        raise ValueError(f'{nome}={valor!r}: use um de {", ".join(validas)}.')
+    return valor
+
+
+def pragmas():
+    """PRAGMAs aplicados a cada conexão SQLite nova, na ordem em que são executados."""
+    return [
+        ('busy_timeout', int(_valor('SQLITE_BUSY_TIMEOUT'))),
+        ('journal_mode', _opcao('SQLITE_JOURNAL_MODE', JOURNAL_MODES)),
+        ('synchronous', _opcao('SQLITE_SYNCHRONOUS', SYNCHRONOUS)),
+        ('cache_size', int(_valor('SQLITE_CACHE_SIZE'))),
+        ('mmap_size', int(_valor('SQLITE_MMAP_SIZE'))),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def _banco(nome):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': nome,
+        'CONN_MAX_AGE': int(_valor('DB_CONN_MAX_AGE')),
+        # Conexões reaproveitadas são testadas no início da requisição (descarta as que caíram)
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': int(_valor('SQLITE_BUSY_TIMEOUT')) / 1000,
+            'transaction_mode': _opcao('SQLITE_TRANSACTION_MODE', ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')),
+        },
+    }
+
+
+def bancos(base_dir):
+    """
+    DATABASES do projeto: SQLite em DB_NOME (padrão: db.sqlite3 na raiz) com conexões persistentes,
+    mais uma réplica de leitura (replica1, replica2...) para cada caminho em DB_REPLICAS (separados por vírgula).
+    """
+    resultado = {'default': _banco(os.environ.get('DB_NOME') or base_dir / 'db.sqlite3')}
+    caminhos = [caminho.strip() for caminho in os.environ.get('DB_REPLICAS', '').split(',') if caminho.strip()]
+    for numero, caminho in enumerate(caminhos, start=1):
+        # Nos testes a réplica é o próprio banco de teste (não há cópia a manter)
+        resultado[f'replica{numero}'] = {**_banco(caminho), 'TEST': {'MIRROR': 'default'}}
+    return resultado
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for nome, valor in pragmas():
+            cursor.execute(f'PRAGMA {nome} = {valor}')
+
+
+connection_created.connect(aplicar_pragmas, dispatch_uid='config.database.aplicar_pragmas')
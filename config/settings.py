@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
+
+from . import database
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'clinica.metricas.MetricasMiddleware',
+    'clinica.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,12 +79,14 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# SQLite com WAL, PRAGMAs ajustados e conexões persistentes, configurável por variáveis de ambiente (ver config/database.py)
+DATABASES = database.bancos(BASE_DIR)
+
+# Réplicas (DB_REPLICAS): só as views de leitura marcadas em views.py leem delas (ver clinica/replicas.py)
+DATABASE_ROUTERS = ['clinica.replicas.RoteadorReplicas']
+
+# Depois de uma escrita, o navegador lê do principal por este tempo; mantenha acima do atraso das réplicas
+REPLICA_ATRASO_SEGUNDOS = int(os.environ.get('REPLICA_ATRASO_SEGUNDOS', 30))
 
 
 # Password validation
@@ -133,4 +140,82 @@ LOGOUT_REDIRECT_URL = 'home'
 
 LOGIN_REDIRECT_URL = '/'
 
-LOGOUT_REDIRECT_URL = '/' 
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/' 
+
+# Agenda
+# Duração de cada consulta e horizonte (em dias) exibido na página do médico
+
+AGENDA_DURACAO_CONSULTA_MINUTOS = 30
+
+AGENDA_HORIZONTE_DIAS = 30
+
+AGENDA_HORIZONTE_MAXIMO_DIAS = 90
+
+# Política de escolha de salas: 'mesma_sala' (mantém o médico na sala do horário anterior) ou 'menos_usada'
+AGENDA_POLITICA_SALAS = 'mesma_sala'
+
+# Caixa de saída de notificações (processada pelo comando processar_notificacoes)
+NOTIFICACOES_MAX_TENTATIVAS = 5
+
+NOTIFICACOES_RECUO_SEGUNDOS = 30
+
+# Métricas de desempenho (expostas em /metrics no formato do Prometheus)
+METRICAS_ATIVAS = os.environ.get('METRICAS_ATIVAS', '1') == '1'
+
+METRICAS_IPS_PERMITIDOS = os.environ.get('METRICAS_IPS_PERMITIDOS', '127.0.0.1').split(',')
+
+# Log JSON por requisição em arquivo rotativo (opcional)
+METRICAS_LOG_ARQUIVO = os.environ.get('METRICAS_LOG_ARQUIVO')
+
+if METRICAS_LOG_ARQUIVO:
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'metricas': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'filename': METRICAS_LOG_ARQUIVO,
+                'maxBytes': 10 * 1024 * 1024,
+                'backupCount': 5,
+            },
+        },
+        'loggers': {
+            'clinica.metricas': {'handlers': ['metricas'], 'level': 'INFO', 'propagate': False},
+        },
+    }
+
+# Cache (lista de médicos e páginas de agenda renderizadas, invalidadas por versão a cada alteração).
+# 'memoria' vale só para um processo; com vários processos use CACHE_BACKEND=arquivo (diretório compartilhado)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoria')
+
+if CACHE_BACKEND == 'arquivo':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIRETORIO', os.path.join(tempfile.gettempdir(), 'clinica-cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'clinica',
+        },
+    }
+
+DIRETORIO_MEDICOS_CACHE_SEGUNDOS = 300
+
+AGENDA_CACHE_SEGUNDOS = 600
+
+# Admin: por quanto tempo a contagem de uma listagem filtrada é reaproveitada (ver PaginadorContagemAproximada)
+ADMIN_CONTAGEM_CACHE_SEGUNDOS = 60
+
+# Versões assíncronas da lista de médicos, da agenda e do agendamento (clinica/urls.py). Ligue ao servir
+# com ASGI (ex.: uvicorn config.asgi:application); com WSGI cada view assíncrona roda em um event loop próprio
+VIEWS_ASSINCRONAS = os.environ.get('VIEWS_ASSINCRONAS', '0') == '1'
+
+# Quadro do dia (/gerenciar/quadro/): intervalo dos pulsos que mantêm o stream aberto e, com WSGI
+# (sem stream contínuo), de quanto em quanto o navegador busca as alterações
+QUADRO_PULSO_SEGUNDOS = 15
+QUADRO_RECONEXAO_SEGUNDOS = 5
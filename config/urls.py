@@ -23,4 +23,4 @@ urlpatterns = [
     path('', include('clinica.urls')),  
 ]
 
-AppContainer().wire(modules=["clinica.views"])
\ No newline at end of file
+AppContainer().wire(modules=["clinica.views", "clinica.api"])
\ No newline at end of file